@@ -1,42 +1,142 @@
 import sys
-import copy
-from collections import deque
-from queue import Queue
 import datetime
+import multiprocessing
+import time
 
 from loguru import logger
 import pandas as pd
 import numpy as np
 
 from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.QtCore import Qt, QSettings, QTimer, QCoreApplication, QAbstractTableModel
-from PyQt5.QAxContainer import QAxWidget
+from PyQt5.QtCore import Qt, QSettings, QTimer, QCoreApplication, QAbstractTableModel, QModelIndex
 from PyQt5 import QtGui, uic
 
+from broker import KiwoomBackend
+from watchlist_store import WatchlistStore, WATCHLIST_COLUMNS
+from exit_engine import ExitRuleEngine
+from tick_conflator import TickConflator
+from tick_recorder import TickRecorder
+from realtime_subscriptions import RealtimeSubscriptionManager
+from screen_allocator import ScreenAllocator, POOL_TR, POOL_ORDER, POOL_CONDITION, POOL_REAL
+from latency import OrderLatencyTracker, MetricsServer, STAGE_DEQUEUE, STAGE_SENT
+from rate_limiter import TrRateLimiter
+from basic_info_cache import BasicInfoCache
+from persistence import PersistenceWriter, write_pickle, write_csv
+from state_journal import (
+    StateJournal,
+    EVENT_ENTRY,
+    EVENT_BUY_ORDER,
+    EVENT_FILL,
+    EVENT_AVG_PRICE,
+    EVENT_SELL_ORDER,
+    EVENT_CORRECTION,
+    EVENT_UNFINISHED,
+    EVENT_UNFINISHED_DONE,
+    EVENT_CLOSE,
+)
+from order_book import OrderBook
+from chejan import decode_chejan
+from tr_schema import OPW00018, OPT10075, OPT10001, read_single, read_multi
+from tr_pager import TrPager, merge_pages
+from tick_ring import KIND_STOP_LOSS
+from strategy_config import StrategyConfig, parse_params, DEFAULT_PARAMS
+from pricing import PricingEngine, round_to_tick, ROUND_DOWN
+from condition_router import ConditionRegistry, MasterCodeNames, ConditionEventBatcher, select_initial_candidates
+from strategy_worker import StrategyWorker, WORKER_OFF
+from request_scheduler import (
+    RequestScheduler,
+    PRIORITY_EXIT_ORDER,
+    PRIORITY_BUY_ORDER,
+    PRIORITY_CORRECTION_ORDER,
+    PRIORITY_ACCOUNT_QUERY,
+    PRIORITY_BASIC_INFO,
+)
+
 form_class = uic.loadUiType("main.ui")[0]
 
-class PandasModel(QAbstractTableModel): # PandasModel은 테이블 뷰를 만들어주는 클래스
-    def __init__(self, data):
+def format_cell(value): # 테이블에 보여줄 문자열 (정수로 떨어지는 float 은 정수로 표시)
+    if isinstance(value, float):
+        if np.isnan(value):
+            return "None"
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+class PandasModel(QAbstractTableModel): # PandasModel은 테이블 뷰를 만들어주는 클래스 (바뀐 셀만 갱신)
+    def __init__(self, columns=()):
         super().__init__()
-        self._data = data
+        self._columns = list(columns)
+        self._keys = [] # row 순서대로 index 값
+        self._key_to_row = dict()
+        self._text = [] # row 별 표시 문자열 캐시
+        self.version = None # 마지막으로 반영한 데이터 버전
+
+    def is_stale(self, version):
+        return version is None or version != self.version
+
+    def update(self, df, version=None): # DataFrame 과 비교해서 삭제/추가/변경된 부분만 알린다
+        if version is not None and version == self.version:
+            return
+        self.version = version
+        columns = list(df.columns)
+        keys = list(df.index)
+        new_text = [[format_cell(value) for value in row] for row in df.itertuples(index=False, name=None)]
+        if columns != self._columns:
+            self.beginResetModel()
+            self._columns = columns
+            self._keys = keys
+            self._key_to_row = {key: row for row, key in enumerate(keys)}
+            self._text = new_text
+            self.endResetModel()
+            return
+
+        new_key_set = set(keys)
+        removed_rows = sorted((row for key, row in self._key_to_row.items() if key not in new_key_set), reverse=True)
+        for row in removed_rows:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._keys[row]
+            del self._text[row]
+            self.endRemoveRows()
+        if removed_rows:
+            self._key_to_row = {key: row for row, key in enumerate(self._keys)}
+
+        added = [(key, text) for key, text in zip(keys, new_text) if key not in self._key_to_row]
+        if added:
+            first = len(self._keys)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for key, text in added:
+                self._key_to_row[key] = len(self._keys)
+                self._keys.append(key)
+                self._text.append(text)
+            self.endInsertRows()
+
+        for key, text in zip(keys, new_text):
+            row = self._key_to_row[key]
+            old = self._text[row]
+            if old == text:
+                continue
+            changed = [col for col, (a, b) in enumerate(zip(old, text)) if a != b]
+            self._text[row] = text
+            self.dataChanged.emit(self.index(row, changed[0]), self.index(row, changed[-1]), [Qt.DisplayRole])
 
     def rowCount(self, parent=None):
-        return self._data.shape[0]
+        return len(self._keys)
 
     def columnCount(self, parent=None):
-        return self._data.shape[1]
+        return len(self._columns)
 
     def data(self, index, role=Qt.DisplayRole):
         if index.isValid():
             if role == Qt.DisplayRole:
-                return str(self._data.iloc[index.row(), index.column()])
+                return self._text[index.row()][index.column()]
         return None
 
     def headerData(self, section, orientation, role):
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self._data.columns[section]
+            return self._columns[section]
         if orientation == Qt.Vertical and role == Qt.DisplayRole:
-            return self._data.index[section]
+            return str(self._keys[section])
         return None
 
     def setData(self, index, value, role):
@@ -48,36 +148,58 @@ class PandasModel(QAbstractTableModel): # PandasModel은 테이블 뷰를 만들
 
 
 class KiwoomAPI(QMainWindow, form_class):
-    def __init__(self):
+    def __init__(self, broker=None, settings=None):
+        # broker: BrokerBackend (None 이면 키움 OpenAPI 사용)
+        # settings: QSettings (None 이면 My company/myApp, 재생/벤치마크는 임시 폴더의 INI 파일을 넘긴다)
         super().__init__()
         self.setupUi(self)
         self.show()
 
         self.conditionInPushButton.clicked.connect(self.condition_in)
         self.conditionOutPushButton.clicked.connect(self.condition_out)
-        self.settings = QSettings('My company', 'myApp')
+        self.settings = settings if settings is not None else QSettings('My company', 'myApp')
+        self.persistence = PersistenceWriter() # pickle/CSV 저장은 별도 스레드에서 처리
         # My company, myApp에 setting 저장(buyAmountLineEdit, goalReturnLineEdit, stopLossLineEdit) windows 레지스르리에 등록
         self.load_settings()
+        for line_edit in (self.buyAmountLineEdit, self.goalReturnLineEdit, self.stopLossLineEdit): # 입력이 끝날 때만 설정을 다시 만든다
+            line_edit.editingFinished.connect(self.update_strategy_config)
         # self.setWindowIcon(QtGui.QIcon('icon.ico'))
 
         self.max_send_per_sec: int = 4 # 초당 TR 호출 최대 4번
         self.max_send_per_minute: int = 55 # 분당 TR 호출 최대 55번
         self.max_send_per_hour: int = 950 # 시간당 TR 호출 최대 950번
-        self.last_tr_send_times = deque(maxlen=self.max_send_per_hour)
-        self.tr_req_queue = Queue()
-        self.orders_queue = Queue()
+        self.tr_rate_limiter = TrRateLimiter(
+            limits=(
+                (1.0, self.max_send_per_sec, "초"),
+                (60.0, self.max_send_per_minute, "분"),
+                (3600.0, self.max_send_per_hour, "시간"),
+            )
+        )
+        self.scheduler = RequestScheduler(self.tr_rate_limiter) # TR 요청과 주문을 우선순위 순서대로 보냄
+        self.tr_pager = TrPager( # 계좌/미체결 연속조회 (요청 중인 페이지는 한번에 1개)
+            lambda func, *args, key=None: self.schedule_request(PRIORITY_ACCOUNT_QUERY, func, *args, key=key),
+            max_in_flight=1,
+        )
+        self.chejan_version = 0 # 체결/잔고 통보를 받을 때마다 1씩 증가
+        self.account_request_version = None # 진행 중인 계좌 조회를 요청할 때의 chejan_version
+        self.account_refresh_version = None # 마지막으로 반영한 계좌 조회의 account_request_version
+        self.account_refreshed_at = None
+        self.account_refresh_max_age = 60.0 # 체결이 없어도 이 시간(초)이 지나면 계좌 조회 (평가금액 갱신)
 
         self.account_num = None # 계좌번호 초기화
-        self.unfinished_order_num_to_info_dict = dict() # 미체결 수량 리스트
-        self.stock_code_to_info_dict = dict()
+        self.order_book = OrderBook(correction_delay=10.0) # 당일 주문 상태 (미체결 매도 주문은 10초 후 정정)
+        self.unfinished_query_sent_at = None # 미체결 조회 첫 페이지를 보낸 시점 (order_book.clock 기준)
+        self.basic_info_cache = BasicInfoCache.load("./basic_info_cache.json") # 당일 opt10001 결과 캐시
+        self.stock_code_to_info_dict = self.basic_info_cache.stock_code_to_info
+        self.pricing = PricingEngine(self.basic_info_cache) # 매도/정정 주문 가격 (유효 호가, 상한가/하한가 안)
 
-        self.scrnum = 5000
         self.using_condition_name = ""
         #self.realtime_reqisted_codes = []
-        self.realtime_reqisted_codes = set()
         self.condition_name_to_condition_idx_dict = dict() # 조건 검색식을 저장해두는 부분
-        self.registed_condition_df = pd.DataFrame(columns=["화면번호", "조건식이름"])
-        self.registed_conditions_list = []
+        self.conditions = ConditionRegistry() # 실시간 등록된 조건식 (조건식 인덱스 -> 화면번호, 조건식이름)
+        self.condition_batcher = ConditionEventBatcher(window=0.005) # 5ms 동안 들어온 편입/이탈을 모아서 처리
+        self.initial_condition_limit: int = self.settings.value("initialConditionLimit", defaultValue=20, type=int) # 조건식 등록 시 이미 만족하는 종목 중 매수 후보 최대 수
+        self.rank_initial_codes = None # (codes) -> 우선순위 순서의 codes, None 이면 서버 순서
 
         # 계좌정보를 담을 dataframe
         self.account_info_df  = pd.DataFrame(
@@ -92,98 +214,126 @@ class KiwoomAPI(QMainWindow, form_class):
         )
         self.is_updated_realtime_watchlist = False
         self.stock_code_to_sell_price_dict = dict()
-        try:
-            self.realtime_watchlist_df = pd.read_pickle("./realtime_watchlist_df.pkl")
-        except FileNotFoundError:
-            self.realtime_watchlist_df = pd.DataFrame(
-                columns=["종목명", "현재가", "평균단가", "목표가", "손절가", "수익률", "매수기반조건식", "보유수량", "매수주문완료여부"]
-            )
-
-        self.registeredTableView
-
-        self.kiwoom = QAxWidget("KHOPENAPI.KHOpenAPICtrl.1") #  kiwoom api activ x 를 연동시키는 방법
+        self.watchlist = WatchlistStore.load_pickle("./realtime_watchlist_df.pkl") # 실시간 감시 종목 (NumPy 배열 기반)
+        self.journal = StateJournal("./state_journal.jsonl") # 마지막 snapshot 이후 상태 변경 기록
+        replayed = self.journal.replay(self.watchlist, self.order_book)
+        logger.info(f"journal 재생 완료: {replayed}건, 감시 종목 {len(self.watchlist)}개, 미체결 주문 {len(self.order_book.open_orders())}개")
+        if self.journal.has_old(): # 지난 실행의 snapshot 저장이 안 끝났으면 재생한 상태로 바로 snapshot 을 다시 저장하고 .old 삭제
+            self.journal.compact(self.watchlist.to_dataframe(), self.order_book, self._save_watchlist_snapshot)
+        self.exit_engine = ExitRuleEngine(self.watchlist) # 손절/익절 조건 일괄 계산
+        self.tick_drain_interval_ms: int = self.settings.value("tickDrainIntervalMs", defaultValue=10, type=int) # 체결 tick 처리 주기 (5~20ms)
+        self.strategy_worker_mode = self.settings.value("strategyWorker", defaultValue=WORKER_OFF, type=str) # off/thread/process
+        self.strategy_worker = None # 켜져 있으면 손절/익절 판단은 worker 에서 하고 GUI 스레드는 tick 전달과 주문만 처리
+        if self.strategy_worker_mode != WORKER_OFF:
+            self.strategy_worker = StrategyWorker(self.strategy_worker_mode)
+            self.strategy_worker.start()
+        self.tick_conflator = TickConflator(is_urgent=self._is_exit_tick if self.strategy_worker is None else None)
+        self.tick_recorder = TickRecorder() if self.settings.value("recordTicks", defaultValue=False, type=bool) else None # 실시간 이벤트 기록 (재생/분석용)
+        self.latency = OrderLatencyTracker() # tick 수신부터 체결까지 주문 단계별 지연
+        self.metrics_port: int = self.settings.value("metricsPort", defaultValue=0, type=int) # 0 이면 metrics 서버 사용 안함
+        self.metrics_server = None
+        self.stats_snapshot = dict() # save_settings 마다 모으는 구성 요소별 현황 (metrics 서버 /stats)
+        if self.metrics_port:
+            try:
+                self.metrics_server = MetricsServer(self.latency, self.metrics_port, stats=lambda: self.stats_snapshot)
+                self.metrics_server.start()
+            except OSError as e:
+                logger.info(f"metrics 서버 시작 실패 (port {self.metrics_port}): {e}")
+                self.metrics_server = None
+
+        # 테이블 뷰 모델은 한번만 만들고 update_pandas_models 에서 바뀐 부분만 갱신
+        self.registed_condition_model = PandasModel(["화면번호", "조건식이름"])
+        self.registeredTableView.setModel(self.registed_condition_model)
+        self.watchlist_model = PandasModel(WATCHLIST_COLUMNS)
+        self.watchListTableView.setModel(self.watchlist_model)
+        self.account_info_version = 0 # account_info_df 가 새로 만들어질 때마다 1씩 증가
+        self.account_info_model = PandasModel(self.account_info_df.columns)
+        self.accountTableView.setModel(self.account_info_model)
+
+        self.kiwoom = broker if broker is not None else KiwoomBackend() #  kiwoom api activ x 를 연동시키는 방법
+        self.screens = ScreenAllocator(on_release=self.kiwoom.disconnect_real_data) # 용도별 화면번호 pool
+        self.master_code_names = MasterCodeNames(self.kiwoom) # 종목명 캐시 (로그인 후 로딩)
+        self.realtime_subscriptions = RealtimeSubscriptionManager( # 실시간 체결 등록 (화면당 최대 100종목)
+            self.kiwoom, lambda: self.screens.lease(POOL_REAL), self.screens.release
+        )
         self._set_signal_slots() # 키움증권 API와 내부 매소드를 연동
         self._login()
 
         self.timer1 = QTimer()
-        self.timer2 = QTimer()
-        self.timer3 = QTimer()
+        self.scheduler_timer = QTimer() # 다음 요청 가능 시점에 한번만 실행
+        self.scheduler_timer.setSingleShot(True)
+        self.condition_timer = QTimer() # 조건검색 편입/이탈 묶음 처리 (첫 이벤트 후 한번만 실행)
+        self.condition_timer.setSingleShot(True)
         self.timer4 = QTimer()
         self.timer5 = QTimer()
         self.timer6 = QTimer()
         self.timer7 = QTimer()
         self.timer8 = QTimer()
+        self.timer9 = QTimer()
 
         self.timer1.timeout.connect(self.update_pandas_models)
-        self.timer2.timeout.connect(self.send_tr_request)
-        self.timer3.timeout.connect(self.send_orders)
+        self.scheduler_timer.timeout.connect(self.run_scheduler)
+        self.condition_timer.timeout.connect(self.flush_condition_events)
         self.timer4.timeout.connect(self.request_get_account_balance)
         self.timer5.timeout.connect(self.request_current_order_info)
         self.timer6.timeout.connect(self.save_settings)
         self.timer7.timeout.connect(self.check_unfinished_orders)
         self.timer8.timeout.connect(self.check_outliers)
+        self.timer8.timeout.connect(self.expire_screens)
+        self.timer9.timeout.connect(self.drain_ticks)
+        if self.kiwoom.poll_interval_ms is not None: # 시뮬레이터 등 poll 이 필요한 backend
+            self.broker_timer = QTimer()
+            self.broker_timer.timeout.connect(self.kiwoom.poll)
+            self.broker_timer.start(self.kiwoom.poll_interval_ms)
 
 
     def check_outliers(self):
-        pop_list = []
-        for row in self.realtime_watchlist_df.itertuples():
-            stock_code = getattr(row, "Index")
-            목표가 = getattr(row, "목표가")
-            손절가 = getattr(row, "손절가")
-            보유수량 = getattr(row, "보유수량")
-
-            # if np.isnan(목표가) or np.isnan(손절가):
-            #     pop_list.append(stock_code)
-            if (isinstance(목표가, (int, float)) and np.isnan(목표가)) or (isinstance(손절가, (int, float)) and np.isnan(손절가)):
-                pop_list.append(stock_code)
-
+        pop_list = self.exit_engine.find_outliers()
         for stock_code in pop_list:
             logger.info(f"종목코드: {stock_code}, Outlier!! Pop!!")
-            self.realtime_watchlist_df.drop(stock_code, inplace=True)
-
-    def check_unfinished_orders(self):
-        pop_list = []
-        for order_num, stock_info_dict in self.unfinished_order_num_to_info_dict.items():
-            주문번호 = order_num["주문번호"]
-            종목코드 = stock_info_dict["종목코드"]
-            주문체결시간 = stock_info_dict["주문체결시간"]
-            미체결수량 = stock_info_dict["미체결수량"]
-            주문가격 = stock_info_dict["주문가격"]
-
-            order_time = datetime.datetime.now().replace(
-                # '시간' 문자열이 "HHMMSS" 형식(예: "153010"은 15시 30분 10초를 의미)으로 제공된다고 가정합니다.
-                hour=int(주문체결시간[:-4]),
-                minute=int(주문체결시간[-4:-2]),
-                second=int(주문체결시간[-2:]),
-            )
-
+            self.watchlist.remove(stock_code)
+            self.journal.append(EVENT_CLOSE, stock_code)
+        self.sync_realtime_subscriptions()
+
+    def expire_screens(self): # 응답이 오지 않은 TR/주문 화면번호 반납
+        self.screens.expire()
+        self.tr_pager.expire()
+
+    def sync_realtime_subscriptions(self): # 감시 종목 + 보유 종목만 실시간 등록 유지 (빠진 종목은 해제)
+        codes = set(self.watchlist.code_list())
+        if self.is_updated_realtime_watchlist:
+            codes.update(self.account_info_df.index)
+        self.realtime_subscriptions.sync(codes)
+
+    def check_unfinished_orders(self): # 정정 시한이 지난 미체결 매도 주문만 꺼내서 정정 (heap 맨 앞만 확인)
+        for order in self.order_book.due():
             # 실 투자시 지정가 매도 주석 처리 TODO: 실 투자시 지정가 매도 주석처리
-            정정주문가격 = self.stock_code_to_sell_price_dict.get(종목코드, None)
-            if not 정정주문가격:
-                logger.info(f"종목코드: {종목코드}, 최우선 매수 호가X 주문 실폐!!")
-                return
+            최우선매수호가 = self.stock_code_to_sell_price_dict.get(order.종목코드, None)
+            if not 최우선매수호가: # 다음 정정 시한에 다시 시도
+                logger.info(f"종목코드: {order.종목코드}, 최우선 매수 호가X 주문 실폐!!")
+                continue
+            정정주문가격 = self.pricing.correction_price(order.종목코드, 최우선매수호가) # 최우선 매수 호가보다 몇 호가 아래
             # basic.info.dict = self.stock_code_to_info_dict.get(종목코드, None)
             # if not basic.info.dict:
             #     logger.info(f"종목코드: {종목코드}, 기본정보X 정정주문 실폐!!")
             #     return
             # 정정주문가격 = basic_info_dict['하한가']
-            if self.now_time - order_time >= datetime.timedelta(seconds=10):
             # if 주문구분 == "매도" and self.now_time - order_time >= datetime.timedelta(seconds=10):
-                # 지정가 매도 주문이후 10초안에 미체결시 시장가 매도 정정 주문
-                logger.info(f"종목코드: {종목코드}, 주문번호: {주문번호}, 지정가 매도 정정 주문!!")
-                self.orders_queue.put(
-                    [
-                        "매도정정주문",
-                        self._get_screen_num(),
-                        self.account_num,
-                        6,
-                        종목코드,
-                        미체결수량,
-                        정정주문가격,
-                        "00",
-                        주문번호,
-                    ]
-                )
+            # 지정가 매도 주문이후 10초안에 미체결시 시장가 매도 정정 주문
+            logger.info(f"종목코드: {order.종목코드}, 주문번호: {order.주문번호}, 지정가 매도 정정 주문!!")
+            self.queue_order(
+                [
+                    "매도정정주문",
+                    "", # 화면번호는 send_orders 에서 할당
+                    self.account_num,
+                    6,
+                    order.종목코드,
+                    order.미체결수량,
+                    정정주문가격,
+                    "00",
+                    order.주문번호,
+                ]
+            )
 
             # 실 투자시 시장가 매도 주석해제 TODO: 실 투자시 시장가 매도 주석해제
             # if self.now_time - order_time >= datetime.timedelta(seconds=10):
@@ -202,10 +352,6 @@ class KiwoomAPI(QMainWindow, form_class):
             #             주문번호,
             #         ]
             #     )
-                pop_list.append(주문번호)
-        for order_num in pop_list:
-            self.unfinished_order_num_to_info_dict.pop(order_num)
-            self.save_settings()
 
     def load_settings(self):
         self.resize(self.settings.value("size", self.size()))
@@ -213,22 +359,53 @@ class KiwoomAPI(QMainWindow, form_class):
         self.buyAmountLineEdit.setText(self.settings.value("buyAmountLineEdit", defaultValue="100000", type=str))
         self.goalReturnLineEdit.setText(self.settings.value("goalReturnLineEdit", defaultValue="2.5", type=str))
         self.stopLossLineEdit.setText(self.settings.value("stopLossLineEdit", defaultValue="-2.5", type=str))
+        try:
+            default = self._read_strategy_params()
+        except ValueError as e:
+            logger.info(f"저장된 매매 설정 오류, 기본값 사용: {e}")
+            default = DEFAULT_PARAMS
+            self._show_strategy_params(default)
+        try:
+            overrides = StrategyConfig.overrides_from_json(self.settings.value("conditionOverrides", defaultValue="", type=str), default)
+            self.strategy_config = StrategyConfig(default, overrides) # 조건식별 목표/손절/매수금액
+        except (ValueError, TypeError) as e:
+            logger.info(f"조건식별 매매 설정 오류, 무시: {e}")
+            self.strategy_config = StrategyConfig(default)
+
+    def _read_strategy_params(self):
+        return parse_params(self.goalReturnLineEdit.text(), self.stopLossLineEdit.text(), self.buyAmountLineEdit.text())
+
+    def _show_strategy_params(self, params):
+        self.goalReturnLineEdit.setText(str(params.goal_return))
+        self.stopLossLineEdit.setText(str(params.stop_loss))
+        self.buyAmountLineEdit.setText(str(params.buy_amount))
+
+    def update_strategy_config(self): # editingFinished: 입력값이 올바를 때만 새 설정으로 교체 (틀리면 이전 값으로 되돌림)
+        try:
+            params = self._read_strategy_params()
+        except ValueError as e:
+            logger.info(f"매매 설정 입력 오류: {e}")
+            self._show_strategy_params(self.strategy_config.default)
+            return
+        if params != self.strategy_config.default:
+            self.strategy_config = self.strategy_config.with_default(params) # 참조만 바꾸므로 다른 스레드는 이전/새 설정 중 하나를 본다
+            logger.info(f"매매 설정 변경: {params}")
 
     def save_pickle(self):
-        self.realtime_watchlist_df.to_pickle("./realtime_watchlist_df.pkl")
-        self.realtime_watchlist_df.to_csv("./realtime_watchlist_df.csv")
+        realtime_watchlist_df = self.watchlist.to_dataframe() # snapshot 만 GUI 스레드에서 만들고 저장은 백그라운드에서
+        self.persistence.submit("./realtime_watchlist_df.pkl", realtime_watchlist_df, write_pickle)
+        self.persistence.submit("./realtime_watchlist_df.csv", realtime_watchlist_df, write_csv)
 
-    def request_current_order_info(self): # 미체결 처리
-        self.tr_req_queue.put([self.get_current_order_info])
+    def request_current_order_info(self, on_complete=None): # 미체결 처리 (연속조회 포함, 모든 페이지를 받으면 on_complete(pages))
+        self.tr_pager.request("opt10075_req", self.get_current_order_info, on_complete)
 
-    def update_pandas_models(self): # registed_condition_df의 DataTable을 보여주는 함수
-        pd_model = PandasModel(self.registed_condition_df) # 조건 검색식 목록 뷰
-        self.registeredTableView.setModel(pd_model)
-        pd_model2 = PandasModel(self.realtime_watchlist_df) # 실시간 조건 검색 편입 목록 뷰
-        self.watchListTableView.setModel(pd_model2)
-        self.account_info_df
-        pd_model3 = PandasModel(self.account_info_df) # 실시간 계좌정보 목록 뷰
-        self.accountTableView.setModel(pd_model3)
+    def update_pandas_models(self): # 조건식/감시 종목/계좌 테이블을 보여주는 함수 (바뀐 것이 없으면 아무것도 안함)
+        if self.registed_condition_model.is_stale(self.conditions.version): # 조건 검색식 목록 뷰
+            self.registed_condition_model.update(self.conditions.to_dataframe(), self.conditions.version)
+        if self.watchlist_model.is_stale(self.watchlist.version): # 실시간 조건 검색 편입 목록 뷰
+            self.watchlist_model.update(self.watchlist.to_dataframe(), self.watchlist.version)
+        if self.account_info_model.is_stale(self.account_info_version): # 실시간 계좌정보 목록 뷰
+            self.account_info_model.update(self.account_info_df, self.account_info_version)
 
     def condition_in(self): # 조건 검색식 편입
         condition_name = self.conditionComboBox.currentText()
@@ -238,7 +415,12 @@ class KiwoomAPI(QMainWindow, form_class):
             return
         else:
             logger.info(f"{condition_name}  실시간 조건 검색 등록 요청!!")
-            self.send_condition(self._get_screen_num(), condition_name, condition_idx, 1)
+            scr_num = self.conditions.screen_of(condition_idx) # 이미 등록된 조건식이면 기존 화면번호로 다시 요청
+            if scr_num is None:
+                scr_num = self._get_screen_num(POOL_CONDITION, condition_idx)
+            if scr_num is None:
+                return
+            self.send_condition(scr_num, condition_name, condition_idx, 1)
 
     def condition_out(self): # 조건 검색식 편출
         condition_name = self.conditionComboBox.currentText()
@@ -246,9 +428,9 @@ class KiwoomAPI(QMainWindow, form_class):
         if not condition_idx:
             logger.info(f"잘못된 조건 검색식 이름! 다시 선택하세요!!")
             return
-        elif condition_idx in self.registed_condition_df.index:
+        elif condition_idx in self.conditions:
             logger.info(f"{condition_name}  실시간 조건 검색 편출!!")
-            self.registed_condition_df.drop(condition_idx, inplace=True)
+            self.send_condition_stop(self.conditions.unregister(condition_idx), condition_name, condition_idx)
         else:
             logger.info(f"조건식 편출 실패")
             return
@@ -258,6 +440,7 @@ class KiwoomAPI(QMainWindow, form_class):
         self.kiwoom.OnReceiveRealData.connect(self._receive_realdata)
         self.kiwoom.OnReceiveConditionVer.connect(self._receive_condition)
         self.kiwoom.OnReceiveRealCondition.connect(self._receive_real_condition)
+        self.kiwoom.OnReceiveTrCondition.connect(self._receive_tr_condition)
         self.kiwoom.OnReceiveTrData.connect(self.receive_tr_data)
         self.kiwoom.OnReceiveChejanData.connect(self.receive_chejandata)
         self.kiwoom.OnReceiveMsg.connect(self.receive_msg)
@@ -265,38 +448,62 @@ class KiwoomAPI(QMainWindow, form_class):
     def receive_msg(self, sScrNo, sRQName, sTrCode, sMsg):
         logger.info(f"Received MSG: 화면번호: {sScrNo}, 사용자 구분명: {sRQName}, TR이름: {sTrCode}, 메세지: {sMsg}")
 
-    def get_current_order_info(self):
+    def get_current_order_info(self, next=0): # next: 0 첫 조회, 2 연속 조회
         self.set_input_value("계좌번호", self.account_num)
-        self.set_input_value("체결구분", "1")
+        self.set_input_value("전체종목구분", "0")
         self.set_input_value("매매구분", "0")
-        self.comm_rq_data("opw00075_req", "opw00075", 0, self._get_screen_num())
+        self.set_input_value("종목코드", "")
+        self.set_input_value("체결구분", "1")
+        sent_at = self.order_book.clock()
+        sent = self.comm_rq_data("opt10075_req", "opt10075", next, self._get_screen_num())
+        if sent and next == 0:
+            self.unfinished_query_sent_at = sent_at
+        return sent
+
+    def request_get_account_balance(self, on_complete=None): # 계좌정보를 5초에 한번 요청 (마지막 조회 이후 체결이 없으면 건너뜀)
+        if on_complete is None and not self._is_account_stale():
+            return
+        if "opw00018_req" not in self.tr_pager:
+            self.account_request_version = self.chejan_version
+        self.tr_pager.request("opw00018_req", self.get_account_balance, on_complete)
 
-    def request_get_account_balance(self): #
-        self.tr_req_queue.put([self.get_account_balance]) # 계좌정보를 10초에 한번 요청
+    def _is_account_stale(self):
+        if self.account_refresh_version != self.chejan_version or self.account_refreshed_at is None:
+            return True
+        return time.monotonic() - self.account_refreshed_at >= self.account_refresh_max_age
+
+    def schedule_request(self, priority, request_func, *func_args, key=None): # TR요청/주문을 scheduler 에 등록
+        self.scheduler.submit(priority, request_func, *func_args, key=key)
+        self._arm_scheduler()
+
+    def _arm_scheduler(self): # 다음 요청 가능 시점에 run_scheduler 가 실행되도록 예약
+        delay = self.scheduler.next_delay()
+        if delay is None:
+            return
+        self.scheduler_timer.start(int(delay * 1000) + 1 if delay > 0 else 0)
 
-    def send_tr_request(self): # TR요청 진행
+    def run_scheduler(self): # TR요청 진행
         self.now_time = datetime.datetime.now()
-        if self.is_check_tr_req_condition() and not self.tr_req_queue.empty():
-            request_func, *func_args = self.tr_req_queue.get()
-            logger.info(f"Excuting TR request function: {request_func}")
-            request_func(*func_args) if func_args else request_func()
-            self.last_tr_send_times.append(self.now_time)
+        try:
+            self.scheduler.dispatch()
+        finally: # 요청 함수에서 예외가 나도 남은 요청은 계속 진행
+            self._arm_scheduler()
 
     def get_account_info(self): # 계좌번호를 받아오는 함수
-        account_nums = str(self.kiwoom.dynamicCall("GetLoginInfo(QString)", ["ACCNO"]).rstrip(';'))
+        account_nums = str(self.kiwoom.get_login_info("ACCNO").rstrip(';'))
         logger.info(f"계좌번호 리스트: {account_nums}")
         self.account_num = account_nums.split(';')[0]
         logger.info(f"사용 계좌 번호: {self.account_num}")
         self.accountNumComboBox.addItems([x for x in account_nums.split(';') if x != '']) # 콤보 박스에 split해서 넣어준다
 
-    def get_account_balance(self): # 계좌 정보 조회
-        if self.is_check_tr_req_condition():
-            self.set_input_value("계좌번호", self.accountNumComboBox.currentText())
-            self.set_input_value("계좌번호", self.account_num)
-            self.set_input_value("비밀번호", "")
-            self.set_input_value("비밀번호입력매체구분", "00")
-            # self.comm_rq_data("opw00018_req", "opw00018", 0, self._get_screen_num())
-            self.comm_rq_data("opw00018_req", "opw00018", 0, self._get_screen_num())
+    def get_account_balance(self, next=0): # 계좌 정보 조회 (요청 제한은 scheduler 에서 확인)
+        logger.info(f"Excuting TR request function: get_account_balance")
+        self.set_input_value("계좌번호", self.accountNumComboBox.currentText())
+        self.set_input_value("계좌번호", self.account_num)
+        self.set_input_value("비밀번호", "")
+        self.set_input_value("비밀번호입력매체구분", "00")
+        # self.comm_rq_data("opw00018_req", "opw00018", 0, self._get_screen_num())
+        return self.comm_rq_data("opw00018_req", "opw00018", next, self._get_screen_num())
 
 
     def receive_tr_data(self, sScrNo, sRQName, sTrCode, sRecordName, sPrevNext, nDataLength, sErrorCode, sMessage,
@@ -311,64 +518,82 @@ class KiwoomAPI(QMainWindow, form_class):
         )
         try:
             if sRQName == "opw00018_req":
-                self.on_opw00018_req(sTrCode, sRQName)
+                self.on_opw00018_req(sTrCode, sRQName, sPrevNext)
             elif sRQName == "opt10075_req":
-                self.on_opt10075_req(sTrCode, sRQName)
+                self.on_opt10075_req(sTrCode, sRQName, sPrevNext)
             elif sRQName == "opt10001_req":
                 self.on_opt10001_req(sTrCode, sRQName)
         except Exception as e:
             logger.exception(e)
+        finally:
+            self.screens.release(sScrNo) # TR/주문 응답이 왔으므로 화면번호 반납
 
 
-    def get_basic_stock_info(self, stock_code):
-        if self.is_check_tr_req_condition():
-            self.set_input_value("종목코드", stock_code)
-            self.comm_rq_data(f"opt10001_req", "opt10001", 0, self._get_screen_num())
+    def request_basic_stock_info(self, stock_code): # 당일 캐시에 없고 요청 중이 아닐 때만 opt10001 요청
+        if not self.basic_info_cache.should_request(stock_code):
+            return
+        self.schedule_request(PRIORITY_BASIC_INFO, self.get_basic_stock_info, stock_code, key=("opt10001", stock_code))
+
+    def get_basic_stock_info(self, stock_code): # 요청 제한은 scheduler 에서 확인
+        logger.info(f"Excuting TR request function: get_basic_stock_info({stock_code})")
+        self.set_input_value("종목코드", stock_code)
+        return self.comm_rq_data(f"opt10001_req", "opt10001", 0, self._get_screen_num())
 
     def get_chejandata(self, nFid):
-        ret = self.kiwoom.dynamicCall("GetChejanData(int)", nFid)
+        ret = self.kiwoom.get_chejan_data(nFid)
         return ret
 
     def receive_chejandata(self, sGubun, nItemCnt, sFIdList): #  실시간 체결 결과 요청 함수(체결 접수와 체결 결과)
         # sGubun: 체결구분 접수와 체결시 '0'값, 국내주식 잔고변경은 '1'값, 파생잔고변경은 '4'
+        chejan = decode_chejan(self.get_chejandata, sGubun, sFIdList, keep_raw=self.tick_recorder is not None) # FID 마다 한번씩만 읽음
+        self.chejan_version += 1 # 다음 계좌 조회는 건너뛰지 않음
+        if self.tick_recorder is not None:
+            self.tick_recorder.record_chejan(sGubun, chejan.raw)
         if sGubun == "0":
-            종목코드 = self.get_chejandata(9001).replace("A", "").strip()
-            종목명 = self.get_chejandata(302).strip()
-            주문체결시간 = self.get_chejandata(908).strip()
-            주문수량 = 0 if len(self.get_chejandata(900)) == 0 else int (self.get_chejandata(900))
-            주문가격 = 0 if len(self.get_chejandata(901)) == 0 else int (self.get_chejandata(901))
-            체결수량 = 0 if len(self.get_chejandata(911)) == 0 else int (self.get_chejandata(911))
-            체결가격 = 0 if len(self.get_chejandata(910)) == 0 else int (self.get_chejandata(910))
-            미체결수량 = 0 if len(self.get_chejandata(902)) == 0 else int (self.get_chejandata(902))
-            주문구분 = self.get_chejandata(905).replace("+", "").replace("-", "").strip()
-            매매구분 = self.get_chejandata(906).strip()
-            단위체결가 = 0 if len(self.get_chejandata(914)) == 0 else int (self.get_chejandata(914))
-            단위체결량 = 0 if len(self.get_chejandata(915)) == 0 else int (self.get_chejandata(915))
-            원주문번호 = self.get_chejandata(904).strip()
-            주문번호 = self.get_chejandata(9203).strip()
-            logger.info(f" Receive chejandata! 주문체결시간: {주문체결시간}, 종목코드: {종목코드}, "
-                        f"종목명: {종목명}, 주문수량: {주문수량}, 주문가격: {주문가격}, 체결수량: {체결수량}, 체결가격: {체결가격}, "
-                        f"주문구분: {주문구분}, 미체결수량: {미체결수량}, 매매구분: {매매구분}, 단위체결가: {단위체결가}, "
-                        f"단위체결량: {단위체결량}, 주문번호: {주문번호}, 원주문번호: {원주문번호}")
-            if 주문구분 == "매수" and 체결수량 > 0:
-                self.realtime_watchlist_df.loc[종목코드, "보유수량"] = 체결수량
-
-
-            if 주문구분 in ("매도", "매도정정"): # 미체결 주문 처리
-                self.unfinished_order_num_to_info_dict[주문번호] = dict(
-                    종목코드=종목코드,
-                    미체결수량=미체결수량,
-                    주문가격=주문가격,
-                    주문체결시간=주문체결시간,
-                )
-                if 미체결수량 == 0: # 미체결수량이 '0'이면 모두체결된 것이므로 unfinished_order_num_to_info_dict에서 제거
-                    self.unfinished_order_num_to_info_dict.pop(주문번호)
-
-        if sGubun == 1:
-            logger.info("잔고통보")
+            self.on_order_chejan(chejan)
+        elif sGubun == "1":
+            self.on_balance_chejan(chejan)
+
+    def on_order_chejan(self, chejan): # 주문 접수/체결 통보
+        종목코드 = chejan.종목코드
+        주문번호 = chejan.주문번호
+        if chejan.주문상태 == "접수":
+            self.latency.accepted(종목코드, 주문번호)
+        elif chejan.체결수량 > 0:
+            self.latency.filled(주문번호)
+        logger.info(f" Receive chejandata! 주문체결시간: {chejan.주문체결시간}, 종목코드: {종목코드}, "
+                    f"종목명: {chejan.종목명}, 주문수량: {chejan.주문수량}, 주문가격: {chejan.주문가격}, 체결수량: {chejan.체결수량}, 체결가격: {chejan.체결가격}, "
+                    f"주문구분: {chejan.주문구분}, 미체결수량: {chejan.미체결수량}, 매매구분: {chejan.매매구분}, 단위체결가: {chejan.단위체결가}, "
+                    f"단위체결량: {chejan.단위체결량}, 주문번호: {주문번호}, 원주문번호: {chejan.원주문번호}")
+        if chejan.주문구분 == "매수" and chejan.체결수량 > 0 and 종목코드 in self.watchlist:
+            self.watchlist.set(종목코드, "보유수량", chejan.체결수량)
+            self.journal.append(EVENT_FILL, 종목코드, 보유수량=chejan.체결수량)
+            self.exit_engine.reset(종목코드)
+
+        order = self.order_book.apply_chejan( # 주문 상태 갱신 (정정/취소 주문이면 원주문 종료)
+            주문번호, 종목코드, chejan.주문구분, chejan.주문상태, chejan.주문수량, chejan.주문가격, chejan.미체결수량,
+            chejan.체결수량, chejan.체결가격, chejan.주문체결시간, chejan.원주문번호,
+        )
+        if order.is_open:
+            self.journal.append(EVENT_UNFINISHED, 종목코드, **order.to_journal())
+        else:
+            self.journal.append(EVENT_UNFINISHED_DONE, 종목코드, 주문번호=주문번호)
+        original = self.order_book.get(order.원주문번호) if order.원주문번호 else None
+        if original is not None and not original.is_open:
+            self.journal.append(EVENT_UNFINISHED_DONE, 종목코드, 주문번호=original.주문번호)
+
+    def on_balance_chejan(self, chejan): # 잔고통보: 보유수량/매입단가를 watchlist 에 바로 반영 (매도 후 남은 수량 포함)
+        logger.info(f"잔고통보 종목코드: {chejan.종목코드}, 보유수량: {chejan.보유수량}, 매입단가: {chejan.매입단가}, 주문가능수량: {chejan.주문가능수량}")
+        row = self.watchlist.row_of(chejan.종목코드)
+        if row is None:
+            return
+        평균단가 = chejan.매입단가 if chejan.매입단가 > 0 else self.watchlist.get_at(row, "평균단가")
+        self.watchlist.set_at(row, "보유수량", chejan.보유수량)
+        self.watchlist.set_at(row, "평균단가", 평균단가)
+        self.journal.append(EVENT_AVG_PRICE, chejan.종목코드, 평균단가=평균단가, 보유수량=chejan.보유수량)
 
     def _login(self):
-        ret = self.kiwoom.dynamicCall("CommConnect()")
+        ret = self.kiwoom.comm_connect()
         if ret == 0:
             logger.info("로그인 창 열기 성공!!")
 
@@ -382,19 +607,19 @@ class KiwoomAPI(QMainWindow, form_class):
     def _after_login(self): # 로그인이 끝나면 바로 실행되는 함수
         self.get_account_info()
         logger.info("조건 검색 정보 요청")
-        self.kiwoom.dynamicCall("GetConditionLoad()") # 조건 검색 정보 요청
+        self.kiwoom.get_condition_load() # 조건 검색 정보 요청
+        self.master_code_names.load() # 편입 이벤트마다 GetMasterCodeName 을 부르지 않도록 미리 읽어둠
 
         self.timer1.start(300) # 0.3초마다 한번 실행
-        self.timer2.start(10) # 0.01초마다 한번 실행
-        self.timer3.start(10) # 0.01초마다 한번 실행
         self.timer4.start(5000) # 5초마다 한번 실행
         self.timer5.start(60000) # 60초마다 한번 실행
         self.timer6.start(30000) # 30초마다 한번 실행
         self.timer7.start(100) # 0.1초마다 한번 실행
         self.timer8.start(1000)  # 1초마다 한번 실행
+        self.timer9.start(self.tick_drain_interval_ms) # 모아둔 체결 tick 처리
 
     def _receive_condition(self): # 조건 검색식 받는 함수
-        condition_info = self.kiwoom.dynamicCall("GetConditionNameList()").split(';')
+        condition_info = self.kiwoom.get_condition_name_list().split(';')
         for condition_name_idx_str in condition_info:
             if len(condition_name_idx_str) == 0:
                 continue
@@ -405,27 +630,28 @@ class KiwoomAPI(QMainWindow, form_class):
             #     self.send_condition(self._get_screen_num(), condition_name, condition_idx, 1)
         self.conditionComboBox.addItems(self.condition_name_to_condition_idx_dict.keys())
 
-    def _get_screen_num(self): # 실시간 화면 번호를 만드는 함수
-        self.scrnum += 1 # 화면 번호 요청시 1씩 더해지며 화면 번호를 만든다
-        if self.scrnum > 5150: # 5150을 초과하면 5000으로 초기화
-            self.scrnum = 5000
-        return str(self.scrnum)
+    def _get_screen_num(self, pool=POOL_TR, owner=None): # 용도별 pool 에서 화면번호를 빌려옴 (응답이 오거나 시간이 지나면 반납, 없으면 None)
+        return self.screens.lease(pool, owner)
 
     def send_condition(self, scr_Num, condition_name, condition_idx, n_search): # 조건 검색식 등록
         # n_search : 조회구분 0:조건검색만, 1:조건검색+실시간 조건검색
-        result = self.kiwoom.dynamicCall(
-            "SendCondition(QString, QString, int, int)",
-            scr_Num, condition_name, condition_idx, n_search
-        )
+        result = self.kiwoom.send_condition(scr_Num, condition_name, condition_idx, n_search)
+        registered_screen = self.conditions.screen_of(condition_idx)
         if result == 1:
             logger.info(f"{condition_name} 조건 검색 등록!!")
-            self.registed_condition_df.loc[condition_idx] = {"화면번호": scr_Num, "조건식이름": condition_name}
-            self.registed_conditions_list.append(condition_name)
-        elif result != 1 and condition_name in self.registed_conditions_list:
+            previous_screen = self.conditions.register(condition_idx, scr_Num, condition_name)
+            if previous_screen is not None and previous_screen != scr_Num: # 다른 화면번호로 다시 등록되면 이전 화면 반납
+                self.screens.release(previous_screen)
+        elif result != 1 and self.conditions.has_name(condition_name):
             logger.info(f"{condition_name} 조건검색 이미 등록 완료!!")
-            self.registed_condition_df.loc[condition_idx] = {"화면번호": scr_Num, "조건식이름": condition_name}
+            if registered_screen is None:
+                self.conditions.register(condition_idx, scr_Num, condition_name)
+            elif registered_screen != scr_Num: # 기존 화면번호 유지
+                self.screens.release(scr_Num)
         else:
             logger.info(f"{condition_name} 조건 검색 등록 실패!!")
+            if registered_screen != scr_Num: # 등록되어 있던 화면은 계속 사용
+                self.screens.release(scr_Num)
 
     def send_condition_stop(self, scr_Num, condition_name, condition_idx): # 조건 검색식 실시간 해제
         logger.info(f"{condition_name} 조건 검색 실시간 해제!!")
@@ -433,6 +659,8 @@ class KiwoomAPI(QMainWindow, form_class):
         #     "SendConditionStop(QString, QString, int)",
         #     scr_Num, condition_name, condition_idx
         # )
+        self.kiwoom.send_condition_stop(scr_Num, condition_name, condition_idx)
+        self.screens.release(scr_Num)
 
     def _receive_real_condition(self, strCode, strType, strConditionName, strConditionIndex): # 실시간 검색된 종묵을 편입 또는 이탈
         # strType: 이벤트 종류, "I":종목편입, "D":종목 이탈
@@ -440,29 +668,62 @@ class KiwoomAPI(QMainWindow, form_class):
         # strConditionIndex: 조건식 인덱스
 
         logger.info(f"Received real condition, {strCode}, {strType}, {strConditionName}, {strConditionIndex}")
-        if strConditionIndex.zfill(3) not in self.registed_condition_df.index.to_list():
+        if self.tick_recorder is not None:
+            self.tick_recorder.record_condition(strCode, strType, strConditionIndex, strConditionName)
+        if strConditionIndex.zfill(3) not in self.conditions:
             logger.info(f"조건명: {strConditionName}, 편입 조건식에 해당 안됨 Pass")
             return
-
-        if strType == "I" and strCode not in self.realtime_watchlist_df.index.to_list():
-            if strCode not in self.realtime_reqisted_codes:
-                self.register_code_to_realtime_list(strCode) # 실시간 체결 등록
-            name = self.kiwoom.dynamicCall("GetMasterCodeName(QString)", [strCode])  # 종목코드에 해당하는 종목명을 전달
-
-            self.realtime_watchlist_df.loc[strCode] = {
-                '종목명': name,
-                '현재가': None,
-                '평균단가': None,
-                '목표가': None,
-                '손절가': None,
-                '수익률': None,
-                '매수기반조건식': strConditionName,
-                '보유수량': 0,
-                '매수주문완료여부': False,
-            }
-            self.tr_req_queue.put([self.get_basic_stock_info, strCode])
+        if self.condition_batcher.push(strCode, strType, strConditionName): # 묶음의 첫 이벤트면 처리 예약
+            self.condition_timer.start(int(self.condition_batcher.window * 1000))
+
+    def _receive_tr_condition(self, sScrNo, strCodeList, strConditionName, nIndex, nNext): # SendCondition 직후 이미 조건을 만족하는 종목 목록
+        # strCodeList: "종목코드1;종목코드2;..." , nNext: 연속조회 여부 (2: 연속 데이터 있음)
+        condition_idx = str(nIndex).zfill(3)
+        codes = strCodeList.split(";")
+        logger.info(f"조건검색 초기 결과 {strConditionName}: {sum(1 for code in codes if code)}종목, nNext: {nNext}")
+        if condition_idx not in self.conditions:
+            logger.info(f"조건명: {strConditionName}, 등록된 조건식이 아님 Pass")
+            return
+        candidates = select_initial_candidates(
+            codes, self.initial_condition_limit, exclude=self.watchlist.code_to_row, rank=self.rank_initial_codes
+        )
+        self.add_condition_entries([(code, strConditionName) for code in candidates])
+
+    def flush_condition_events(self): # 모아둔 편입/이탈을 실시간 등록 한번, watchlist 추가 한번으로 처리
+        entered, exited = self.condition_batcher.drain()
+        self.add_condition_entries(entered)
+        if exited:
+            self.drop_exited_codes(exited)
+
+    def add_condition_entries(self, entries): # [(종목코드, 조건식이름), ...] 중 새 종목을 한번에 감시 시작
+        new_entries = [(code, condition_name) for code, condition_name in entries if code not in self.watchlist]
+        if new_entries:
+            codes = [code for code, _ in new_entries]
+            names = [self.master_code_names.get(code) for code in codes]
+            condition_names = [condition_name for _, condition_name in new_entries]
+            self.register_codes_to_realtime_list(codes) # 실시간 체결 등록 (화면당 SetRealReg 한번)
+            self.watchlist.add_many(codes, names, condition_names)
+            self.journal.append_many(EVENT_ENTRY, [
+                (code, dict(종목명=name, 매수기반조건식=condition_name))
+                for code, name, condition_name in zip(codes, names, condition_names)
+            ])
+            for code in codes:
+                self.request_basic_stock_info(code)
             # TODO:매수 주문 진행
 
+    def drop_exited_codes(self, codes): # 조건 이탈 종목 중 아직 매수 주문을 내지 않은 종목만 감시 종료 (보유/주문 종목은 유지)
+        dropped = []
+        for code in codes:
+            row = self.watchlist.row_of(code)
+            if row is None or self.watchlist.get_at(row, "매수주문완료여부") or self.watchlist.get_at(row, "보유수량") > 0:
+                continue
+            self.watchlist.remove(code)
+            dropped.append(code)
+        if dropped:
+            self.journal.append_many(EVENT_CLOSE, [(code, dict()) for code in dropped])
+            logger.info(f"조건 이탈로 감시 종료: {len(dropped)}종목")
+            self.sync_realtime_subscriptions()
+
 
         # logger.info(f"Received real condition, {strCode}, {strType}, {strConditionName}, {strConditionIndex}")
         # if strConditionIndex.zfill(3) not in self.registered_condition_df.index.to_list():
@@ -487,125 +748,26 @@ class KiwoomAPI(QMainWindow, form_class):
 
     def get_comm_realdata(self, strCode, nFid):
         # 실시간시세 데이터 수신 이벤트인 OnReceiveRealData() 가 발생될때 실시간데이터를 얻어오는 함수입니다.
-        return self.kiwoom.dynamicCall("GetCommRealData(QString, int)", strCode, nFid)
+        return self.kiwoom.get_comm_real_data(strCode, nFid)
 
     def _receive_realdata(self, sJongmokCode, sRealType, sRealData): # 실시간으로 주식 체결을 체크하는 함수
         if sRealType == "주식체결":
             self.now_time = datetime.datetime.now()
             now_price = int(self.get_comm_realdata(sRealType, 10).replace('-', '')) # 현재가
             최우선매수호가 = int(self.get_comm_realdata(sRealType, 28).replace('-', '')) # 최우선 매수 호가
-            self.stock_code_to_sell_price_dict[sJongmokCode] = 최우선매수호가
-
-            if sJongmokCode in self.realtime_watchlist_df.index.to_list():
-                if not self.realtime_watchlist_df.loc[sJongmokCode, "매수주문완료여부"]:
-                    goal_price = now_price * (1 + float(self.goalReturnLineEdit.text()) / 100)
-                    stoploss_price = now_price * (1 + float(self.stopLossLineEdit.text()) / 100)
-                    self.realtime_watchlist_df.loc[sJongmokCode, "목표가"] = goal_price
-                    self.realtime_watchlist_df.loc[sJongmokCode, "손절가"] = stoploss_price
-                    order_amount = int(self.buyAmountLineEdit.text()) // now_price
-
-                    # if self.current_available_buy_amount_krw < int(self.buyAmountLineEdit.text()):
-                    #     logger.info(f"주문 가능 금액: {self.current_available_buy_amount_krw: ,}원: 금액 부족으로 매수 X")
-                    #     return
-                    # order_amount = int(self, buyAmountLineEdit.text()) // now_price
-
-                    if order_amount < 1:
-                        logger.info(f"종목코드: {sJongmokCode}, 주문 수량 부족으로 매수 진행 안됨!!")
-                        return
-                    self.orders_queue.put(
-                        [
-                            "시장가매수주문",
-                            self._get_screen_num(),
-                            self.accountNumComboBox.currentText(),
-                            1,
-                            sJongmokCode,
-                            order_amount,
-                            "",
-                            "03",
-                            "",
-                        ],
-                    )
-                    self.realtime_watchlist_df.loc[sJongmokCode, "매수주문완료여부"] = True
-                self.realtime_watchlist_df.loc[sJongmokCode, "현재가"] = now_price
-                mean_buy_price = self.realtime_watchlist_df.loc[sJongmokCode, "평균단가"]
-                if mean_buy_price is not None:
-                    self.realtime_watchlist_df.loc[sJongmokCode, "수익률"] = round(
-                        (now_price - mean_buy_price) / mean_buy_price * 100 - 0.21,
-                        2,
-                    )
-
-                보유수량 = int(copy.deepcopy(self.realtime_watchlist_df.loc[sJongmokCode, "보유수량"]))
-                if 보유수량 > 0 and now_price < self.realtime_watchlist_df.loc[sJongmokCode, '손절가']:
-                    logger.info(f"종목코드: {sJongmokCode} 매도 진행!! (손절)")
-                    # basic_info_dict = self.stock_code_to_info_dict.get(sJongmokCode, None)
-                    # if not basic_info_dict:
-                    #     logger.info(f"종목코드: {sJongmokCode}, 기본정보X 정정주문 실폐!!")
-                    #     return
-                    # 주문가격 = basic_info_dict['하한가']
-
-                    주문가격 = self.stock_code_to_sell_price_dict.get(sJongmokCode, None)
-                    if not 주문가격:
-                        logger.info(f"종목코드: {sJongmokCode}, 최우선 매수 호가X 주문 실폐!!")
-                        return
-
-                    self.orders_queue.put(
-                        [
-                            "매도주문",
-                            self._get_screen_num(),
-                            self.account_num,
-                            2,
-                            sJongmokCode,
-                            보유수량,
-                            주문가격,
-                            "00",
-                            "",
-                        ]
-                    )
-
-                    # 실투자시 시장가 매도 주석해제
-                    # logger.info(f"종목코드: {sJongmokCode} 시장가 매도 진행!!")
-                    # self.orders_queue.put(
-                    #     [
-                    #         "시장가매도주문",
-                    #         self._get_screen_num(),
-                    #         self.account_num,
-                    #         2,
-                    #         sJongmokCode,
-                    #         self.realtime_watchlist_df.loc[sJongmokCode, "보유수량"],
-                    #         "",
-                    #         "03",
-                    #         "",
-                    #     ],
-                    # )
-                    # self.registed_condition_df.drop(sJongmokCode, inplace=True) #체결 완료시 drop으로 registed_condition_df에서 삭제
-                    # registed_condition_df에서 sJongmokCode가 존재하는지 확인 후 삭제
-                    if sJongmokCode in self.registed_condition_df.index:
-                        self.registed_condition_df.drop(sJongmokCode, inplace=True)
-
-                elif 보유수량 > 0 and now_price > self.realtime_watchlist_df.loc[sJongmokCode, "목표가"]:
-                    logger.info(f"종목코드: {sJongmokCode} 매도 진행(익절 )!!")
-
-                    self.orders_queue.put(
-                        [
-                            "지정가매도주문",
-                            self._get_screen_num(),
-                            self.account_num,
-                            2,
-                            sJongmokCode,
-                            보유수량,
-                            now_price,
-                            "00",
-                            "",
-                        ],
-                    )
-                    # self.registed_condition_df.drop(sJongmokCode, inplace=True) #체결 완료시 drop으로 registed_condition_df에서 삭제
-                    # registed_condition_df에서 sJongmokCode가 존재하는지 확인 후 삭제
-                    if sJongmokCode in self.registed_condition_df.index:
-                        self.registed_condition_df.drop(sJongmokCode, inplace=True)
-                    else:
-                        logger.info(f"종목코드: {sJongmokCode}는 registed_condition_df에 존재하지 않음. 삭제 스킵.")
-
-
+            if sJongmokCode in self.watchlist:
+                self.latency.tick_received(sJongmokCode)
+            if self.strategy_worker is not None:
+                self.strategy_worker.push_tick(sJongmokCode, now_price, 최우선매수호가, self.latency.now())
+            if self.tick_recorder is not None:
+                self.tick_recorder.record_tick(
+                    sJongmokCode, now_price, self.get_comm_realdata(sRealType, 12), self.get_comm_realdata(sRealType, 20), 최우선매수호가
+                )
+            if self.tick_conflator.push(sJongmokCode, now_price, 최우선매수호가): # 손절/익절 가격을 넘은 tick 은 바로 처리
+                self.stock_code_to_sell_price_dict[sJongmokCode] = 최우선매수호가
+                self._apply_tick(sJongmokCode, now_price)
+                self.process_exit_signals()
+                self.latency.end_batch()
 
             # if sJongmokCode in self.realtime_watchlist_df.index.to_list():
             #     if not self.realtime_watchlist_df.loc[sJongmokCode, "매수주문완료여부"]:
@@ -654,19 +816,197 @@ class KiwoomAPI(QMainWindow, form_class):
             #
             #         )
 
-    def send_orders(self): # 주문을 보내는 함수
-        self.now_time = datetime.datetime.now()
+    def drain_ticks(self): # 종목별 최신 tick 만 모아서 한번에 처리
+        ticks = self.tick_conflator.drain()
+        for sJongmokCode, now_price, 최우선매수호가 in ticks:
+            self.stock_code_to_sell_price_dict[sJongmokCode] = 최우선매수호가
+            self._apply_tick(sJongmokCode, now_price)
+        if self.strategy_worker is not None:
+            self.strategy_worker.sync_positions(self.watchlist)
+            self.process_worker_intents()
+        elif ticks:
+            self.process_exit_signals()
+        self.latency.end_batch()
+
+    def process_worker_intents(self): # worker 가 보낸 손절/익절 매도 의도를 주문으로 등록
+        for kind, sJongmokCode, now_price, 최우선매수호가, 보유수량, decided_at in self.strategy_worker.drain_intents():
+            row = self.watchlist.row_of(sJongmokCode)
+            if row is None or self.watchlist.get_at(row, "보유수량") <= 0: # worker 가 판단한 뒤 청산된 종목
+                continue
+            if 최우선매수호가 > 0:
+                self.stock_code_to_sell_price_dict[sJongmokCode] = 최우선매수호가
+            self.watchlist.set_at(row, "현재가", now_price)
+            self.latency.tick_applied(sJongmokCode)
+            if kind == KIND_STOP_LOSS:
+                self.queue_exit_orders([sJongmokCode], [], decided_at)
+            else:
+                self.queue_exit_orders([], [sJongmokCode], decided_at)
+
+    def _is_exit_tick(self, sJongmokCode, now_price): # 보유 종목의 현재가가 손절가/목표가를 넘었는지 확인
+        row = self.watchlist.row_of(sJongmokCode)
+        if row is None or self.watchlist.get_at(row, "보유수량") <= 0:
+            return False
+        손절가 = self.watchlist.get_at(row, "손절가")
+        목표가 = self.watchlist.get_at(row, "목표가")
+        return (손절가 is not None and now_price < 손절가) or (목표가 is not None and now_price > 목표가)
+
+    def _apply_tick(self, sJongmokCode, now_price): # 체결 tick 을 watchlist 에 반영 (첫 tick 이면 매수 주문)
+        row = self.watchlist.row_of(sJongmokCode)
+        if row is None:
+            return
+        self.latency.tick_applied(sJongmokCode)
+        if not self.watchlist.get_at(row, "매수주문완료여부"):
+            params = self.strategy_config.params_for(self.watchlist.get_at(row, "매수기반조건식"))
+            goal_price = now_price * (1 + params.goal_return / 100)
+            stoploss_price = now_price * (1 + params.stop_loss / 100)
+            self.watchlist.set_at(row, "목표가", goal_price)
+            self.watchlist.set_at(row, "손절가", stoploss_price)
+            order_amount = params.buy_amount // now_price
+
+            # if self.current_available_buy_amount_krw < int(self.buyAmountLineEdit.text()):
+            #     logger.info(f"주문 가능 금액: {self.current_available_buy_amount_krw: ,}원: 금액 부족으로 매수 X")
+            #     return
+            # order_amount = int(self, buyAmountLineEdit.text()) // now_price
+
+            if order_amount < 1:
+                logger.info(f"종목코드: {sJongmokCode}, 주문 수량 부족으로 매수 진행 안됨!!")
+                return
+            self.queue_order(
+                [
+                    "시장가매수주문",
+                    "", # 화면번호는 send_orders 에서 할당
+                    self.accountNumComboBox.currentText(),
+                    1,
+                    sJongmokCode,
+                    order_amount,
+                    "",
+                    "03",
+                    "",
+                ],
+            )
+            self.watchlist.set_at(row, "매수주문완료여부", True)
+            self.journal.append(EVENT_BUY_ORDER, sJongmokCode, 목표가=goal_price, 손절가=stoploss_price)
+        self.watchlist.set_at(row, "현재가", now_price)
+        mean_buy_price = self.watchlist.get_at(row, "평균단가")
+        if mean_buy_price is not None:
+            self.watchlist.set_at(row, "수익률", round(
+                (now_price - mean_buy_price) / mean_buy_price * 100 - 0.21,
+                2,
+            ))
+
+    def process_exit_signals(self): # 보유 종목 전체 손절/익절 조건을 한번에 계산하고 매도 주문을 넣는 함수
+        signals = self.exit_engine.evaluate()
+        self.queue_exit_orders(signals.stop_loss, signals.take_profit, self.latency.now())
+        return signals
+
+    def queue_exit_orders(self, stop_loss, take_profit, decided_at): # 손절/익절 종목 매도 주문 등록
+        for sJongmokCode in stop_loss:
+            logger.info(f"종목코드: {sJongmokCode} 매도 진행!! (손절)")
+            # basic_info_dict = self.stock_code_to_info_dict.get(sJongmokCode, None)
+            # if not basic_info_dict:
+            #     logger.info(f"종목코드: {sJongmokCode}, 기본정보X 정정주문 실폐!!")
+            #     return
+            # 주문가격 = basic_info_dict['하한가']
+
+            최우선매수호가 = self.stock_code_to_sell_price_dict.get(sJongmokCode, None)
+            if not 최우선매수호가:
+                logger.info(f"종목코드: {sJongmokCode}, 최우선 매수 호가X 주문 실폐!!")
+                self.exit_engine.reset(sJongmokCode)
+                continue
+            주문가격 = self.pricing.stop_loss_price(sJongmokCode, 최우선매수호가)
+
+            self.queue_order(
+                [
+                    "매도주문",
+                    "", # 화면번호는 send_orders 에서 할당
+                    self.account_num,
+                    2,
+                    sJongmokCode,
+                    self.watchlist.get(sJongmokCode, "보유수량"),
+                    주문가격,
+                    "00",
+                    "",
+                ],
+                decided_at,
+            )
 
-        if self.is_check_tr_req_condition() and not self.orders_queue.empty():
-            sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo = self.orders_queue.get()
-            ret = self.send_order(sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo)
-            if ret == 0:
-                logger.info(f"{sRQName} 주문 접수 성공!!")
-            self.last_tr_send_times.append(self.now_time)
+            # 실투자시 시장가 매도 주석해제
+            # logger.info(f"종목코드: {sJongmokCode} 시장가 매도 진행!!")
+            # self.orders_queue.put(
+            #     [
+            #         "시장가매도주문",
+            #         self._get_screen_num(),
+            #         self.account_num,
+            #         2,
+            #         sJongmokCode,
+            #         self.realtime_watchlist_df.loc[sJongmokCode, "보유수량"],
+            #         "",
+            #         "03",
+            #         "",
+            #     ],
+            # )
+            # self.registed_condition_df.drop(sJongmokCode, inplace=True) #체결 완료시 drop으로 registed_condition_df에서 삭제
+            # registed_condition_df에서 sJongmokCode가 존재하는지 확인 후 삭제
+            if sJongmokCode in self.conditions:
+                self.conditions.unregister(sJongmokCode)
+
+        for sJongmokCode in take_profit:
+            logger.info(f"종목코드: {sJongmokCode} 매도 진행(익절 )!!")
+
+            self.queue_order(
+                [
+                    "지정가매도주문",
+                    "", # 화면번호는 send_orders 에서 할당
+                    self.account_num,
+                    2,
+                    sJongmokCode,
+                    self.watchlist.get(sJongmokCode, "보유수량"),
+                    self.pricing.take_profit_price(
+                        sJongmokCode, self.watchlist.get(sJongmokCode, "현재가"), self.stock_code_to_sell_price_dict.get(sJongmokCode, None)
+                    ),
+                    "00",
+                    "",
+                ],
+                decided_at,
+            )
+            # self.registed_condition_df.drop(sJongmokCode, inplace=True) #체결 완료시 drop으로 registed_condition_df에서 삭제
+            # registed_condition_df에서 sJongmokCode가 존재하는지 확인 후 삭제
+            if sJongmokCode in self.conditions:
+                self.conditions.unregister(sJongmokCode)
+            else:
+                logger.info(f"종목코드: {sJongmokCode}는 등록된 조건식에 존재하지 않음. 삭제 스킵.")
+
+    def queue_order(self, order, decided_at=None): # 주문을 scheduler 에 등록 (매도 > 매수 > 정정 순서)
+        sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo = order
+        trace = self.latency.start(sRQName, sCode, decided_at)
+        if sRQName == "매도정정주문":
+            self.journal.append(EVENT_CORRECTION, sCode, 원주문번호=sOrgOrderNo, 주문수량=int(nQty), 주문가격=nPrice)
+        elif sRQName != "시장가매수주문":
+            self.journal.append(EVENT_SELL_ORDER, sCode, 주문구분=sRQName, 주문수량=int(nQty), 주문가격=nPrice)
+        if sRQName == "시장가매수주문":
+            self.schedule_request(PRIORITY_BUY_ORDER, self.send_orders, *order, trace, key=("매수", sCode))
+        elif sRQName == "매도정정주문":
+            self.schedule_request(PRIORITY_CORRECTION_ORDER, self.send_orders, *order, trace, key=("정정", sOrgOrderNo))
+        else:
+            self.schedule_request(PRIORITY_EXIT_ORDER, self.send_orders, *order, trace, key=("매도", sCode))
+
+    def send_orders(self, sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo, trace=None): # 주문을 보내는 함수 (보냈으면 True)
+        self.latency.mark(trace, STAGE_DEQUEUE)
+        sScreenNo = self._get_screen_num(POOL_ORDER, sCode) # 주문 응답(OnReceiveTrData)이 오면 반납
+        if sScreenNo is None:
+            logger.info(f"종목코드: {sCode}, 주문 화면번호 없음 {sRQName} 실패!!")
+            return False
+        ret = self.send_order(sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo)
+        self.latency.mark(trace, STAGE_SENT)
+        if ret == 0:
+            logger.info(f"{sRQName} 주문 접수 성공!!")
+            self.latency.sent(trace)
+            return True
+        self.screens.release(sScreenNo)
+        return False
 
     def send_order(self, sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo):
-        return self.kiwoom.dynamicCall("SendOrder(QString, QString, QString, int, QString, int, int, QString, QString)",
-                                       [sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo])
+        return self.kiwoom.send_order(sRQName, sScreenNo, sAccNo, nOrderType, sCode, nQty, nPrice, sHogaGb, sOrgOrderNo)
         # [SendOrder() 함수]
         #
         # sRQName: 사용자 구분명 (OnReceiveTrData에서 받을 이름으로!
@@ -682,186 +1022,169 @@ class KiwoomAPI(QMainWindow, form_class):
         # 예시 -> SendOrder("주식주문", _get_screen_num(), cbo계좌.Text.Trim(), 1, 종목코드, 수량, 현재가, "00", ""):
 
     def set_real(self, scrNum, strCodeList, strFidList, strRealType):
-        self.kiwoom.dynamicCall("SetRealReg(QString, QString, QString, QString)", scrNum, strCodeList, strFidList, strRealType)
+        self.kiwoom.set_real_reg(scrNum, strCodeList, strFidList, strRealType)
 
     def register_code_to_realtime_list(self, code):
-        fid_list = "10;12;20;28"
-        # "10": "현재가", "12": "등락율", "20": "체결시간", "28": "(최우선)매수호가"
-        if len(code) != 0:
-            self.realtime_reqisted_codes.add(code)
-            self.set_real(self._get_screen_num(), code, fid_list, "I")
-            logger.info(f"{code}, 실시간 등록 완료!!")
-
-    def is_check_tr_req_condition(self): # TR요청시 제한되는 부분을 감시하는 함수
-        now_time = datetime.datetime.now()
-        if len(self.last_tr_send_times) >= self.max_send_per_sec and \
-            now_time - self.last_tr_send_times[-self.max_send_per_sec] < datetime.timedelta(milliseconds=1000):
-            logger.info(f"초 단위 TR 요청 제한! Wait for time to send!!")
-            return  False
-        elif len(self.last_tr_send_times) >= self.max_send_per_minute and \
-            self.now_time - self.last_tr_send_times[-self.max_send_per_minute] < datetime.timedelta(minutes=1):
-            logger.info(f"분 단위 TR 요청 제한! Wait for time to send!!")
-            return False
-        elif len(self.last_tr_send_times) >= self.max_send_per_hour and \
-            now_time - self.last_tr_send_times[-self.max_send_per_hour] < datetime.timedelta(minutes=60):
-            logger.info(f"시간 단위 TR 요청 제한! Wait for time to send!!")
-            return False
-        else:
-            return True
+        self.register_codes_to_realtime_list([code])
+
+    def register_codes_to_realtime_list(self, codes): # 여러 종목을 화면당 SetRealReg 한번으로 등록
+        self.realtime_subscriptions.add(codes)
+
+    def is_check_tr_req_condition(self): # TR요청시 제한되는 부분을 감시하는 함수 (제한 횟수는 tr_rate_limiter.stats() 로 확인)
+        return self.tr_rate_limiter.can_send()
 
     def get_comm_data(self, strTrCode, strRecordName, nIdex, strItemName):
-        ret = self.kiwoom.dynamicCall("GetCommData(QString, QString, int, QString)", strTrCode, strRecordName, nIdex,
-                                      strItemName)
+        ret = self.kiwoom.get_comm_data(strTrCode, strRecordName, nIdex, strItemName)
         return ret.strip()
 
     def set_input_value(self, id, value):
-        self.kiwoom.dynamicCall("SetInputValue(QString, QString)", id, value)
+        self.kiwoom.set_input_value(id, value)
 
-    def comm_rq_data(self, rqname, trcode, next, screen_no):
-        self.kiwoom.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, trcode, next, screen_no)
+    def comm_rq_data(self, rqname, trcode, next, screen_no): # 요청을 보냈으면 True (요청 제한 횟수에 포함)
+        if screen_no is None: # TR 화면번호가 모두 사용중
+            logger.info(f"{rqname} 화면번호 없음, 요청 실패!!")
+            return False
+        ret = self.kiwoom.comm_rq_data(rqname, trcode, next, screen_no)
+        if ret != 0: # 요청 실패시 응답이 오지 않으므로 바로 반납
+            self.screens.release(screen_no)
+            return False
+        return True
 
     def save_settings(self):
         # Write window size and position to config file
         self.settings.setValue("size", self.size())
         self.settings.setValue("pos", self.pos())
-        self.settings.setValue('buyAmountLineEdit', self.buyAmountLineEdit.text())
-        self.settings.setValue('goalReturnLineEdit', self.goalReturnLineEdit.text())
-        self.settings.setValue('stopLossLineEdit', self.stopLossLineEdit.text())
-        self.realtime_watchlist_df.to_pickle("./realtime_watchlist_df.pkl")
+        params = self.strategy_config.default # 검증된 값만 저장
+        self.settings.setValue('buyAmountLineEdit', str(params.buy_amount))
+        self.settings.setValue('goalReturnLineEdit', str(params.goal_return))
+        self.settings.setValue('stopLossLineEdit', str(params.stop_loss))
+        self.settings.setValue('conditionOverrides', self.strategy_config.overrides_to_json())
+        self.settings.setValue('tickDrainIntervalMs', self.tick_drain_interval_ms)
+        self.settings.setValue('recordTicks', self.tick_recorder is not None)
+        self.settings.setValue('metricsPort', self.metrics_port)
+        self.settings.setValue('strategyWorker', self.strategy_worker_mode)
+        self.settings.setValue('initialConditionLimit', self.initial_condition_limit)
+        if self.tick_recorder is not None:
+            self.tick_recorder.flush()
+        self.latency.prune()
+        self.journal.compact(self.watchlist.to_dataframe(), self.order_book, self._save_watchlist_snapshot)
+        self.stats_snapshot = self.collect_stats() # 참조만 바꾸므로 metrics 서버 스레드는 이전/새 snapshot 중 하나를 본다
+        for name, stats in self.stats_snapshot.items(): # 30초마다 남기므로 DEBUG 로만 (필요하면 /stats 로 조회)
+            logger.debug(f"{name} 현황: {stats}")
+
+    def collect_stats(self): # 구성 요소별 현황 (이름 -> stats dict)
+        stats = {
+            "체결 tick 처리": self.tick_conflator.stats(),
+            "TR 요청 제한": self.tr_rate_limiter.stats(),
+            "TR/주문 대기": self.scheduler.stats(),
+            "실시간 등록": self.realtime_subscriptions.stats(),
+            "조건검색 이벤트": dict(self.condition_batcher.stats(), 종목명_캐시_miss=self.master_code_names.misses),
+            "화면번호": self.screens.stats(),
+            "연속조회": self.tr_pager.stats(),
+            "주문 지연(ms)": self.latency.summary(),
+            "주문": self.order_book.stats(),
+            "주문 가격": self.pricing.stats(),
+            "저장": self.persistence.stats(),
+        }
+        if self.strategy_worker is not None:
+            stats["strategy worker"] = self.strategy_worker.stats()
+        return stats
+
+    def _save_watchlist_snapshot(self, realtime_watchlist_df, on_written=None, on_failed=None):
+        self.persistence.submit("./realtime_watchlist_df.pkl", realtime_watchlist_df, write_pickle, on_written, on_failed)
+
+    def closeEvent(self, event): # 종료 전에 대기중인 저장을 모두 끝낸다
+        self.save_settings()
+        self.persistence.stop()
+        self.journal.close()
+        if self.tick_recorder is not None:
+            self.tick_recorder.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.strategy_worker is not None:
+            self.strategy_worker.stop()
+        super().closeEvent(event)
 
     def _get_repeat_cnt(self, trcode, rqname):
-        ret = self.kiwoom.dynamicCall("GetRepeatCnt(QString, QString)", trcode, rqname)
+        ret = self.kiwoom.get_repeat_cnt(trcode, rqname)
         return ret
 
     def on_opt10001_req(self, sTrCode, sRQName):
-        종목코드 = self.get_comm_data(sTrCode, sRQName, 0, "종목코드").replace("A", "").strip()
-        상한가 = abs(int(self.get_comm_data(sTrCode, sRQName, 0, "상한가")))
-        하한가 = abs(int(self.get_comm_data(sTrCode, sRQName, 0, "하한가")))
-        self.stock_code_to_info_dict[종목코드] = dict(상한가=상한가, 하한가=하한가)
-
-    def on_opt10075_req(self, sTrCode, sRQName):
-        cnt = self._get_repeat_cnt(sTrCode, sRQName)
-        for i in range(cnt):
-            주문번호 = self.get_comm_data(sTrCode, sRQName, i, "주문번호").strip()
-            미체결수량 = int(self.get_comm_data(sTrCode, sRQName, i, "미체결수량"))
-            주문가격 = int(self.get_comm_data(sTrCode, sRQName, i, "주문가격"))
-            종목코드 = self.get_comm_data(sTrCode, sRQName, i, "종목코드").strip()
-            주문구분 = self.get_comm_data(sTrCode, sRQName, i, "주문구분").replace("+", "").replace("-", "").strip()
-            시간 = self.get_comm_data(sTrCode, sRQName, i, "시간").strip()
-            order_time = datetime.datetime.now().replace(
-                # '시간' 문자열이 "HHMMSS" 형식(예: "153010"은 15시 30분 10초를 의미)으로 제공된다고 가정합니다.
-                hour=int(시간[:-4]),
-                minute=int(시간[-4:-2]),
-                second=int(시간[-2:]),
-            )
+        info = read_single(self.kiwoom, OPT10001, sTrCode, sRQName)
+        self.basic_info_cache.put(info["종목코드"], dict(상한가=info["상한가"], 하한가=info["하한가"]))
+        self.basic_info_cache.save(self.persistence)
 
-            정정주문가격 = self.stock_code_to_sell_price_dict.get(종목코드, None)
-            if not 정정주문가격:
-                logger.info(f"종목코드: {종목코드}, 최우선 매수 호가X 주문 실폐!!")
-                return
-            # basic.info.dict = self.stock_code_to_info_dict.get(종목코드, None)
-            # if not basic.info.dict:
-            #     logger.info(f"종목코드: {종목코드}, 기본정보X 정정주문 실폐!!")
-            #     return
-            # 정정주문가격 = basic_info_dict['하한가']
-            if 주문구분 in ("매도", "매도정정") and self.now_time - order_time >= datetime.timedelta(seconds=10):
-            # if 주문구분 == "매도" and self.now_time - order_time >= datetime.timedelta(seconds=10):
-                # 지정가 매도 주문이후 10초안에 미체결시 시장가 매도 정정 주문
-                logger.info(f"종목코드: {종목코드}, 주문번호: {주문번호}, 시장가 매도 정정 주문!!")
-                self.orders_queue.put(
-                    [
-                        "매도정정주문",
-                        self._get_screen_num(),
-                        self.account_num,
-                        6,
-                        종목코드,
-                        미체결수량,
-                        정정주문가격,
-                        "00",
-                        주문번호,
-                    ]
-                )
-
-            # basic.info.dict = self.stock_code_to_info_dict.get(종목코드, None)
-            # if not basic.info.dict:
-            #     logger.info(f"종목코드: {종목코드}, 기본정보X 정정주문 실폐!!")
-            #     return
-            # 정정주문가격 = basic_info_dict['하한가']
-            # if 주문구분 in ("매도", "매도정정") and self.now_time - order_time >= datetime.timedelta(seconds=10):
-            #     logger.info(f"종목코드: {종목코드}, 주문번호: {주문번호}, 미체결수량: {미체결수량}, 시장가 매도 정정 주문!!")
-
-    def on_opw00018_req(self, sTrCode, sRQName):
-        현재평가잔고 = int(self.get_comm_data(sTrCode, sRQName, 0, "추정예탁자산"))
+    def on_opt10075_req(self, sTrCode, sRQName, sPrevNext="0"): # 미체결 조회 결과로 order_book 보정 (정정 주문은 check_unfinished_orders 에서)
+        pages = self.tr_pager.receive(sRQName, sPrevNext, (dict(), read_multi(self.kiwoom, OPT10075, sTrCode, sRQName)))
+        if pages is None: # 연속조회 진행 중
+            return
+        _, df = merge_pages(pages)
+        for 주문번호, 종목코드, 주문구분, 미체결수량, 주문가격, 시간 in zip(
+            df["주문번호"], df["종목코드"], df["주문구분"], df["미체결수량"].tolist(), df["주문가격"].tolist(), df["시간"]
+        ):
+            order = self.order_book.get(주문번호)
+            if order is None or order.미체결수량 != 미체결수량: # 체결 데이터를 놓친 주문
+                order = self.order_book.restore(주문번호, 종목코드, 주문구분, 미체결수량, 주문가격, 시간)
+                self.journal.append(EVENT_UNFINISHED, 종목코드, **order.to_journal())
+        if self.unfinished_query_sent_at is None: # request 를 거치지 않은 응답
+            return
+        # 조회를 보내기 전에 갱신됐는데 결과에 없는 미체결 주문은 체결/취소 통보를 놓친 주문
+        for order in self.order_book.missing_orders(set(df["주문번호"]), self.unfinished_query_sent_at):
+            logger.info(f"미체결 조회에 없는 주문 종료: {order}")
+            self.order_book.discard(order.주문번호)
+            self.journal.append(EVENT_UNFINISHED_DONE, order.종목코드, 주문번호=order.주문번호)
+
+    def on_opw00018_req(self, sTrCode, sRQName, sPrevNext="0"):
+        page = (read_single(self.kiwoom, OPW00018, sTrCode, sRQName), read_multi(self.kiwoom, OPW00018, sTrCode, sRQName))
+        pages = self.tr_pager.receive(sRQName, sPrevNext, page)
+        if pages is None: # 연속조회 진행 중
+            return
+        single, df = merge_pages(pages)
+        self.account_refresh_version = self.account_request_version
+        self.account_refreshed_at = time.monotonic()
+        현재평가잔고 = single["추정예탁자산"]
         logger.info(f"현재평가잔고 : {현재평가잔고: ,}원")
         self.currentBalanceLabel.setText(f"현재 평가 잔고: {현재평가잔고: ,}원")
-        cnt = self._get_repeat_cnt(sTrCode, sRQName)
-        self.account_info_df = pd.DataFrame(
-            columns=[
-                "종목명",
-                "매매가능수량",
-                "보유수량",
-                "매입가",
-                "현재가",
-                "수익률",
-            ]
-        )
-
-        current_account_code_list = []
-        current_filled_amount_krw = 0
-        for i in range(cnt):
-            종목코드 = self.get_comm_data(sTrCode, sRQName, i, "종목번호").replace("A", "").strip()
-            current_account_code_list.append(종목코드)
-            종목명 = self.get_comm_data(sTrCode, sRQName, i, "종목명")
-            매매가능수량 = int(self.get_comm_data(sTrCode, sRQName, i, "매매가능수량"))
-            보유수량 = int(self.get_comm_data(sTrCode, sRQName, i, "보유수량"))
-            현재가 = int(self.get_comm_data(sTrCode, sRQName, i, "현재가"))
-            매입가 = int(self.get_comm_data(sTrCode, sRQName, i, "매입가"))
-            # 수익률 = int(self.get_comm_data(sTrCode, sRQName, i, "수익률(%)"))
-            수익률 = int(float(self.get_comm_data(sTrCode, sRQName, i, "수익률(%)")))
-            logger.info(
-                f"종목코드: {종목코드}, 종목명: {종목명}, 매매가능수량: {매매가능수량}, 보유수량: {보유수량}, 매입가: {매입가}, 수익률: {수익률}"
-            )
-            current_filled_amount_krw += 보유수량 * 현재가
-            if 종목코드 in self.realtime_watchlist_df.index.to_list():
-                self.realtime_watchlist_df.loc[종목코드, "종목명"] = 종목명
-                self.realtime_watchlist_df.loc[종목코드, "평균단가"] = 매입가
-                self.realtime_watchlist_df.loc[종목코드, "보유수량"] = 보유수량
-            self.account_info_df.loc[종목코드] = {
-                "종목명": 종목명,
-                "매매가능수량": 매매가능수량,
-                "현재가": 현재가,
-                "보유수량": 보유수량,
-                "매입가": 매입가,
-                "수익률": 수익률,
-            }
+        df["수익률"] = df["수익률"].astype(np.int64)
+        self.account_info_df = df[["종목명", "매매가능수량", "보유수량", "매입가", "현재가", "수익률"]]
+        self.account_info_version += 1
+        logger.info(f"계좌 보유 종목: {len(df)}개")
+        current_filled_amount_krw = int((df["보유수량"] * df["현재가"]).sum())
         self.current_available_buy_amount_krw = 현재평가잔고 - current_filled_amount_krw
+        self._reconcile_watchlist_with_account(df)
         if not self.is_updated_realtime_watchlist:
-            for 종목코드 in current_account_code_list:
-                self.register_code_to_realtime_list(종목코드)
+            self.register_codes_to_realtime_list(df.index.tolist())
             self.is_updated_realtime_watchlist = True
-            realtime_tracking_code_list = self.realtime_watchlist_df.index.to_list()
-            for stock_code in realtime_tracking_code_list:
-                if stock_code not in current_account_code_list:
-                    self.realtime_watchlist_df.drop(stock_code, inplace=True)
-                    logger.info(f"종목코드: {stock_code} self.realtime_watchlist_df 에서 drop!!")
+            for stock_code in self.watchlist.code_list():
+                if stock_code not in df.index:
+                    self.watchlist.remove(stock_code)
+                    self.journal.append(EVENT_CLOSE, stock_code)
+                    logger.info(f"종목코드: {stock_code} self.watchlist 에서 drop!!")
+
+    def _reconcile_watchlist_with_account(self, df): # 계좌 종목과 감시 종목을 한번에 맞추고 바뀐 종목만 journal 에 남긴다
+        rows = self.watchlist.rows_of(df.index)
+        matched = rows >= 0
+        if not matched.any():
+            return
+        rows = rows[matched]
+        account = df[matched]
+        평균단가 = account["매입가"].to_numpy(dtype=np.float64)
+        보유수량 = account["보유수량"].to_numpy()
+        종목명 = account["종목명"].to_numpy(dtype=object)
+        changed = (
+            (self.watchlist.columns["평균단가"][rows] != 평균단가)
+            | (self.watchlist.columns["보유수량"][rows] != 보유수량)
+            | (self.watchlist.columns["종목명"][rows] != 종목명)
+        )
+        if not changed.any():
+            return
+        self.watchlist.set_rows(rows[changed], 종목명=종목명[changed], 평균단가=평균단가[changed], 보유수량=보유수량[changed])
+        for 종목코드, name, price, qty in zip(account.index[changed], 종목명[changed], 평균단가[changed], 보유수량[changed]):
+            self.journal.append(EVENT_AVG_PRICE, 종목코드, 종목명=name, 평균단가=int(price), 보유수량=int(qty))
 
     @ staticmethod
-    def get_sell_price(now_price):
-        now_price = int(now_price)
-        if now_price < 2000:
-            return now_price
-        elif 5000 > now_price >= 2000:
-            return now_price - now_price % 5
-        elif now_price >= 5000 and now_price < 20000:
-            return now_price - now_price % 10
-        elif now_price >= 20000 and now_price < 50000:
-            return now_price - now_price % 50
-        elif now_price >= 50000 and now_price < 200000:
-            return now_price - now_price % 100
-        elif now_price >= 200000 and now_price < 500000:
-            return now_price - now_price % 500
-        else:
-            return now_price - now_price % 1000
+    def get_sell_price(now_price): # 현재가 이하의 유효 호가
+        return int(round_to_tick(now_price, ROUND_DOWN))
 
 
 #PyQt 디버깅용 코드
@@ -879,6 +1202,15 @@ sys.excepthook = my_exception_hook
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # strategy worker 를 process 로 실행할 때 (Windows spawn)
     app = QApplication(sys.argv)
-    kiwoom_api = KiwoomAPI()
+    if "--simulate" in sys.argv: # 키움 OpenAPI 없이 로컬 시뮬레이터로 실행
+        from simulator import SimulatedBroker
+        broker = SimulatedBroker()
+        kiwoom_api = KiwoomAPI(broker)
+        market_timer = QTimer()
+        market_timer.timeout.connect(broker.random_walk)
+        market_timer.start(50)
+    else:
+        kiwoom_api = KiwoomAPI()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,164 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tick_recorder import TICK_DTYPE, CONDITION_DTYPE, TICK_FILE, CONDITION_FILE, load_records
+
+COST_PCT = 0.21 # 수수료 + 세금 (autotrade 수익률 계산과 동일)
+
+
+def load_recorded_ticks(directory): # TickRecorder 로 기록한 하루치 tick -> (ts, code, price) DataFrame, 편입 시간 Series
+    ticks = load_records(os.path.join(directory, TICK_FILE), TICK_DTYPE)
+    conditions = load_records(os.path.join(directory, CONDITION_FILE), CONDITION_DTYPE)
+    df = pd.DataFrame({
+        "ts": np.asarray(ticks["ts"]),
+        "code": np.asarray(ticks["code"]).astype(str),
+        "price": np.asarray(ticks["price"]).astype(np.float64),
+    })
+    entries = None
+    if len(conditions):
+        cond_df = pd.DataFrame({
+            "ts": np.asarray(conditions["ts"]),
+            "code": np.asarray(conditions["code"]).astype(str),
+            "type": np.asarray(conditions["type"]).astype(str),
+        })
+        entries = cond_df[cond_df["type"] == "I"].groupby("code")["ts"].min()
+    return df, entries
+
+
+def load_minute_bars(path): # code, datetime, close 컬럼을 가진 분봉 CSV -> (ts, code, price) DataFrame
+    bars = pd.read_csv(path, dtype={"code": str})
+    return pd.DataFrame({
+        "ts": pd.to_datetime(bars["datetime"]).astype("int64") / 1e9,
+        "code": bars["code"].str.zfill(6),
+        "price": bars["close"].astype(np.float64),
+    })
+
+
+def build_price_matrix(df, entries=None): # 종목 x (편입 이후 tick 순서) 가격 행렬, 빈 칸은 NaN
+    if entries is not None:
+        entry_ts = df["code"].map(entries)
+        df = df[entry_ts.notna() & (df["ts"] >= entry_ts)]
+    df = df.sort_values(["code", "ts"], kind="stable")
+    codes, code_idx = np.unique(df["code"].to_numpy(), return_inverse=True)
+    position = df.groupby("code", sort=True).cumcount().to_numpy()
+    width = int(position.max()) + 1 if len(position) else 0
+    matrix = np.full((len(codes), width), np.nan)
+    matrix[code_idx, position] = df["price"].to_numpy()
+    return codes, matrix
+
+
+def stack_matrices(matrices): # 여러 거래일 행렬을 위아래로 붙인다 (폭은 NaN 으로 맞춤)
+    width = max((m.shape[1] for m in matrices), default=0)
+    return np.vstack([np.pad(m, ((0, 0), (0, width - m.shape[1])), constant_values=np.nan) for m in matrices])
+
+
+def run_backtest(matrix, goal_return, stop_loss, buy_amount=100000, cost_pct=COST_PCT):
+    # 첫 tick 가격에 시장가 매수, 이후 tick 이 목표가를 넘으면 익절 / 손절가 아래면 손절, 끝까지 안 걸리면 마지막 가격에 청산
+    entry = matrix[:, 0]
+    valid = ~np.isnan(entry)
+    entry = np.where(valid, entry, 1.0)
+    qty = np.where(valid, buy_amount // entry, 0)
+    goal_price = entry * (1 + goal_return / 100)
+    stop_price = entry * (1 + stop_loss / 100)
+    with np.errstate(invalid="ignore"):
+        hit_stop = matrix < stop_price[:, None]
+        hit_goal = matrix > goal_price[:, None]
+    hit = hit_stop | hit_goal
+    any_hit = hit.any(axis=1)
+    last_idx = np.maximum((~np.isnan(matrix)).sum(axis=1) - 1, 0)
+    exit_idx = np.where(any_hit, hit.argmax(axis=1), last_idx)
+    exit_price = matrix[np.arange(len(matrix)), exit_idx]
+    return_pct = (exit_price - entry) / entry * 100 - cost_pct
+    traded = valid & (qty >= 1)
+    pnl = np.where(traded, qty * entry * return_pct / 100, 0.0)
+    exit_reason = np.where(
+        ~any_hit, "청산", np.where(hit_stop[np.arange(len(matrix)), exit_idx], "손절", "익절")
+    )
+    return dict(
+        traded=traded,
+        return_pct=np.where(traded, return_pct, np.nan),
+        pnl=pnl,
+        exit_idx=exit_idx,
+        exit_reason=exit_reason,
+    )
+
+
+def summarize(result, goal_return, stop_loss):
+    traded = result["traded"]
+    returns = result["return_pct"][traded]
+    return dict(
+        goal_return=goal_return,
+        stop_loss=stop_loss,
+        trades=int(traded.sum()),
+        win_rate=float((returns > 0).mean()) if len(returns) else 0.0,
+        mean_return_pct=float(returns.mean()) if len(returns) else 0.0,
+        total_pnl=float(result["pnl"].sum()),
+        take_profit=int(((result["exit_reason"] == "익절") & traded).sum()),
+        stop_loss_hits=int(((result["exit_reason"] == "손절") & traded).sum()),
+    )
+
+
+_worker_matrix = None
+_worker_options = None
+
+
+def _init_worker(matrix, options):
+    global _worker_matrix, _worker_options
+    _worker_matrix = matrix
+    _worker_options = options
+
+
+def _run_chunk(params):
+    return [summarize(run_backtest(_worker_matrix, goal, stop, **_worker_options), goal, stop) for goal, stop in params]
+
+
+def sweep(matrix, goal_returns, stop_losses, buy_amount=100000, cost_pct=COST_PCT, workers=None, chunk_size=16):
+    # goal x stop 조합을 process pool 로 나눠서 실행, 총 손익 순으로 정렬된 DataFrame 반환
+    params = [(float(goal), float(stop)) for goal in goal_returns for stop in stop_losses]
+    chunks = [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+    options = dict(buy_amount=buy_amount, cost_pct=cost_pct)
+    if workers == 1:
+        _init_worker(matrix, options)
+        rows = [row for chunk in chunks for row in _run_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matrix, options)) as executor:
+            rows = [row for result in executor.map(_run_chunk, chunks) for row in result]
+    return pd.DataFrame(rows).sort_values("total_pnl", ascending=False, ignore_index=True)
+
+
+def parse_range(text): # "1:5:0.5" -> [1.0, 1.5, ..., 5.0], "2.5" -> [2.5]
+    parts = [float(x) for x in text.split(":")]
+    if len(parts) == 1:
+        return parts
+    start, stop, step = parts
+    return list(np.round(np.arange(start, stop + step / 2, step), 4))
+
+
+def main(argv=None): # python backtest.py recordings/20240102 recordings/20240103 --goals 1:5:0.5 --stops -5:-1:0.5
+    parser = argparse.ArgumentParser(description="조건식 편입 / 목표수익률 / 손절률 전략 백테스트")
+    parser.add_argument("sources", nargs="+", help="TickRecorder 기록 폴더 또는 분봉 CSV")
+    parser.add_argument("--goals", default="2.5", help="목표 수익률(%%), start:stop:step")
+    parser.add_argument("--stops", default="-2.5", help="손절률(%%), start:stop:step")
+    parser.add_argument("--buy-amount", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    matrices = []
+    for source in args.sources:
+        if os.path.isdir(source):
+            df, entries = load_recorded_ticks(source)
+        else:
+            df, entries = load_minute_bars(source), None
+        matrices.append(build_price_matrix(df, entries)[1])
+    matrix = stack_matrices(matrices)
+    result = sweep(matrix, parse_range(args.goals), parse_range(args.stops), args.buy_amount, workers=args.workers)
+    print(result.head(args.top).to_string())
+
+
+if __name__ == "__main__":
+    main()
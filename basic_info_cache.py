@@ -0,0 +1,67 @@
+import datetime
+import json
+import time
+
+from persistence import atomic_write, write_json
+
+
+def today_str():
+    return datetime.date.today().strftime("%Y%m%d")
+
+
+class BasicInfoCache: # opt10001 (상한가/하한가) 결과를 거래일 단위로 저장해두는 캐시
+    def __init__(self, path, trading_date=None, in_flight_timeout=30.0, clock=time.monotonic):
+        self.path = path
+        self.trading_date = trading_date or today_str()
+        self.in_flight_timeout = in_flight_timeout # 응답이 이 시간(초) 안에 안 오면 다시 요청 가능
+        self.clock = clock
+        self.stock_code_to_info = dict() # 종목코드 -> dict(상한가=..., 하한가=...)
+        self.in_flight = dict() # 요청 중인 종목코드 -> 요청 시간
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        cache = cls(path, **kwargs)
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cache
+        if saved.get("trading_date") == cache.trading_date: # 다른 거래일 데이터는 버린다
+            cache.stock_code_to_info.update(saved.get("stock_code_to_info", {}))
+        return cache
+
+    def _check_date(self): # 날짜가 바뀌면 캐시 초기화
+        today = today_str()
+        if today != self.trading_date:
+            self.trading_date = today
+            self.stock_code_to_info.clear()
+            self.in_flight.clear()
+
+    def get(self, stock_code):
+        self._check_date()
+        return self.stock_code_to_info.get(stock_code, None)
+
+    def should_request(self, stock_code): # 캐시에 없고 요청 중이 아니면 True (요청 중으로 표시)
+        self._check_date()
+        if stock_code in self.stock_code_to_info:
+            return False
+        now = self.clock()
+        requested_at = self.in_flight.get(stock_code, None)
+        if requested_at is not None and now - requested_at < self.in_flight_timeout:
+            return False
+        self.in_flight[stock_code] = now
+        return True
+
+    def put(self, stock_code, info):
+        self._check_date()
+        self.in_flight.pop(stock_code, None)
+        self.stock_code_to_info[stock_code] = info
+
+    def to_dict(self):
+        return dict(trading_date=self.trading_date, stock_code_to_info=dict(self.stock_code_to_info))
+
+    def save(self, writer=None): # writer(PersistenceWriter) 가 있으면 백그라운드에서 저장
+        if writer is not None:
+            writer.submit(self.path, self.to_dict(), write_json)
+        else:
+            atomic_write(self.path, self.to_dict(), write_json)
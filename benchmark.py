@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 키움 OpenAPI 없이 SimulatedBroker + 화면 없는 Qt 로 hot path 를 측정하는 벤치마크
+# python benchmark.py --output bench.json --baseline bench_base.json --threshold 0.2
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPARE_METRICS = ("p50_ms", "mean_ms") # baseline 과 비교하는 값 (작을수록 좋음)
+
+
+def summarize(samples, extra=None): # 한번 호출마다 걸린 시간(초) 리스트 -> 통계
+    samples = np.asarray(samples, dtype=np.float64)
+    total = float(samples.sum())
+    result = dict(
+        count=int(len(samples)),
+        total_s=round(total, 6),
+        ops_per_sec=round(len(samples) / total, 1) if total > 0 else 0.0,
+        mean_ms=round(float(samples.mean()) * 1000, 4),
+        p50_ms=round(float(np.percentile(samples, 50)) * 1000, 4),
+        p99_ms=round(float(np.percentile(samples, 99)) * 1000, 4),
+        max_ms=round(float(samples.max()) * 1000, 4),
+    )
+    if extra:
+        result.update(extra)
+    return result
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def make_codes(n):
+    return [f"{100000 + i:06d}" for i in range(n)]
+
+
+class Harness: # 벤치마크 하나마다 임시 폴더에서 새 KiwoomAPI + SimulatedBroker 를 만든다
+    def __init__(self, app):
+        self.app = app
+
+    def __enter__(self):
+        from PyQt5.QtCore import QSettings
+        from simulator import SimulatedBroker
+        from autotrade import KiwoomAPI
+
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name) # pkl/journal 등이 현재 폴더에 저장되므로
+        self.broker = SimulatedBroker(latency=0.0, tr_limits=((1.0, 100000, "초"),)) # 시뮬레이터 쪽 제한은 측정에서 제외
+        settings = QSettings(os.path.join(self._tmp.name, "settings.ini"), QSettings.IniFormat) # 실제 설정(레지스트리)을 건드리지 않도록
+        self.api = KiwoomAPI(self.broker, settings)
+        self.broker.run_until_idle()
+        self.app.processEvents()
+        for timer in (self.api.timer1, self.api.timer4, self.api.timer5, self.api.timer6, self.api.timer7, self.api.timer8, self.api.timer9):
+            timer.stop() # 측정 중에 다른 작업이 끼어들지 않도록
+        self.api.conditions.register("000", "9000", "벤치마크조건식")
+        return self
+
+    def __exit__(self, *exc):
+        self.api.persistence.stop()
+        self.api.journal.close()
+        self.api.close()
+        self.app.processEvents()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def fill_watchlist(self, codes, held=True): # 매수/체결이 끝난 보유 종목 (손절/익절 가격은 멀리)
+        for code in codes:
+            self.api.watchlist.add(code, 종목명=f"종목{code}", 매수기반조건식="벤치마크조건식")
+            row = self.api.watchlist.row_of(code)
+            self.api.watchlist.set_at(row, "매수주문완료여부", True)
+            self.api.watchlist.set_at(row, "현재가", 10000)
+            self.api.watchlist.set_at(row, "평균단가", 10000)
+            self.api.watchlist.set_at(row, "목표가", 20000)
+            self.api.watchlist.set_at(row, "손절가", 5000)
+            self.api.watchlist.set_at(row, "수익률", 0.0)
+            self.api.watchlist.set_at(row, "보유수량", 10 if held else 0)
+
+
+def bench_realdata(app, n_ticks, n_codes=100, drain_every=50): # _receive_realdata 의 tick 처리량과 지연
+    with Harness(app) as h:
+        codes = make_codes(n_codes)
+        h.fill_watchlist(codes)
+        rng = np.random.default_rng(0)
+        prices = (10000 * (1 + rng.normal(0, 0.002, n_ticks))).astype(int)
+        picks = rng.integers(0, n_codes, n_ticks)
+        tick_samples = []
+        drain_samples = []
+        for i in range(n_ticks):
+            code = codes[picks[i]]
+            h.broker.set_quote(code, int(prices[i]), int(prices[i]) - 10)
+            tick_samples.append(timed(h.broker.emit_real_data, code))
+            if i % drain_every == drain_every - 1:
+                drain_samples.append(timed(h.api.drain_ticks))
+        return {
+            "realdata_tick": summarize(tick_samples, dict(codes=n_codes)),
+            "realdata_drain": summarize(drain_samples, dict(codes=n_codes, ticks_per_drain=drain_every)),
+        }
+
+
+def bench_real_condition(app, n_events): # _receive_real_condition 편입/이탈 처리
+    with Harness(app) as h:
+        codes = make_codes(n_events)
+        entry_samples = [timed(h.broker.OnReceiveRealCondition.emit, code, "I", "벤치마크조건식", "000") for code in codes]
+        entry_flush = [timed(h.api.flush_condition_events)] # 편입 묶음 처리 (실시간 등록, watchlist 추가)
+        exit_samples = [timed(h.broker.OnReceiveRealCondition.emit, code, "D", "벤치마크조건식", "000") for code in codes]
+        exit_flush = [timed(h.api.flush_condition_events)]
+        return {
+            "real_condition_entry": summarize(entry_samples),
+            "real_condition_entry_flush": summarize(entry_flush, dict(events=n_events)),
+            "real_condition_exit": summarize(exit_samples),
+            "real_condition_exit_flush": summarize(exit_flush, dict(events=n_events)),
+        }
+
+
+def bench_tr_rate_check(app, n_calls): # 요청 제한이 꽉 찬 상태에서 is_check_tr_req_condition
+    with Harness(app) as h:
+        limiter = h.api.tr_rate_limiter
+        while limiter.can_send():
+            limiter.record_send()
+        samples = [timed(h.api.is_check_tr_req_condition) for _ in range(n_calls)]
+        return {"tr_rate_check_saturated": summarize(samples)}
+
+
+def bench_update_models(app, rows_list, n_updates): # 모든 행의 현재가가 바뀐 뒤 update_pandas_models
+    results = dict()
+    for n_rows in rows_list:
+        with Harness(app) as h:
+            codes = make_codes(n_rows)
+            h.fill_watchlist(codes)
+            h.api.update_pandas_models() # 처음 한번은 전체 생성
+            samples = []
+            for i in range(n_updates):
+                for row in range(n_rows):
+                    h.api.watchlist.set_at(row, "현재가", 10000 + i + 1)
+                samples.append(timed(h.api.update_pandas_models))
+            results[f"update_pandas_models_{n_rows}"] = summarize(samples, dict(rows=n_rows))
+    return results
+
+
+def bench_save_settings(app, n_rows, n_saves): # save_settings 호출 + 백그라운드 pickle 저장 완료까지
+    with Harness(app) as h:
+        h.fill_watchlist(make_codes(n_rows))
+        call_samples = []
+        total_samples = []
+        for _ in range(n_saves):
+            start = time.perf_counter()
+            h.api.save_settings()
+            call_samples.append(time.perf_counter() - start)
+            h.api.persistence.flush()
+            total_samples.append(time.perf_counter() - start)
+        return {
+            "save_settings_call": summarize(call_samples, dict(rows=n_rows)),
+            "save_settings_written": summarize(total_samples, dict(rows=n_rows)),
+        }
+
+
+def bench_opw00018(app, n_rows, n_calls): # 보유 종목이 많을 때 on_opw00018_req 파싱
+    with Harness(app) as h:
+        codes = make_codes(n_rows)
+        h.fill_watchlist(codes[: n_rows // 2])
+        h.api.is_updated_realtime_watchlist = True # 최초 동기화(실시간 등록/정리)는 제외
+        rows = [{
+            "종목번호": f"A{code}",
+            "종목명": f"종목{code}",
+            "평가손익": "1000",
+            "수익률(%)": "1.00",
+            "매입가": "10000",
+            "보유수량": "10",
+            "매매가능수량": "10",
+            "현재가": "10100",
+        } for code in codes]
+        h.broker.tr_results[("opw00018", "opw00018_req")] = dict(single={"추정예탁자산": "100000000"}, multi=rows)
+        samples = [timed(h.api.on_opw00018_req, "opw00018", "opw00018_req") for _ in range(n_calls)]
+        return {"on_opw00018_req": summarize(samples, dict(rows=n_rows))}
+
+
+def run_all(app, quick=False):
+    scale = 0.1 if quick else 1.0
+    results = dict()
+    results.update(bench_realdata(app, int(20000 * scale)))
+    results.update(bench_real_condition(app, int(1000 * scale)))
+    results.update(bench_tr_rate_check(app, int(100000 * scale)))
+    results.update(bench_update_models(app, (10, 100, 1000), max(int(50 * scale), 5)))
+    results.update(bench_save_settings(app, 1000, max(int(20 * scale), 3)))
+    results.update(bench_opw00018(app, 500, max(int(20 * scale), 3)))
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=0.01): # baseline 보다 threshold 비율 이상 (그리고 min_delta_ms 이상) 느려진 항목 목록
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name, None)
+        if base is None:
+            continue
+        for metric in COMPARE_METRICS:
+            if metric not in base or base[metric] <= 0:
+                continue
+            if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] > min_delta_ms:
+                regressions.append(dict(
+                    benchmark=name,
+                    metric=metric,
+                    baseline=base[metric],
+                    current=current[metric],
+                    change_pct=round((current[metric] / base[metric] - 1) * 100, 1),
+                ))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="autotrade hot path 벤치마크")
+    parser.add_argument("--output", default=None, help="결과 JSON 파일")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--threshold", type=float, default=0.2, help="이 비율 이상 느려지면 실패 (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.01, help="이것보다 작은 차이는 측정 오차로 무시")
+    parser.add_argument("--quick", action="store_true", help="횟수를 1/10 로 줄여서 실행")
+    parser.add_argument("--verbose", action="store_true", help="앱 로그 출력")
+    args = parser.parse_args(argv)
+
+    from loguru import logger
+    if not args.verbose:
+        logger.remove() # 로그 출력이 측정값을 덮지 않도록
+
+    os.chdir(REPO_DIR) # main.ui 를 찾기 위해
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    results = run_all(app, quick=args.quick)
+    report = dict(
+        meta=dict(
+            timestamp=datetime.datetime.now().isoformat(timespec="seconds"),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            numpy=np.__version__,
+            quick=args.quick,
+        ),
+        results=results,
+    )
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        report["regressions"] = compare(results, baseline, args.threshold, args.min_delta_ms)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import inspect
+
+
+def _positional_arg_count(slot): # slot 이 받는 인자 수 (*args 면 None)
+    try:
+        parameters = inspect.signature(slot).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    count = 0
+    for parameter in parameters:
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            return None
+        if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+            count += 1
+    return count
+
+
+class Signal: # Qt 없이 쓰는 간단한 signal (connect/emit), Qt 처럼 slot 이 받는 인자 수만큼만 넘긴다
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append((slot, _positional_arg_count(slot)))
+
+    def disconnect(self, slot=None):
+        if slot is None:
+            self._slots.clear()
+        else:
+            self._slots = [(s, n) for s, n in self._slots if s != slot]
+
+    def emit(self, *args):
+        for slot, arg_count in list(self._slots):
+            slot(*args[:arg_count]) if arg_count is not None else slot(*args)
+
+
+SIGNAL_NAMES = (
+    "OnEventConnect",
+    "OnReceiveConditionVer",
+    "OnReceiveRealData",
+    "OnReceiveRealCondition",
+    "OnReceiveTrCondition",
+    "OnReceiveTrData",
+    "OnReceiveChejanData",
+    "OnReceiveMsg",
+)
+
+
+class BrokerBackend: # 키움 OpenAPI 와 같은 형태의 함수/이벤트를 제공하는 backend 기본 클래스
+    poll_interval_ms = None # 주기적으로 poll() 을 호출해야 하는 backend 면 주기(ms)
+
+    def poll(self):
+        pass
+
+    def comm_connect(self):
+        raise NotImplementedError
+
+    def get_login_info(self, tag):
+        raise NotImplementedError
+
+    def get_condition_load(self):
+        raise NotImplementedError
+
+    def get_condition_name_list(self):
+        raise NotImplementedError
+
+    def send_condition(self, scr_num, condition_name, condition_idx, n_search):
+        raise NotImplementedError
+
+    def send_condition_stop(self, scr_num, condition_name, condition_idx):
+        raise NotImplementedError
+
+    def get_master_code_name(self, code):
+        raise NotImplementedError
+
+    def get_code_list_by_market(self, market):
+        raise NotImplementedError
+
+    def set_real_reg(self, scr_num, code_list, fid_list, real_type):
+        raise NotImplementedError
+
+    def set_real_remove(self, scr_num, code):
+        raise NotImplementedError
+
+    def disconnect_real_data(self, scr_num):
+        raise NotImplementedError
+
+    def get_comm_real_data(self, code, fid):
+        raise NotImplementedError
+
+    def set_input_value(self, id, value):
+        raise NotImplementedError
+
+    def comm_rq_data(self, rqname, trcode, next, screen_no):
+        raise NotImplementedError
+
+    def get_comm_data(self, trcode, record_name, index, item_name):
+        raise NotImplementedError
+
+    def get_repeat_cnt(self, trcode, record_name):
+        raise NotImplementedError
+
+    def send_order(self, rqname, screen_no, acc_no, order_type, code, qty, price, hoga_gb, org_order_no):
+        raise NotImplementedError
+
+    def get_chejan_data(self, fid):
+        raise NotImplementedError
+
+
+class KiwoomBackend(BrokerBackend): # 실제 키움 OpenAPI ActiveX (Windows 전용)
+    def __init__(self):
+        from PyQt5.QAxContainer import QAxWidget
+        self.ocx = QAxWidget("KHOPENAPI.KHOpenAPICtrl.1") #  kiwoom api activ x 를 연동시키는 방법
+        for name in SIGNAL_NAMES:
+            setattr(self, name, getattr(self.ocx, name))
+
+    def comm_connect(self):
+        return self.ocx.dynamicCall("CommConnect()")
+
+    def get_login_info(self, tag):
+        return self.ocx.dynamicCall("GetLoginInfo(QString)", [tag])
+
+    def get_condition_load(self):
+        return self.ocx.dynamicCall("GetConditionLoad()")
+
+    def get_condition_name_list(self):
+        return self.ocx.dynamicCall("GetConditionNameList()")
+
+    def send_condition(self, scr_num, condition_name, condition_idx, n_search):
+        return self.ocx.dynamicCall(
+            "SendCondition(QString, QString, int, int)", scr_num, condition_name, condition_idx, n_search
+        )
+
+    def send_condition_stop(self, scr_num, condition_name, condition_idx):
+        return self.ocx.dynamicCall("SendConditionStop(QString, QString, int)", scr_num, condition_name, condition_idx)
+
+    def get_master_code_name(self, code):
+        return self.ocx.dynamicCall("GetMasterCodeName(QString)", [code])
+
+    def get_code_list_by_market(self, market):
+        return self.ocx.dynamicCall("GetCodeListByMarket(QString)", [market])
+
+    def set_real_reg(self, scr_num, code_list, fid_list, real_type):
+        return self.ocx.dynamicCall(
+            "SetRealReg(QString, QString, QString, QString)", scr_num, code_list, fid_list, real_type
+        )
+
+    def set_real_remove(self, scr_num, code):
+        return self.ocx.dynamicCall("SetRealRemove(QString, QString)", scr_num, code)
+
+    def disconnect_real_data(self, scr_num):
+        return self.ocx.dynamicCall("DisconnectRealData(QString)", scr_num)
+
+    def get_comm_real_data(self, code, fid):
+        return self.ocx.dynamicCall("GetCommRealData(QString, int)", code, fid)
+
+    def set_input_value(self, id, value):
+        return self.ocx.dynamicCall("SetInputValue(QString, QString)", id, value)
+
+    def comm_rq_data(self, rqname, trcode, next, screen_no):
+        return self.ocx.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, trcode, next, screen_no)
+
+    def get_comm_data(self, trcode, record_name, index, item_name):
+        return self.ocx.dynamicCall(
+            "GetCommData(QString, QString, int, QString)", trcode, record_name, index, item_name
+        )
+
+    def get_repeat_cnt(self, trcode, record_name):
+        return self.ocx.dynamicCall("GetRepeatCnt(QString, QString)", trcode, record_name)
+
+    def send_order(self, rqname, screen_no, acc_no, order_type, code, qty, price, hoga_gb, org_order_no):
+        return self.ocx.dynamicCall(
+            "SendOrder(QString, QString, QString, int, QString, int, int, QString, QString)",
+            [rqname, screen_no, acc_no, order_type, code, qty, price, hoga_gb, org_order_no],
+        )
+
+    def get_chejan_data(self, fid):
+        return self.ocx.dynamicCall("GetChejanData(int)", fid)
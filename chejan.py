@@ -0,0 +1,90 @@
+def parse_int(value): # "+12,300", "-500", "" -> 12300, 500, 0 (부호는 등락 표시라 버림)
+    value = value.strip().lstrip("+-").replace(",", "")
+    return int(value) if value else 0
+
+
+def parse_float(value):
+    value = value.strip().replace(",", "")
+    return float(value) if value else 0.0
+
+
+def parse_str(value):
+    return value.strip()
+
+
+def parse_code(value): # "A005930" -> "005930"
+    return value.replace("A", "").strip()
+
+
+def parse_unsigned_str(value): # 주문구분 "+매수", "-매도정정" -> "매수", "매도정정"
+    return value.replace("+", "").replace("-", "").strip()
+
+
+# sGubun "0": 주문체결 통보 (FID -> (이름, 파서))
+ORDER_FIELDS = {
+    9201: ("계좌번호", parse_str),
+    9203: ("주문번호", parse_str),
+    9001: ("종목코드", parse_code),
+    302: ("종목명", parse_str),
+    900: ("주문수량", parse_int),
+    901: ("주문가격", parse_int),
+    902: ("미체결수량", parse_int),
+    904: ("원주문번호", parse_str),
+    905: ("주문구분", parse_unsigned_str),
+    906: ("매매구분", parse_str),
+    908: ("주문체결시간", parse_str),
+    910: ("체결가격", parse_int),
+    911: ("체결수량", parse_int),
+    913: ("주문상태", parse_str),
+    914: ("단위체결가", parse_int),
+    915: ("단위체결량", parse_int),
+}
+# sGubun "1": 국내주식 잔고통보
+BALANCE_FIELDS = {
+    9201: ("계좌번호", parse_str),
+    9001: ("종목코드", parse_code),
+    302: ("종목명", parse_str),
+    10: ("현재가", parse_int),
+    930: ("보유수량", parse_int),
+    931: ("매입단가", parse_int),
+    932: ("총매입가", parse_int),
+    933: ("주문가능수량", parse_int),
+    945: ("당일순매수량", parse_int),
+    946: ("매도매수구분", parse_str),
+    950: ("당일총매도손익", parse_int),
+    8019: ("손익률", parse_float),
+}
+FIELD_TABLES = {"0": ORDER_FIELDS, "1": BALANCE_FIELDS}
+DEFAULTS = {parse_int: 0, parse_float: 0.0}
+
+
+class ChejanRecord: # 체결/잔고 통보 한건 (FID 값은 한번씩만 읽어서 타입 변환)
+    __slots__ = ("gubun", "raw") + tuple(sorted({name for table in FIELD_TABLES.values() for name, _ in table.values()}))
+
+    def __init__(self, gubun):
+        self.gubun = gubun
+        self.raw = dict() # FID -> 읽어온 문자열
+        for name, parser in FIELD_TABLES.get(gubun, ORDER_FIELDS).values():
+            setattr(self, name, DEFAULTS.get(parser, ""))
+
+    def __repr__(self):
+        table = FIELD_TABLES.get(self.gubun, ORDER_FIELDS)
+        return f"ChejanRecord({self.gubun}, " + ", ".join(f"{name}={getattr(self, name)!r}" for name, _ in table.values()) + ")"
+
+
+def decode_chejan(get_chejan_data, gubun, fid_list, keep_raw=False):
+    # get_chejan_data(fid): GetChejanData, fid_list: OnReceiveChejanData 의 sFIdList (";" 구분)
+    # keep_raw 이면 표에 없는 FID 도 읽어서 raw 에 남긴다 (기록용)
+    table = FIELD_TABLES.get(gubun, None)
+    record = ChejanRecord(gubun)
+    fids = [int(fid) for fid in fid_list.split(";") if fid.strip()] if fid_list else list(table or ())
+    for fid in fids:
+        field = table.get(fid, None) if table else None
+        if field is None and not keep_raw:
+            continue
+        value = get_chejan_data(fid)
+        record.raw[fid] = value
+        if field is not None:
+            name, parser = field
+            setattr(record, name, parser(value))
+    return record
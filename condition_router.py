@@ -0,0 +1,126 @@
+import time
+
+import pandas as pd
+from loguru import logger
+
+MARKET_KOSPI = "0"
+MARKET_KOSDAQ = "10"
+EVENT_IN = "I" # 종목 편입
+EVENT_OUT = "D" # 종목 이탈
+
+
+class ConditionRegistry: # 실시간 등록된 조건식 (조건식 인덱스 -> 화면번호, 조건식이름), 편입/이탈 확인은 dict 조회 한번
+    def __init__(self):
+        self.idx_to_condition = dict() # "000" 형식 조건식 인덱스 -> (화면번호, 조건식이름)
+        self.names = set()
+        self.version = 0 # 등록/해제할 때마다 1씩 증가 (테이블 뷰 갱신용)
+
+    def __len__(self):
+        return len(self.idx_to_condition)
+
+    def __contains__(self, condition_idx):
+        return condition_idx in self.idx_to_condition
+
+    def register(self, condition_idx, screen, condition_name): # 이미 등록되어 있던 조건식이면 이전 화면번호 (없으면 None)
+        previous = self.idx_to_condition.get(condition_idx, None)
+        self.idx_to_condition[condition_idx] = (screen, condition_name)
+        self.names = {name for _, name in self.idx_to_condition.values()}
+        self.version += 1
+        return previous[0] if previous is not None else None
+
+    def unregister(self, condition_idx): # 해제한 조건식의 화면번호 (없으면 None)
+        entry = self.idx_to_condition.pop(condition_idx, None)
+        if entry is None:
+            return None
+        self.names = {name for _, name in self.idx_to_condition.values()}
+        self.version += 1
+        return entry[0]
+
+    def screen_of(self, condition_idx):
+        entry = self.idx_to_condition.get(condition_idx, None)
+        return entry[0] if entry is not None else None
+
+    def has_name(self, condition_name):
+        return condition_name in self.names
+
+    def to_dataframe(self):
+        return pd.DataFrame(
+            [dict(화면번호=screen, 조건식이름=name) for screen, name in self.idx_to_condition.values()],
+            index=list(self.idx_to_condition),
+            columns=["화면번호", "조건식이름"],
+        )
+
+
+class MasterCodeNames: # 종목코드 -> 종목명 (로그인 후 시장별 종목 목록을 한번에 읽어두고 없는 종목만 GetMasterCodeName)
+    def __init__(self, broker):
+        self.broker = broker
+        self.code_to_name = dict()
+        self.misses = 0
+
+    def load(self, markets=(MARKET_KOSPI, MARKET_KOSDAQ)):
+        start = time.perf_counter()
+        for market in markets:
+            for code in self.broker.get_code_list_by_market(market).split(";"):
+                if code and code not in self.code_to_name:
+                    self.code_to_name[code] = self.broker.get_master_code_name(code)
+        logger.info(f"종목명 {len(self.code_to_name)}개 로딩 ({time.perf_counter() - start:.2f}초)")
+        return len(self.code_to_name)
+
+    def get(self, code):
+        name = self.code_to_name.get(code, None)
+        if name is None:
+            self.misses += 1
+            name = self.code_to_name[code] = self.broker.get_master_code_name(code)
+        return name
+
+
+class ConditionEventBatcher: # 짧은 시간(window) 동안 들어온 편입/이탈 이벤트를 종목별 마지막 이벤트만 남겨서 한번에 처리
+    def __init__(self, window=0.005):
+        self.window = window # 첫 이벤트 이후 이 시간(초) 동안 모아서 처리
+        self.pending = dict() # 종목코드 -> (이벤트 종류, 조건식이름)
+        self.received_count = 0
+        self.merged_count = 0 # 처리되기 전에 같은 종목 이벤트로 덮어쓴 개수
+        self.batch_count = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def push(self, code, event_type, condition_name): # 비어있던 버퍼에 처음 들어온 이벤트면 True (flush 예약 필요)
+        self.received_count += 1
+        first = not self.pending
+        if self.pending.pop(code, None) is not None:
+            self.merged_count += 1
+        self.pending[code] = (event_type, condition_name) # 나중 이벤트가 뒤로 가도록 지우고 다시 넣음
+        return first
+
+    def drain(self): # (편입 [(종목코드, 조건식이름), ...], 이탈 [종목코드, ...])
+        if not self.pending:
+            return [], []
+        entered, exited = [], []
+        for code, (event_type, condition_name) in self.pending.items():
+            if event_type == EVENT_IN:
+                entered.append((code, condition_name))
+            else:
+                exited.append(code)
+        self.pending = dict()
+        self.batch_count += 1
+        return entered, exited
+
+    def stats(self):
+        return dict(
+            received=self.received_count,
+            merged=self.merged_count,
+            batches=self.batch_count,
+            pending=len(self.pending),
+        )
+
+
+def select_initial_candidates(codes, limit, exclude=(), rank=None): # 조건검색 초기 결과 중 매수 후보로 쓸 종목 (중복/제외 종목 빼고 limit 개)
+    # rank(codes) -> 우선순위 순서로 정렬된 codes (None 이면 서버가 보낸 순서)
+    candidates = [code for code in dict.fromkeys(codes) if code and code not in exclude]
+    if rank is not None:
+        candidates = rank(candidates)
+    if limit is not None and len(candidates) > limit:
+        logger.info(f"조건검색 초기 결과 {len(candidates)}종목 중 {limit}종목만 매수 후보로 사용")
+        candidates = candidates[:limit]
+    return candidates
@@ -0,0 +1,62 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+ExitSignals = namedtuple("ExitSignals", ["stop_loss", "take_profit"])
+
+
+class ExitRuleEngine: # 보유 종목 전체의 손절/익절/outlier 조건을 NumPy 로 한번에 계산하는 클래스
+    def __init__(self, watchlist, resend_after=10.0, clock=time.monotonic):
+        self.watchlist = watchlist
+        self.resend_after = resend_after # 매도 주문을 낸 종목은 이 시간(초) 동안 다시 매도 신호를 내지 않음
+        self.clock = clock
+        self.exit_sent_times = dict() # 종목코드 -> 마지막 매도 신호 시간 (청산되거나 감시에서 빠진 종목은 evaluate 에서 삭제)
+
+    def evaluate(self):
+        store = self.watchlist
+        n = len(store)
+        self._prune_sent_times()
+        if n == 0:
+            return ExitSignals([], [])
+
+        현재가 = store.view("현재가")
+        목표가 = store.view("목표가")
+        손절가 = store.view("손절가")
+        held = store.view("보유수량") > 0
+        with np.errstate(invalid="ignore"): # NaN 비교는 False
+            stop_mask = held & (현재가 < 손절가)
+            goal_mask = held & ~stop_mask & (현재가 > 목표가)
+
+        codes = store.codes[:n]
+        now = self.clock()
+        stop_loss = self._filter_recent(codes[stop_mask], now)
+        take_profit = self._filter_recent(codes[goal_mask], now)
+        return ExitSignals(stop_loss, take_profit)
+
+    def find_outliers(self): # 매수 주문 이후에도 목표가/손절가가 비어있는 종목
+        return list(self.watchlist.codes[:len(self.watchlist)][self._outlier_mask()])
+
+    def _outlier_mask(self):
+        store = self.watchlist
+        return store.view("매수주문완료여부") & (np.isnan(store.view("목표가")) | np.isnan(store.view("손절가")))
+
+    def _prune_sent_times(self): # 보유수량이 0 이 되었거나 watchlist 에서 빠진 종목의 매도 신호 시간 삭제
+        if not self.exit_sent_times:
+            return
+        store = self.watchlist
+        for code in [code for code in self.exit_sent_times if store.get(code, "보유수량", 0) <= 0]:
+            del self.exit_sent_times[code]
+
+    def _filter_recent(self, codes, now):
+        result = []
+        for code in codes:
+            sent_time = self.exit_sent_times.get(code, None)
+            if sent_time is not None and now - sent_time < self.resend_after:
+                continue
+            self.exit_sent_times[code] = now
+            result.append(code)
+        return result
+
+    def reset(self, code): # 체결/청산 등으로 포지션이 바뀌면 다시 매도 신호를 낼 수 있도록 초기화
+        self.exit_sent_times.pop(code, None)
@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from loguru import logger
+
+# 주문 한건이 거치는 단계 (순서대로)
+STAGE_TICK = "틱수신" # _receive_realdata 에 tick 이 들어온 시점 (정정주문 등은 없음)
+STAGE_DECISION = "판단" # 매수/손절/익절/정정 결정
+STAGE_ENQUEUE = "대기열등록" # scheduler 에 등록
+STAGE_DEQUEUE = "대기열출발" # 요청 제한을 통과해서 scheduler 에서 꺼냄
+STAGE_SENT = "SendOrder완료" # SendOrder 반환
+STAGE_ACCEPTED = "접수" # 체결 데이터 접수
+STAGE_FILLED = "체결" # 체결 데이터 체결
+STAGES = (STAGE_TICK, STAGE_DECISION, STAGE_ENQUEUE, STAGE_DEQUEUE, STAGE_SENT, STAGE_ACCEPTED, STAGE_FILLED)
+TOTAL = "전체" # tick(없으면 판단) 부터 체결까지
+ALL_ORDERS = "모든주문" # 주문종류와 상관없이 모은 histogram 의 order_type
+
+SUB_BUCKET_BITS = 5 # 2의 거듭제곱 구간마다 32개 bucket (상대 오차 약 3%)
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 64 * SUB_BUCKET_COUNT
+
+
+def bucket_index(value_us): # HDR histogram 과 같은 log-linear bucket 번호
+    if value_us < 2 * SUB_BUCKET_COUNT:
+        return value_us
+    shift = value_us.bit_length() - (SUB_BUCKET_BITS + 1)
+    return min((shift + 1) * SUB_BUCKET_COUNT + (value_us >> shift) - SUB_BUCKET_COUNT, BUCKET_COUNT - 1)
+
+
+def bucket_lower_bound(index):
+    if index < 2 * SUB_BUCKET_COUNT:
+        return index
+    shift = index // SUB_BUCKET_COUNT - 1
+    return (index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT) << shift
+
+
+class LatencyHistogram: # 마이크로초 단위 log-linear histogram (기록 O(1), 메모리 고정)
+    def __init__(self):
+        self.counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0 # 초
+        self.max = 0.0
+
+    def record(self, seconds):
+        seconds = max(seconds, 0.0)
+        self.counts[bucket_index(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q): # q: 0~100, 결과는 초
+        if self.count == 0:
+            return 0.0
+        rank = max(int(np.ceil(self.count * q / 100)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return bucket_lower_bound(index) / 1e6
+
+
+class OrderLatencyTracker: # 주문별 단계 시간을 기록하고 (주문종류, 단계) 별 histogram 으로 모은다
+    # 각 단계 histogram 은 바로 이전에 기록된 단계부터 걸린 시간, TOTAL 은 첫 단계부터 체결까지
+    def __init__(self, clock=time.perf_counter, max_age=600.0):
+        self.clock = clock
+        self.max_age = max_age # 이 시간(초) 안에 체결되지 않은 주문은 추적 중단
+        self.histograms = dict() # (주문종류, 단계) -> LatencyHistogram
+        self._pending_ticks = dict() # 종목코드 -> 아직 처리 안된 첫 tick 수신 시간
+        self._applied_ticks = dict() # 종목코드 -> 이번 처리에서 반영된 tick 수신 시간
+        self._sent_by_code = dict() # 종목코드 -> SendOrder 후 접수 대기 중인 trace deque
+        self._by_order_num = dict() # 주문번호 -> 체결 대기 중인 trace
+        self._lock = threading.Lock() # histogram 은 metrics 서버 스레드에서도 읽음
+
+    def now(self):
+        return self.clock()
+
+    def tick_received(self, code):
+        self._pending_ticks.setdefault(code, self.clock())
+
+    def tick_applied(self, code):
+        t = self._pending_ticks.pop(code, None)
+        if t is not None:
+            self._applied_ticks[code] = t
+
+    def end_batch(self): # 손절/익절 판단이 끝나면 반영된 tick 시간은 버린다
+        self._applied_ticks.clear()
+
+    def start(self, order_type, code, decided_at=None): # 대기열 등록 시점에 trace 생성
+        now = self.clock()
+        trace = dict(order_type=order_type, code=code, stages=dict(), last=None, started=now)
+        tick_time = self._applied_ticks.get(code, None)
+        if tick_time is not None:
+            self.mark(trace, STAGE_TICK, tick_time)
+        self.mark(trace, STAGE_DECISION, decided_at if decided_at is not None else now)
+        self.mark(trace, STAGE_ENQUEUE, now)
+        return trace
+
+    def mark(self, trace, stage, t=None):
+        if trace is None:
+            return
+        t = self.clock() if t is None else t
+        if trace["last"] is not None:
+            self._record(trace["order_type"], stage, t - trace["last"])
+        trace["stages"][stage] = t
+        trace["last"] = t
+
+    def sent(self, trace): # SendOrder 성공, 체결 데이터 접수를 기다림
+        if trace is not None:
+            self._sent_by_code.setdefault(trace["code"], deque()).append(trace)
+
+    def accepted(self, code, order_num): # 같은 종목에서 먼저 보낸 주문부터 접수된다고 본다
+        queue = self._sent_by_code.get(code, None)
+        if not queue or order_num in self._by_order_num:
+            return
+        trace = queue.popleft()
+        if not queue:
+            del self._sent_by_code[code]
+        self.mark(trace, STAGE_ACCEPTED)
+        self._by_order_num[order_num] = trace
+
+    def filled(self, order_num): # 첫 체결까지만 기록
+        trace = self._by_order_num.pop(order_num, None)
+        if trace is None:
+            return
+        self.mark(trace, STAGE_FILLED)
+        first = min(trace["stages"].values())
+        self._record(trace["order_type"], TOTAL, trace["stages"][STAGE_FILLED] - first)
+
+    def prune(self): # 오래된 trace 정리
+        deadline = self.clock() - self.max_age
+        for code in list(self._sent_by_code):
+            queue = self._sent_by_code[code]
+            while queue and queue[0]["started"] < deadline:
+                queue.popleft()
+            if not queue:
+                del self._sent_by_code[code]
+        for order_num in [n for n, trace in self._by_order_num.items() if trace["started"] < deadline]:
+            del self._by_order_num[order_num]
+        for code in [c for c, t in self._pending_ticks.items() if t < deadline]:
+            del self._pending_ticks[code]
+
+    def _record(self, order_type, stage, seconds):
+        with self._lock:
+            for key in ((order_type, stage), (ALL_ORDERS, stage)):
+                histogram = self.histograms.get(key, None)
+                if histogram is None:
+                    histogram = self.histograms[key] = LatencyHistogram()
+                histogram.record(seconds)
+
+    def summary(self): # 주기적으로 로그에 남길 요약 (ms)
+        with self._lock:
+            return {
+                f"{order_type}/{stage}": dict(
+                    count=h.count,
+                    p50=round(h.percentile(50) * 1000, 2),
+                    p99=round(h.percentile(99) * 1000, 2),
+                    max=round(h.max * 1000, 2),
+                )
+                for (order_type, stage), h in sorted(self.histograms.items())
+            }
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP autotrade_order_stage_seconds 주문 단계별 지연 (이전 단계부터, stage=전체 는 첫 단계부터 체결까지)",
+            "# TYPE autotrade_order_stage_seconds summary",
+        ]
+        with self._lock:
+            for (order_type, stage), h in sorted(self.histograms.items()):
+                labels = f'order_type="{order_type}",stage="{stage}"'
+                for q in (0.5, 0.9, 0.99, 0.999):
+                    lines.append(f'autotrade_order_stage_seconds{{{labels},quantile="{q}"}} {h.percentile(q * 100):.6f}')
+                lines.append(f"autotrade_order_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"autotrade_order_stage_seconds_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer: # 127.0.0.1 에서 /metrics 로 Prometheus text 형식, /stats 로 구성 요소별 현황 JSON 제공
+    def __init__(self, tracker, port, host="127.0.0.1", stats=None):
+        # stats(): 마지막으로 모아둔 현황 dict (GUI 스레드에서 만든 snapshot 을 반환해야 함)
+        tracker_ref = tracker
+        stats_ref = stats
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body = tracker_ref.prometheus_text().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/stats" and stats_ref is not None:
+                    body = json.dumps(stats_ref(), ensure_ascii=False, default=str).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"metrics 서버 시작: http://{self.server.server_address[0]}:{self.server.server_address[1]}/metrics")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,205 @@
+import datetime
+import heapq
+import itertools
+import time
+
+# 주문 상태
+STATUS_ACCEPTED = "접수"
+STATUS_PARTIAL = "부분체결"
+STATUS_FILLED = "체결"
+STATUS_CORRECTED = "정정" # 정정 주문으로 대체된 원주문
+STATUS_CANCELED = "취소"
+CLOSED_STATUSES = (STATUS_FILLED, STATUS_CORRECTED, STATUS_CANCELED)
+SELL_ORDER_TYPES = ("매도", "매도정정") # 정정 대상 주문구분
+
+
+def seconds_since_hhmmss(hhmmss, now=None): # "HHMMSS" 주문/체결시간부터 지난 초 (파싱 실패시 None)
+    hhmmss = str(hhmmss).strip()
+    if len(hhmmss) < 5 or not hhmmss.isdigit():
+        return None
+    now = now or datetime.datetime.now()
+    order_time = now.replace(hour=int(hhmmss[:-4]), minute=int(hhmmss[-4:-2]), second=int(hhmmss[-2:]), microsecond=0)
+    return (now - order_time).total_seconds()
+
+
+class Order:
+    __slots__ = (
+        "주문번호", "원주문번호", "종목코드", "주문구분", "주문수량", "주문가격", "미체결수량", "체결수량", "체결가격",
+        "상태", "주문체결시간", "correction_deadline", "updated_at",
+    )
+
+    def __init__(self, 주문번호, 종목코드, 주문구분="", 원주문번호=""):
+        self.주문번호 = 주문번호
+        self.원주문번호 = 원주문번호
+        self.종목코드 = 종목코드
+        self.주문구분 = 주문구분
+        self.주문수량 = 0
+        self.주문가격 = 0
+        self.미체결수량 = 0
+        self.체결수량 = 0
+        self.체결가격 = 0
+        self.상태 = STATUS_ACCEPTED
+        self.주문체결시간 = ""
+        self.correction_deadline = None
+        self.updated_at = None # 마지막으로 체결 통보/조회 결과를 반영한 시점 (OrderBook.clock 기준)
+
+    @property
+    def is_open(self):
+        return self.상태 not in CLOSED_STATUSES and self.미체결수량 > 0
+
+    def to_journal(self): # journal 미체결 이벤트 payload
+        return dict(
+            주문번호=self.주문번호,
+            주문구분=self.주문구분,
+            미체결수량=self.미체결수량,
+            주문가격=self.주문가격,
+            주문체결시간=self.주문체결시간,
+        )
+
+    def __repr__(self):
+        return (
+            f"Order({self.주문번호}, {self.종목코드}, {self.주문구분}, {self.상태}, "
+            f"미체결 {self.미체결수량}/{self.주문수량} @ {self.주문가격})"
+        )
+
+
+class OrderBook: # 주문번호/원주문번호/종목코드로 찾을 수 있는 주문 상태 관리 + 매도 미체결 정정 시한 min-heap
+    def __init__(self, correction_delay=10.0, clock=time.monotonic):
+        self.correction_delay = correction_delay # 매도 주문 후 이 시간(초)동안 미체결이면 정정
+        self.clock = clock
+        self.orders = dict() # 주문번호 -> Order (당일 전체)
+        self.by_original = dict() # 원주문번호 -> 정정/취소 주문번호
+        self.open_by_code = dict() # 종목코드 -> 미체결 주문번호 set
+        self._deadlines = [] # (정정 시한, 순번, 주문번호), 시한이 바뀐 항목은 꺼낼 때 무시
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def get(self, 주문번호):
+        return self.orders.get(주문번호, None)
+
+    def correction_of(self, 원주문번호):
+        주문번호 = self.by_original.get(원주문번호, None)
+        return self.orders.get(주문번호, None) if 주문번호 else None
+
+    def open_orders(self, 종목코드=None):
+        if 종목코드 is not None:
+            return [self.orders[n] for n in self.open_by_code.get(종목코드, ())]
+        return [order for order in self.orders.values() if order.is_open]
+
+    def apply_chejan(
+        self, 주문번호, 종목코드, 주문구분, 주문상태, 주문수량=0, 주문가격=0, 미체결수량=0, 체결수량=0, 체결가격=0,
+        주문체결시간="", 원주문번호="",
+    ): # 주문체결 통보(sGubun "0") 반영, 갱신된 Order 반환
+        order = self.orders.get(주문번호, None)
+        if order is None:
+            order = self.orders[주문번호] = Order(주문번호, 종목코드, 주문구분, 원주문번호)
+        order.주문구분 = 주문구분 or order.주문구분
+        order.주문수량 = 주문수량 or order.주문수량
+        order.주문가격 = 주문가격 or order.주문가격
+        order.미체결수량 = 미체결수량
+        order.체결수량 = max(order.체결수량, 체결수량)
+        order.체결가격 = 체결가격 or order.체결가격
+        order.주문체결시간 = 주문체결시간 or order.주문체결시간
+        order.updated_at = self.clock()
+        if "취소" in 주문구분:
+            order.상태 = STATUS_CANCELED
+        elif 주문상태 == "체결" or 체결수량 > 0:
+            order.상태 = STATUS_PARTIAL if 미체결수량 > 0 else STATUS_FILLED
+        else:
+            order.상태 = STATUS_ACCEPTED
+        if 원주문번호 and 원주문번호.strip("0") and 원주문번호 != 주문번호: # 정정/취소 주문이면 원주문은 종료
+            order.원주문번호 = 원주문번호
+            self.by_original[원주문번호] = 주문번호
+            original = self.orders.get(원주문번호, None)
+            if original is not None and original.is_open:
+                original.상태 = STATUS_CANCELED if "취소" in 주문구분 else STATUS_CORRECTED
+                original.미체결수량 = 0
+                self._update_index(original)
+        self._update_index(order)
+        return order
+
+    def restore(self, 주문번호, 종목코드, 주문구분="매도", 미체결수량=0, 주문가격=0, 주문체결시간="", **_): # journal/미체결 조회로 주문 복원
+        order = self.orders.get(주문번호, None)
+        if order is None:
+            order = self.orders[주문번호] = Order(주문번호, 종목코드, 주문구분)
+        order.주문구분 = 주문구분 or order.주문구분
+        order.주문수량 = max(order.주문수량, 미체결수량)
+        order.주문가격 = 주문가격
+        order.미체결수량 = 미체결수량
+        order.주문체결시간 = 주문체결시간 or order.주문체결시간
+        order.updated_at = self.clock()
+        if order.상태 in CLOSED_STATUSES and 미체결수량 > 0:
+            order.상태 = STATUS_ACCEPTED
+        elapsed = seconds_since_hhmmss(order.주문체결시간)
+        self._update_index(order, elapsed=elapsed)
+        return order
+
+    def discard(self, 주문번호): # 미체결 목록에서 제외 (journal 미체결완료, 미체결 조회에 없는 주문)
+        order = self.orders.get(주문번호, None)
+        if order is not None and order.is_open:
+            order.미체결수량 = 0
+            order.상태 = STATUS_FILLED
+            self._update_index(order)
+
+    def missing_orders(self, 주문번호_set, since): # since 이전에 마지막으로 갱신됐는데 미체결 조회 결과(주문번호_set)에 없는 미체결 주문
+        # since 이후에 접수/갱신된 주문은 조회를 보낸 뒤라 결과에 없을 수 있으므로 제외
+        return [
+            order for order in self.open_orders()
+            if order.주문번호 not in 주문번호_set and order.updated_at is not None and order.updated_at < since
+        ]
+
+    def _update_index(self, order, elapsed=None):
+        codes = self.open_by_code.setdefault(order.종목코드, set())
+        if order.is_open:
+            codes.add(order.주문번호)
+            if order.주문구분 in SELL_ORDER_TYPES:
+                # 마지막 접수/체결 시점부터 정정 시한을 다시 잡는다 (journal 복원시에는 주문체결시간 기준)
+                delay = self.correction_delay if elapsed is None else max(self.correction_delay - elapsed, 0.0)
+                self._arm(order, self.clock() + delay)
+        else:
+            codes.discard(order.주문번호)
+            order.correction_deadline = None
+        if not codes:
+            del self.open_by_code[order.종목코드]
+
+    def _arm(self, order, deadline):
+        order.correction_deadline = deadline
+        heapq.heappush(self._deadlines, (deadline, next(self._seq), order.주문번호))
+
+    def next_deadline(self):
+        while self._deadlines:
+            deadline, _, 주문번호 = self._deadlines[0]
+            order = self.orders.get(주문번호, None)
+            if order is not None and order.is_open and order.correction_deadline == deadline:
+                return deadline
+            heapq.heappop(self._deadlines)
+        return None
+
+    def due(self, now=None): # 정정 시한이 지난 미체결 매도 주문 (다시 정정 시한을 잡아서 응답이 없으면 재시도)
+        now = self.clock() if now is None else now
+        due_orders = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, 주문번호 = heapq.heappop(self._deadlines)
+            order = self.orders.get(주문번호, None)
+            if order is None or not order.is_open or order.correction_deadline != deadline:
+                continue
+            due_orders.append(order)
+            self._arm(order, now + self.correction_delay)
+        return due_orders
+
+    def unfinished_items(self): # (주문번호, journal payload) - journal compact 용
+        for order in self.open_orders():
+            info = order.to_journal()
+            info["종목코드"] = order.종목코드
+            yield info.pop("주문번호"), info
+
+    def stats(self):
+        open_orders = self.open_orders()
+        return dict(
+            orders=len(self.orders),
+            open=len(open_orders),
+            open_sell=sum(1 for order in open_orders if order.주문구분 in SELL_ORDER_TYPES),
+            heap=len(self._deadlines),
+        )
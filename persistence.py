@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+
+from loguru import logger
+
+
+def write_pickle(df, f):
+    df.to_pickle(f)
+
+
+def write_csv(df, f):
+    df.to_csv(f, encoding="utf-8")
+
+
+def write_json(data, f):
+    f.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def atomic_write(path, data, write_func): # 임시 파일에 쓰고 fsync 후 rename (중간에 죽어도 기존 파일은 그대로)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write_func(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PersistenceWriter: # pickle/CSV/JSON 저장을 별도 스레드에서 처리하는 클래스
+    def __init__(self):
+        self._pending = dict() # 파일 경로 -> (저장할 snapshot, 저장 함수, 저장 후 호출할 함수, 실패시 호출할 함수), 같은 경로는 마지막 요청만 남긴다
+        self._condition = threading.Condition()
+        self._writing = False
+        self._stopped = False
+        self.write_count = 0
+        self.merged_count = 0
+        self.failed_count = 0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+        self.total_write_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="PersistenceWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, path, snapshot, write_func, on_written=None, on_failed=None): # snapshot 은 호출하는 쪽에서 복사해서 넘겨야 함
+        with self._condition:
+            previous = self._pending.get(path, None)
+            if previous is not None:
+                self.merged_count += 1
+                if previous[2] is not None and on_written is None: # 합쳐진 요청의 후처리도 유지
+                    on_written = previous[2]
+                if previous[3] is not None and on_failed is None:
+                    on_failed = previous[3]
+            self._pending[path] = (snapshot, write_func, on_written, on_failed)
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if not self._pending and self._stopped:
+                    return
+                pending = self._pending
+                self._pending = dict()
+                self._writing = True
+            for path, (snapshot, write_func, on_written, on_failed) in pending.items():
+                start = time.perf_counter()
+                try:
+                    atomic_write(path, snapshot, write_func)
+                except Exception as e:
+                    self.failed_count += 1
+                    logger.exception(e)
+                    self._notify(on_failed, path)
+                    continue
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.write_count += 1
+                self.last_write_ms = elapsed_ms
+                self.max_write_ms = max(self.max_write_ms, elapsed_ms)
+                self.total_write_ms += elapsed_ms
+                self._notify(on_written, path)
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+    @staticmethod
+    def _notify(callback, path):
+        if callback is None:
+            return
+        try:
+            callback(path)
+        except Exception as e:
+            logger.exception(e)
+
+    def flush(self, timeout=5.0): # 대기중인 저장이 모두 끝날 때까지 기다림
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        self.flush(timeout)
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return dict(
+            writes=self.write_count,
+            merged=self.merged_count,
+            failed=self.failed_count,
+            pending=len(self._pending),
+            last_ms=round(self.last_write_ms, 2),
+            max_ms=round(self.max_write_ms, 2),
+            avg_ms=round(self.total_write_ms / self.write_count, 2) if self.write_count else 0.0,
+        )
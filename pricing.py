@@ -0,0 +1,110 @@
+import numpy as np
+
+MARKET_KOSPI = "0"
+MARKET_KOSDAQ = "10"
+
+# KRX 호가가격단위 (2023년 1월 이후 유가증권/코스닥 동일)
+# 가격이 TICK_BOUNDS[i-1] 이상 TICK_BOUNDS[i] 미만이면 TICK_SIZES[i]
+KRX_TICK_TABLE = (
+    np.array([2000, 5000, 20000, 50000, 200000, 500000], dtype=np.int64),
+    np.array([1, 5, 10, 50, 100, 500, 1000], dtype=np.int64),
+)
+TICK_TABLES = {MARKET_KOSPI: KRX_TICK_TABLE, MARKET_KOSDAQ: KRX_TICK_TABLE}
+
+ROUND_DOWN = "down"
+ROUND_UP = "up"
+
+
+def tick_size(prices, market=MARKET_KOSPI): # 가격(배열) -> 호가단위(배열)
+    bounds, sizes = TICK_TABLES[market]
+    return sizes[np.searchsorted(bounds, prices, side="right")]
+
+
+def round_to_tick(prices, direction=ROUND_DOWN, market=MARKET_KOSPI): # 가격(배열)을 유효한 호가로 맞춘다 (매도는 내림, 매수는 올림)
+    prices = np.asarray(prices, dtype=np.float64)
+    ticks = tick_size(prices, market)
+    if direction == ROUND_DOWN:
+        return (np.floor(prices / ticks) * ticks).astype(np.int64)
+    return (np.ceil(prices / ticks) * ticks).astype(np.int64)
+
+
+def build_ladder(lower, upper, market=MARKET_KOSPI): # 하한가 ~ 상한가 사이의 모든 유효 호가 (오름차순)
+    bounds, sizes = TICK_TABLES[market]
+    edges = np.concatenate(([0], bounds, [np.iinfo(np.int64).max]))
+    parts = []
+    for start, end, size in zip(edges[:-1], edges[1:], sizes):
+        start, end = max(start, lower), min(end, upper + 1)
+        if start >= end:
+            continue
+        first = -(-start // size) * size # start 이상인 첫 호가
+        parts.append(np.arange(first, end, size, dtype=np.int64))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+class TickLadder: # 종목 하나의 호가 사다리 (호가 -> 위치 dict 로 "n 호가 아래" 를 O(1) 로 계산)
+    __slots__ = ("lower", "upper", "prices", "index")
+
+    def __init__(self, lower, upper, market=MARKET_KOSPI):
+        self.lower = int(lower) # 하한가
+        self.upper = int(upper) # 상한가
+        self.prices = build_ladder(self.lower, self.upper, market)
+        self.index = {price: i for i, price in enumerate(self.prices.tolist())}
+
+    def position(self, price): # price 이하인 가장 높은 호가의 위치
+        i = self.index.get(price, None)
+        if i is None:
+            i = int(np.searchsorted(self.prices, price, side="right")) - 1
+        return min(max(i, 0), len(self.prices) - 1)
+
+    def offset(self, price, n): # price 에서 n 호가 위(음수면 아래) 가격, 상한가/하한가를 넘지 않음
+        i = min(max(self.position(price) + n, 0), len(self.prices) - 1)
+        return int(self.prices[i])
+
+
+class PricingEngine: # 매도/정정 주문 가격 정책 (유효 호가, 상한가/하한가 안에서 최우선 매수호가 기준 공격적 지정가)
+    def __init__(self, basic_info_cache, stop_loss_ticks=2, take_profit_ticks=0, correction_ticks=3, market_of=None):
+        # *_ticks: 최우선 매수호가보다 몇 호가 아래로 낼지 (0 이면 최우선 매수호가)
+        # market_of(종목코드) -> 시장 구분 (None 이면 MARKET_KOSPI 호가표)
+        self.basic_info_cache = basic_info_cache
+        self.stop_loss_ticks = stop_loss_ticks
+        self.take_profit_ticks = take_profit_ticks
+        self.correction_ticks = correction_ticks
+        self.market_of = market_of
+        self.ladders = dict() # 종목코드 -> TickLadder (상한가/하한가가 바뀌면 다시 만든다)
+        self.counters = dict(ladder_built=0, no_ladder=0)
+
+    def _market(self, code):
+        return self.market_of(code) if self.market_of is not None else MARKET_KOSPI
+
+    def ladder(self, code): # 당일 기본정보(상한가/하한가)가 없으면 None
+        info = self.basic_info_cache.get(code)
+        if not info:
+            return None
+        ladder = self.ladders.get(code, None)
+        if ladder is None or ladder.upper != info["상한가"] or ladder.lower != info["하한가"]:
+            ladder = self.ladders[code] = TickLadder(info["하한가"], info["상한가"], self._market(code))
+            self.counters["ladder_built"] += 1
+        return ladder
+
+    def ticks_below(self, code, price, n): # price 에서 n 호가 아래 유효 호가
+        ladder = self.ladder(code)
+        if ladder is not None:
+            return ladder.offset(int(price), -n)
+        self.counters["no_ladder"] += 1 # 기본정보가 없으면 호가표로 한 호가씩 내려간다
+        market = self._market(code)
+        price = int(round_to_tick(price, ROUND_DOWN, market))
+        for _ in range(n):
+            price = max(price - int(tick_size(price - 1, market)), 1)
+        return price
+
+    def stop_loss_price(self, code, best_bid):
+        return self.ticks_below(code, best_bid, self.stop_loss_ticks)
+
+    def take_profit_price(self, code, now_price, best_bid=None):
+        return self.ticks_below(code, best_bid or now_price, self.take_profit_ticks)
+
+    def correction_price(self, code, best_bid):
+        return self.ticks_below(code, best_bid, self.correction_ticks)
+
+    def stats(self):
+        return dict(ladders=len(self.ladders), **self.counters)
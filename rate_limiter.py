@@ -0,0 +1,63 @@
+import time
+
+# (구간 길이(초), 구간 내 최대 요청 수, 이름)
+DEFAULT_TR_LIMITS = (
+    (1.0, 4, "초"),
+    (60.0, 55, "분"),
+    (3600.0, 950, "시간"),
+)
+
+
+class TrRateLimiter: # 초/분/시간 단위 TR 요청 제한을 O(1) 로 검사하는 클래스
+    # 최근 요청 시간을 고정 크기 링버퍼에 저장하고, 구간별로 budget 번째 이전 요청 시간만 확인한다.
+    # 토큰 버킷은 구간 경계에서 budget 의 2배까지 허용할 수 있어서 키움 제한을 넘을 수 있으므로 사용하지 않음
+    def __init__(self, limits=DEFAULT_TR_LIMITS, clock=time.monotonic):
+        self.limits = tuple(limits)
+        self.clock = clock
+        self._capacity = max(budget for _, budget, _ in self.limits)
+        self._send_times = [0.0] * self._capacity
+        self._head = 0 # 다음에 기록할 위치
+        self._count = 0
+        self.sent_count = 0
+        self.throttled_counts = {name: 0 for _, _, name in self.limits}
+
+    def _kth_latest(self, k): # k 번째 최근 요청 시간 (k=1 이 가장 최근)
+        return self._send_times[(self._head - k) % self._capacity]
+
+    def time_until_next_slot(self, now=None): # 다음 요청 가능 시점까지 남은 시간(초), 바로 가능하면 0
+        if now is None:
+            now = self.clock()
+        wait = 0.0
+        for window, budget, _ in self.limits:
+            if self._count >= budget:
+                wait = max(wait, self._kth_latest(budget) + window - now)
+        return wait
+
+    def can_send(self, now=None):
+        if now is None:
+            now = self.clock()
+        allowed = True
+        for window, budget, name in self.limits:
+            if self._count >= budget and now - self._kth_latest(budget) < window:
+                self.throttled_counts[name] += 1
+                allowed = False
+        return allowed
+
+    def record_send(self, now=None):
+        if now is None:
+            now = self.clock()
+        self._send_times[self._head] = now
+        self._head = (self._head + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+        self.sent_count += 1
+
+    def try_acquire(self, now=None): # 요청 가능하면 바로 기록하고 True
+        if now is None:
+            now = self.clock()
+        if not self.can_send(now):
+            return False
+        self.record_send(now)
+        return True
+
+    def stats(self):
+        return dict(sent=self.sent_count, throttled=dict(self.throttled_counts))
@@ -0,0 +1,127 @@
+import math
+
+from loguru import logger
+
+REAL_FID_LIST = "10;12;20;28" # "10": "현재가", "12": "등락율", "20": "체결시간", "28": "(최우선)매수호가"
+CODES_PER_SCREEN = 100 # SetRealReg 한번(화면 하나)에 등록할 수 있는 최대 종목 수
+REAL_TYPE_REPLACE = "0" # 화면의 기존 등록을 지우고 새로 등록
+REAL_TYPE_APPEND = "1" # 화면에 종목 추가
+
+
+class RealtimeSubscriptionManager: # 실시간 체결 등록을 화면당 최대 100종목씩 묶어서 관리
+    def __init__(self, broker, lease_screen, release_screen, fid_list=REAL_FID_LIST, codes_per_screen=CODES_PER_SCREEN):
+        # lease_screen(): 실시간 등록용 화면번호를 빌려옴 (없으면 None), release_screen(화면번호): 반납 (DisconnectRealData 포함)
+        self.broker = broker
+        self.lease_screen = lease_screen
+        self.release_screen = release_screen
+        self.fid_list = fid_list
+        self.codes_per_screen = codes_per_screen
+        self.screen_to_codes = dict() # 화면번호 -> 등록된 종목코드 set
+        self.code_to_screen = dict() # 종목코드 -> 화면번호
+        self.counters = dict(set_real_reg=0, set_real_remove=0, moved=0)
+
+    def __len__(self):
+        return len(self.code_to_screen)
+
+    def __contains__(self, code):
+        return code in self.code_to_screen
+
+    def add(self, codes): # 새 종목들을 빈 자리가 있는 화면부터 채워서 화면마다 SetRealReg 한번씩
+        new_codes = [code for code in dict.fromkeys(codes) if code and code not in self.code_to_screen] # 순서 유지, 중복 제거
+        if new_codes:
+            self._register(new_codes)
+        return new_codes
+
+    def _register(self, codes, exclude=None): # 실제로 등록한 종목코드 list (화면이 부족하면 일부만)
+        by_screen = dict()
+        # 많이 찬 화면부터 채워서 사용하는 화면 수를 줄인다
+        screens = sorted(
+            (s for s in self.screen_to_codes if s != exclude and len(self.screen_to_codes[s]) < self.codes_per_screen),
+            key=lambda s: -len(self.screen_to_codes[s]),
+        )
+        position = 0
+        for screen in screens:
+            room = self.codes_per_screen - len(self.screen_to_codes[screen])
+            by_screen[screen] = codes[position:position + room]
+            position += room
+            if position >= len(codes):
+                break
+        while position < len(codes):
+            screen = self.lease_screen()
+            if screen is None:
+                logger.info(f"실시간 등록 화면 부족, 등록 실패: {len(codes) - position}종목")
+                break
+            self.screen_to_codes[screen] = set()
+            by_screen[screen] = codes[position:position + self.codes_per_screen]
+            position += self.codes_per_screen
+        for screen, screen_codes in by_screen.items():
+            if not screen_codes:
+                continue
+            real_type = REAL_TYPE_APPEND if self.screen_to_codes[screen] else REAL_TYPE_REPLACE
+            self.broker.set_real_reg(screen, ";".join(screen_codes), self.fid_list, real_type)
+            self.counters["set_real_reg"] += 1
+            self.screen_to_codes[screen].update(screen_codes)
+            for code in screen_codes:
+                self.code_to_screen[code] = screen
+            logger.info(f"실시간 등록 완료!! 화면번호: {screen}, {len(screen_codes)}종목 ({real_type})")
+        return codes[:position]
+
+    def remove(self, codes): # 감시가 끝난 종목은 SetRealRemove, 화면의 종목이 모두 빠지면 한번에 해제하고 반납
+        by_screen = dict()
+        for code in codes:
+            screen = self.code_to_screen.pop(code, None)
+            if screen is not None:
+                by_screen.setdefault(screen, []).append(code)
+        removed = []
+        for screen, screen_codes in by_screen.items():
+            self.screen_to_codes[screen].difference_update(screen_codes)
+            if self.screen_to_codes[screen]:
+                for code in screen_codes:
+                    self.broker.set_real_remove(screen, code)
+                    self.counters["set_real_remove"] += 1
+            else:
+                self.broker.set_real_remove(screen, "ALL")
+                self.counters["set_real_remove"] += 1
+                self._release(screen)
+            removed.extend(screen_codes)
+        if removed:
+            logger.info(f"실시간 해제 완료!! {len(removed)}종목")
+        return removed
+
+    def _release(self, screen):
+        self.screen_to_codes.pop(screen, None)
+        self.release_screen(screen)
+
+    def sync(self, codes): # 등록된 종목을 codes 와 같게 맞춘다
+        codes = set(codes)
+        removed = self.remove([code for code in self.code_to_screen if code not in codes])
+        added = self.add(sorted(codes))
+        if removed:
+            self.rebalance()
+        return added, removed
+
+    def rebalance(self, slack=1): # 필요한 화면 수보다 slack 개 넘게 쓰고 있으면 가장 비어있는 화면의 종목을 다른 화면으로 옮긴다
+        needed = math.ceil(len(self.code_to_screen) / self.codes_per_screen)
+        while len(self.screen_to_codes) > needed + slack:
+            screen = min(self.screen_to_codes, key=lambda s: len(self.screen_to_codes[s]))
+            codes = sorted(self.screen_to_codes[screen])
+            moved = self._register(codes, exclude=screen) # 먼저 다른 화면에 등록하고 나서 기존 화면을 해제 (tick 끊김 없음)
+            self.counters["moved"] += len(moved)
+            if len(moved) < len(codes): # 다 옮기지 못하면 옮긴 종목만 기존 화면에서 빼고 나머지는 그대로 둔다
+                self.screen_to_codes[screen].difference_update(moved)
+                for code in moved:
+                    self.broker.set_real_remove(screen, code)
+                    self.counters["set_real_remove"] += 1
+                break
+            self.broker.set_real_remove(screen, "ALL")
+            self.counters["set_real_remove"] += 1
+            self._release(screen)
+
+    def clear(self):
+        for screen in list(self.screen_to_codes):
+            self.broker.set_real_remove(screen, "ALL")
+            self._release(screen)
+        self.code_to_screen.clear()
+
+    def stats(self):
+        return dict(codes=len(self.code_to_screen), screens=len(self.screen_to_codes), **self.counters)
@@ -0,0 +1,134 @@
+import time
+from collections import deque
+
+from loguru import logger
+
+# 우선순위 (숫자가 작을수록 먼저 처리)
+PRIORITY_EXIT_ORDER = 0 # 손절/익절 매도 주문
+PRIORITY_BUY_ORDER = 1 # 매수 주문
+PRIORITY_CORRECTION_ORDER = 2 # 정정 주문
+PRIORITY_ACCOUNT_QUERY = 3 # 계좌/미체결 조회
+PRIORITY_BASIC_INFO = 4 # 종목 기본정보 조회
+
+PRIORITY_NAMES = {
+    PRIORITY_EXIT_ORDER: "매도주문",
+    PRIORITY_BUY_ORDER: "매수주문",
+    PRIORITY_CORRECTION_ORDER: "정정주문",
+    PRIORITY_ACCOUNT_QUERY: "계좌조회",
+    PRIORITY_BASIC_INFO: "기본정보조회",
+}
+
+
+class ScheduledRequest:
+    __slots__ = ("priority", "key", "func", "args", "enqueued_at", "retries")
+
+    def __init__(self, priority, key, func, args, enqueued_at):
+        self.priority = priority
+        self.key = key
+        self.func = func
+        self.args = args
+        self.enqueued_at = enqueued_at
+        self.retries = 0
+
+
+class RequestScheduler: # TR 요청과 주문을 우선순위별로 모아서 요청 제한 안에서 보내는 클래스
+    def __init__(self, rate_limiter, clock=time.monotonic, retry_delay=0.2, max_retries=25):
+        self.rate_limiter = rate_limiter
+        self.clock = clock
+        self.retry_delay = retry_delay # 보내지 못한 요청(화면번호 부족 등)을 다시 시도하기까지 기다릴 시간(초)
+        self.max_retries = max_retries # 이만큼 다시 시도해도 못 보내면 버린다 (잘못된 요청이 계속 남지 않도록)
+        self.retry_at = 0.0
+        self.queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self.key_to_request = dict() # 같은 key 요청은 하나로 합친다
+        self.merged_counts = {priority: 0 for priority in PRIORITY_NAMES}
+        self.dispatched_counts = {priority: 0 for priority in PRIORITY_NAMES}
+        self.retried_counts = {priority: 0 for priority in PRIORITY_NAMES}
+        self.total_wait_times = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.max_wait_times = {priority: 0.0 for priority in PRIORITY_NAMES}
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, priority, func, *args, key=None): # 새 요청이면 True, 이미 대기중인 요청과 합쳐지면 False
+        if key is not None:
+            pending = self.key_to_request.get(key, None)
+            if pending is not None:
+                pending.func = func
+                pending.args = args # 대기 순서는 유지하고 인자만 최신 값으로 변경
+                self.merged_counts[pending.priority] += 1
+                return False
+        request = ScheduledRequest(priority, key, func, args, self.clock())
+        self.queues[priority].append(request)
+        if key is not None:
+            self.key_to_request[key] = request
+        return True
+
+    def is_pending(self, key):
+        return key in self.key_to_request
+
+    def _pop_next(self):
+        for priority in sorted(self.queues):
+            queue = self.queues[priority]
+            if queue:
+                request = queue.popleft()
+                if request.key is not None:
+                    self.key_to_request.pop(request.key, None)
+                return request
+        return None
+
+    def dispatch(self): # 요청 제한이 허용하는 만큼 우선순위 순서대로 실행하고 보낸 개수를 반환 (func 는 보냈으면 True 를 반환)
+        dispatched = 0
+        failed = []
+        try:
+            while len(self) > 0 and self.rate_limiter.can_send():
+                request = self._pop_next()
+                if not request.func(*request.args): # 화면번호 부족 등으로 보내지 못한 요청은 제한 횟수에 넣지 않고 다시 대기
+                    failed.append(request)
+                    continue
+                self.rate_limiter.record_send()
+                wait_time = self.clock() - request.enqueued_at
+                self.total_wait_times[request.priority] += wait_time
+                self.max_wait_times[request.priority] = max(self.max_wait_times[request.priority], wait_time)
+                self.dispatched_counts[request.priority] += 1
+                dispatched += 1
+        finally:
+            self._requeue(failed)
+        return dispatched
+
+    def _requeue(self, requests): # 보내지 못한 요청을 원래 우선순위 맨 앞에 다시 넣는다 (순서 유지)
+        if not requests:
+            return
+        for request in reversed(requests):
+            request.retries += 1
+            if request.retries > self.max_retries:
+                logger.info(f"{PRIORITY_NAMES[request.priority]} 요청 {self.max_retries}회 재시도 실패, 요청 버림: {request.key}")
+                continue
+            if request.key is not None:
+                if request.key in self.key_to_request: # 그 사이 같은 key 로 새로 들어온 요청이 있으면 그것을 보낸다
+                    continue
+                self.key_to_request[request.key] = request
+            self.queues[request.priority].appendleft(request)
+            self.retried_counts[request.priority] += 1
+        self.retry_at = self.clock() + self.retry_delay
+
+    def next_delay(self): # 다음 실행까지 기다릴 시간(초), 대기중인 요청이 없으면 None
+        if len(self) == 0:
+            return None
+        return max(self.rate_limiter.time_until_next_slot(), self.retry_at - self.clock())
+
+    def stats(self):
+        now = self.clock()
+        result = dict()
+        for priority, name in PRIORITY_NAMES.items():
+            queue = self.queues[priority]
+            dispatched = self.dispatched_counts[priority]
+            result[name] = dict(
+                depth=len(queue),
+                oldest_wait=round(now - queue[0].enqueued_at, 3) if queue else 0.0,
+                dispatched=dispatched,
+                merged=self.merged_counts[priority],
+                retried=self.retried_counts[priority],
+                avg_wait=round(self.total_wait_times[priority] / dispatched, 3) if dispatched else 0.0,
+                max_wait=round(self.max_wait_times[priority], 3),
+            )
+        return result
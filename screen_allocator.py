@@ -0,0 +1,88 @@
+import time
+from collections import deque
+
+from loguru import logger
+
+# 용도별 화면번호 범위 (키움은 화면번호 200개까지 사용 가능)
+POOL_TR = "TR" # CommRqData 조회
+POOL_ORDER = "주문" # SendOrder
+POOL_CONDITION = "조건검색" # SendCondition 실시간 조건검색
+POOL_REAL = "실시간" # SetRealReg 실시간 체결
+DEFAULT_POOLS = {
+    POOL_TR: range(5000, 5050),
+    POOL_ORDER: range(5100, 5180),
+    POOL_CONDITION: range(5200, 5220),
+    POOL_REAL: range(6000, 6020),
+}
+# 응답이 오지 않아도 이 시간(초)이 지나면 반납 (None 이면 직접 반납할 때까지 유지)
+DEFAULT_LEASE_TIMEOUTS = {
+    POOL_TR: 10.0,
+    POOL_ORDER: 10.0,
+    POOL_CONDITION: None,
+    POOL_REAL: None,
+}
+# 실시간 데이터가 연결되는 화면 (반납할 때만 on_release 로 DisconnectRealData, TR/주문 화면은 그냥 반납)
+REALTIME_POOLS = (POOL_CONDITION, POOL_REAL)
+
+
+class ScreenAllocator: # 용도별 화면번호 pool 에서 빌려주고 응답/시간초과 시 돌려받는다
+    def __init__(self, pools=None, lease_timeouts=None, on_release=None, clock=time.monotonic, release_pools=REALTIME_POOLS):
+        # on_release(화면번호): release_pools 의 화면을 반납할 때 호출 (DisconnectRealData 등 정리)
+        pools = DEFAULT_POOLS if pools is None else pools
+        self.lease_timeouts = dict(DEFAULT_LEASE_TIMEOUTS if lease_timeouts is None else lease_timeouts)
+        self.on_release = on_release
+        self.release_pools = frozenset(release_pools)
+        self.clock = clock
+        self.free = {pool: deque(str(scr_num) for scr_num in screens) for pool, screens in pools.items()} # 오래전에 반납된 화면부터 사용
+        self.leases = dict() # 화면번호 -> (pool, owner, 빌린 시간)
+        self.counters = {pool: dict(leased=0, released=0, expired=0, exhausted=0) for pool in pools}
+
+    def lease(self, pool, owner=None):
+        free = self.free[pool]
+        if not free:
+            self.counters[pool]["exhausted"] += 1
+            logger.info(f"화면번호 부족!! pool: {pool}, 사용중: {self.in_use(pool)}개")
+            return None
+        screen = free.popleft()
+        self.leases[screen] = (pool, owner, self.clock())
+        self.counters[pool]["leased"] += 1
+        return screen
+
+    def release(self, screen, expired=False):
+        lease = self.leases.pop(screen, None)
+        if lease is None:
+            return False
+        pool = lease[0]
+        self.counters[pool]["expired" if expired else "released"] += 1
+        if self.on_release is not None and pool in self.release_pools:
+            self.on_release(screen)
+        self.free[pool].append(screen)
+        return True
+
+    def owner(self, screen):
+        lease = self.leases.get(screen, None)
+        return lease[1] if lease else None
+
+    def is_leased(self, screen):
+        return screen in self.leases
+
+    def in_use(self, pool):
+        return sum(1 for lease in self.leases.values() if lease[0] == pool)
+
+    def expire(self, now=None): # 응답이 오지 않은 오래된 화면 반납
+        now = self.clock() if now is None else now
+        expired = []
+        for screen, (pool, owner, leased_at) in list(self.leases.items()):
+            timeout = self.lease_timeouts.get(pool, None)
+            if timeout is not None and now - leased_at >= timeout:
+                self.release(screen, expired=True)
+                expired.append((screen, pool, owner))
+        if expired:
+            logger.info(f"응답 없는 화면번호 반납: {expired}")
+        return expired
+
+    def stats(self):
+        return {
+            pool: dict(in_use=self.in_use(pool), free=len(self.free[pool]), **counters)
+            for pool, counters in self.counters.items()
+        }
@@ -0,0 +1,427 @@
+import datetime
+import heapq
+import itertools
+import random
+import time
+
+from broker import BrokerBackend, Signal, SIGNAL_NAMES
+from rate_limiter import TrRateLimiter
+
+# 키움 공식 TR 제한 (초당 5회, 분당 60회, 시간당 1000회)
+KIWOOM_TR_LIMITS = (
+    (1.0, 5, "초"),
+    (60.0, 60, "분"),
+    (3600.0, 1000, "시간"),
+)
+OP_ERR_SISE_OVERFLOW = -200 # 조회 과부하
+OP_ERR_ORD_OVERFLOW = -308 # 주문 과부하
+
+ORDER_TYPE_NAMES = {1: "+매수", 2: "-매도", 3: "매수취소", 4: "매도취소", 5: "+매수정정", 6: "-매도정정"}
+
+
+def now_hhmmss():
+    return datetime.datetime.now().strftime("%H%M%S")
+
+
+def default_fill_model(order, quote): # 체결가를 반환, 체결 안되면 None
+    if order["호가구분"] == "03": # 시장가
+        return quote["현재가"]
+    if order["매수"]:
+        return order["주문가격"] if quote["현재가"] <= order["주문가격"] else None
+    return order["주문가격"] if quote["최우선매수호가"] >= order["주문가격"] else None
+
+
+class SimulatedBroker(BrokerBackend): # 키움 OpenAPI 없이 같은 이벤트를 발생시키는 로컬 시뮬레이터
+    poll_interval_ms = 1
+
+    def __init__(
+        self,
+        account_num="8888888811",
+        deposit=10_000_000,
+        conditions=None,
+        names=None,
+        latency=0.02,
+        fill_model=default_fill_model,
+        tr_limits=KIWOOM_TR_LIMITS,
+        page_size=20,
+        clock=time.monotonic,
+    ):
+        for name in SIGNAL_NAMES:
+            setattr(self, name, Signal())
+        self.account_num = account_num
+        self.deposit = deposit
+        self.conditions = dict(conditions or {"000": "시뮬레이션조건식"}) # 조건식 인덱스 -> 조건식 이름
+        self.condition_members = {idx: set() for idx in self.conditions}
+        self.active_conditions = dict() # 실시간 등록된 조건식 인덱스 -> 화면번호
+        self.names = dict(names or {}) # 종목코드 -> 종목명
+        self.latency = latency # 초 또는 (종류) -> 초 를 반환하는 함수
+        self.fill_model = fill_model
+        self.clock = clock
+        self.tr_limiter = TrRateLimiter(tr_limits, clock)
+        self.page_size = page_size # 멀티데이터를 이 행 수씩 나눠서 보낸다 (나머지는 sPrevNext "2" 연속조회)
+
+        self.quotes = dict() # 종목코드 -> dict(현재가, 등락율, 체결시간, 최우선매수호가)
+        self.real_screens = dict() # 화면번호 -> 실시간 등록 종목코드 set
+        self.inputs = dict()
+        self.tr_results = dict() # (trcode, rqname) -> dict(single=..., multi=[...])
+        self.tr_continuations = dict() # (trcode, rqname) -> 아직 보내지 않은 멀티데이터 행
+        self.positions = dict() # 종목코드 -> dict(보유수량, 매입가)
+        self.orders = dict() # 주문번호 -> 주문 dict
+        self._order_nums = itertools.count(1)
+        self._events = [] # (실행시간, 순번, 함수, 인자)
+        self._event_seq = itertools.count()
+        self._current_real_code = None
+        self._current_chejan = dict()
+        self.counters = dict(ticks=0, real_events=0, tr=0, tr_rejected=0, orders=0, orders_rejected=0, fills=0)
+
+    # 이벤트 처리
+    def _delay(self, kind):
+        return self.latency(kind) if callable(self.latency) else self.latency
+
+    def _schedule(self, delay, func, *args):
+        heapq.heappush(self._events, (self.clock() + delay, next(self._event_seq), func, args))
+
+    def poll(self, now=None): # 시간이 된 이벤트를 모두 발생시키고 개수를 반환
+        if now is None:
+            now = self.clock()
+        count = 0
+        while self._events and self._events[0][0] <= now:
+            _, _, func, args = heapq.heappop(self._events)
+            func(*args)
+            count += 1
+        return count
+
+    def run_until_idle(self, timeout=5.0): # 대기 중인 이벤트가 없어질 때까지 실행 (테스트/벤치마크용)
+        deadline = self.clock() + timeout
+        while self._events and self.clock() < deadline:
+            wait = self._events[0][0] - self.clock()
+            if wait > 0:
+                time.sleep(min(wait, 0.001))
+            self.poll()
+        return not self._events
+
+    # 로그인 / 조건식
+    def comm_connect(self):
+        self._schedule(self._delay("login"), self.OnEventConnect.emit, 0)
+        return 0
+
+    def get_login_info(self, tag):
+        if tag == "ACCNO":
+            return f"{self.account_num};"
+        return ""
+
+    def get_condition_load(self):
+        self._schedule(self._delay("condition"), self.OnReceiveConditionVer.emit, 1, "")
+        return 1
+
+    def get_condition_name_list(self):
+        return "".join(f"{idx}^{name};" for idx, name in self.conditions.items())
+
+    def send_condition(self, scr_num, condition_name, condition_idx, n_search):
+        idx = str(condition_idx).zfill(3)
+        if idx not in self.conditions:
+            return 0
+        if int(n_search) == 1:
+            self.active_conditions[idx] = scr_num
+        code_list = "".join(f"{code};" for code in sorted(self.condition_members[idx]))
+        self._schedule(
+            self._delay("condition"), self.OnReceiveTrCondition.emit, scr_num, code_list, condition_name, int(idx), 0
+        )
+        return 1
+
+    def send_condition_stop(self, scr_num, condition_name, condition_idx):
+        self.active_conditions.pop(str(condition_idx).zfill(3), None)
+
+    def trigger_condition(self, code, event_type, condition_idx="000"): # 조건식 편입("I")/이탈("D") 발생
+        idx = str(condition_idx).zfill(3)
+        members = self.condition_members.setdefault(idx, set())
+        if event_type == "I":
+            members.add(code)
+        else:
+            members.discard(code)
+        if idx in self.active_conditions:
+            self.OnReceiveRealCondition.emit(code, event_type, self.conditions[idx], str(int(idx)))
+
+    def get_master_code_name(self, code):
+        return self.names.get(code, code)
+
+    def get_code_list_by_market(self, market):
+        return "".join(f"{code};" for code in self.names)
+
+    # 실시간 시세
+    def set_real_reg(self, scr_num, code_list, fid_list, real_type):
+        codes = {code for code in code_list.split(";") if code}
+        if real_type == "0" or scr_num not in self.real_screens:
+            self.real_screens[scr_num] = set()
+        self.real_screens[scr_num] |= codes
+        return 0
+
+    def set_real_remove(self, scr_num, code):
+        if scr_num == "ALL":
+            screens = list(self.real_screens)
+        else:
+            screens = [scr_num] if scr_num in self.real_screens else []
+        for screen in screens:
+            if code == "ALL":
+                self.real_screens.pop(screen)
+            else:
+                self.real_screens[screen].discard(code)
+
+    def disconnect_real_data(self, scr_num):
+        self.real_screens.pop(scr_num, None)
+
+    def is_registered(self, code):
+        return any(code in codes for codes in self.real_screens.values())
+
+    def set_quote(self, code, price, best_bid=None, name=None, change=0.0, time_str=None):
+        if name is not None:
+            self.names[code] = name
+        self.quotes[code] = dict(
+            현재가=int(price),
+            등락율=change,
+            체결시간=time_str or now_hhmmss(),
+            최우선매수호가=int(best_bid if best_bid is not None else price),
+        )
+
+    def push_tick(self, code, price, best_bid=None, change=0.0): # 체결 tick 을 발생시킨다
+        self.set_quote(code, price, best_bid, change=change)
+        self.counters["ticks"] += 1
+        self._check_pending_orders(code)
+        if self.is_registered(code):
+            self.emit_real_data(code)
+
+    def emit_real_data(self, code, real_type="주식체결"): # 현재 quote 로 OnReceiveRealData 발생 (등록 여부 확인 안함)
+        self.counters["real_events"] += 1
+        self._current_real_code = code
+        try:
+            self.OnReceiveRealData.emit(code, real_type, "")
+        finally:
+            self._current_real_code = None
+
+    def random_walk(self, codes=None, volatility=0.002, rng=random): # 등록된 종목들의 가격을 한 tick 씩 움직인다
+        if codes is None:
+            codes = set().union(*self.real_screens.values()) if self.real_screens else set()
+        for code in list(codes):
+            quote = self.quotes.get(code, None)
+            price = quote["현재가"] if quote else rng.randint(1000, 100000)
+            price = max(1, int(round(price * (1 + rng.gauss(0, volatility)))))
+            self.push_tick(code, price, max(1, price - 1))
+
+    def get_comm_real_data(self, code, fid):
+        quote = self.quotes.get(code, None) or self.quotes.get(self._current_real_code, None)
+        if quote is None:
+            return ""
+        if fid == 10:
+            return f"{quote['현재가']:+d}"
+        if fid == 12:
+            return f"{quote['등락율']:+.2f}"
+        if fid == 20:
+            return quote["체결시간"]
+        if fid == 28:
+            return f"{quote['최우선매수호가']:+d}"
+        return ""
+
+    # TR 조회
+    def set_input_value(self, id, value):
+        self.inputs[id] = value
+
+    def comm_rq_data(self, rqname, trcode, next, screen_no):
+        if not self.tr_limiter.try_acquire():
+            self.counters["tr_rejected"] += 1
+            self.OnReceiveMsg.emit(screen_no, rqname, trcode, "조회 과부하")
+            return OP_ERR_SISE_OVERFLOW
+        self.counters["tr"] += 1
+        inputs, self.inputs = self.inputs, dict()
+        if int(next) == 2 and (trcode, rqname) in self.tr_continuations:
+            result = dict(single={}, multi=self.tr_continuations.pop((trcode, rqname)))
+        else:
+            self.tr_continuations.pop((trcode, rqname), None)
+            result = self._build_tr_result(trcode, inputs)
+        if self.page_size and len(result["multi"]) > self.page_size:
+            self.tr_continuations[(trcode, rqname)] = result["multi"][self.page_size:]
+            result = dict(single=result["single"], multi=result["multi"][: self.page_size])
+            prev_next = "2"
+        else:
+            prev_next = "0"
+        self._schedule(self._delay("tr"), self._deliver_tr, screen_no, rqname, trcode, result, prev_next)
+        return 0
+
+    def _deliver_tr(self, screen_no, rqname, trcode, result, prev_next="0"):
+        self.tr_results[(trcode, rqname)] = result
+        self.OnReceiveTrData.emit(screen_no, rqname, trcode, "", prev_next, 0, "", "", "")
+
+    def _build_tr_result(self, trcode, inputs):
+        if trcode == "opw00018":
+            rows = []
+            total = self.deposit
+            for code, position in self.positions.items():
+                price = self.quotes.get(code, {}).get("현재가", position["매입가"])
+                total += price * position["보유수량"]
+                rows.append({
+                    "종목번호": f"A{code}",
+                    "종목명": self.names.get(code, code),
+                    "평가손익": str((price - position["매입가"]) * position["보유수량"]),
+                    "수익률(%)": f"{(price / position['매입가'] - 1) * 100:.2f}",
+                    "매입가": str(position["매입가"]),
+                    "보유수량": str(position["보유수량"]),
+                    "매매가능수량": str(position["보유수량"]),
+                    "현재가": str(price),
+                })
+            return dict(single={"추정예탁자산": str(total)}, multi=rows)
+        if trcode == "opt10075":
+            rows = []
+            for order in self.orders.values():
+                if order["미체결수량"] > 0:
+                    rows.append({
+                        "주문번호": order["주문번호"],
+                        "종목코드": order["종목코드"],
+                        "주문구분": ORDER_TYPE_NAMES[order["주문유형"]],
+                        "미체결수량": str(order["미체결수량"]),
+                        "주문가격": str(order["주문가격"]),
+                        "시간": order["시간"],
+                    })
+            return dict(single={}, multi=rows)
+        if trcode == "opt10001":
+            code = inputs.get("종목코드", "")
+            price = self.quotes.get(code, {}).get("현재가", 10000)
+            return dict(single={
+                "종목코드": code,
+                "종목명": self.names.get(code, code),
+                "현재가": str(price),
+                "상한가": f"+{int(price * 1.3)}",
+                "하한가": f"-{int(price * 0.7)}",
+            }, multi=[])
+        return dict(single={}, multi=[])
+
+    def get_comm_data(self, trcode, record_name, index, item_name):
+        result = self.tr_results.get((trcode, record_name), None)
+        if result is None:
+            return ""
+        multi = result["multi"]
+        if index < len(multi) and item_name in multi[index]:
+            return multi[index][item_name]
+        return result["single"].get(item_name, "")
+
+    def get_repeat_cnt(self, trcode, record_name):
+        result = self.tr_results.get((trcode, record_name), None)
+        return len(result["multi"]) if result else 0
+
+    # 주문
+    def send_order(self, rqname, screen_no, acc_no, order_type, code, qty, price, hoga_gb, org_order_no):
+        if not self.tr_limiter.try_acquire():
+            self.counters["orders_rejected"] += 1
+            self.OnReceiveMsg.emit(screen_no, rqname, "", "주문 과부하")
+            return OP_ERR_ORD_OVERFLOW
+        self.counters["orders"] += 1
+        order_type = int(order_type)
+        order_num = f"{next(self._order_nums):07d}"
+        order = dict(
+            주문번호=order_num,
+            원주문번호=org_order_no,
+            종목코드=code,
+            주문유형=order_type,
+            매수=order_type in (1, 3, 5),
+            주문수량=int(qty),
+            주문가격=int(price) if price not in ("", None) else 0,
+            호가구분=hoga_gb,
+            미체결수량=int(qty),
+            체결수량=0,
+            시간=now_hhmmss(),
+            화면번호=screen_no,
+            사용자구분명=rqname,
+        )
+        self._schedule(self._delay("order"), self._accept_order, order)
+        return 0
+
+    def _accept_order(self, order):
+        original = self.orders.get(order["원주문번호"], None)
+        if order["주문유형"] in (3, 4, 5, 6):
+            if original is None or original["미체결수량"] == 0:
+                self.OnReceiveMsg.emit(order["화면번호"], order["사용자구분명"], "", "원주문 없음")
+                return
+            order["주문수량"] = order["미체결수량"] = min(order["주문수량"] or original["미체결수량"], original["미체결수량"])
+            original["미체결수량"] = 0
+            if order["주문유형"] in (3, 4): # 취소
+                order["미체결수량"] = 0
+        self.orders[order["주문번호"]] = order
+        trcode = "KOA_NORMAL_BUY_KP_ORD" if order["매수"] else "KOA_NORMAL_SELL_KP_ORD"
+        self._deliver_tr(order["화면번호"], order["사용자구분명"], trcode, dict(single={"주문번호": order["주문번호"]}, multi=[]))
+        self._emit_order_chejan(order, "접수")
+        if order["미체결수량"] > 0:
+            self._schedule(self._delay("fill"), self._try_fill, order["주문번호"])
+
+    def _check_pending_orders(self, code):
+        for order in list(self.orders.values()):
+            if order["종목코드"] == code and order["미체결수량"] > 0:
+                self._try_fill(order["주문번호"])
+
+    def _try_fill(self, order_num):
+        order = self.orders.get(order_num, None)
+        quote = self.quotes.get(order["종목코드"], None) if order else None
+        if order is None or quote is None or order["미체결수량"] == 0:
+            return
+        fill_price = self.fill_model(order, quote)
+        if fill_price is None:
+            return
+        qty = order["미체결수량"]
+        order["체결수량"] += qty
+        order["미체결수량"] = 0
+        self.counters["fills"] += 1
+        position = self.positions.setdefault(order["종목코드"], dict(보유수량=0, 매입가=0))
+        if order["매수"]:
+            total = position["보유수량"] * position["매입가"] + qty * fill_price
+            position["보유수량"] += qty
+            position["매입가"] = int(total / position["보유수량"])
+            self.deposit -= qty * fill_price
+        else:
+            position["보유수량"] = max(0, position["보유수량"] - qty)
+            self.deposit += qty * fill_price
+        self._emit_order_chejan(order, "체결", fill_price, qty)
+        self._emit_balance_chejan(order["종목코드"])
+        if position["보유수량"] == 0:
+            self.positions.pop(order["종목코드"], None)
+
+    def _emit_order_chejan(self, order, status, fill_price=0, fill_qty=0):
+        fields = {
+            9201: self.account_num,
+            9203: order["주문번호"],
+            9001: f"A{order['종목코드']}",
+            302: self.names.get(order["종목코드"], order["종목코드"]),
+            900: str(order["주문수량"]),
+            901: str(order["주문가격"]),
+            902: str(order["미체결수량"]),
+            904: order["원주문번호"],
+            905: ORDER_TYPE_NAMES[order["주문유형"]],
+            906: "시장가" if order["호가구분"] == "03" else "보통",
+            908: now_hhmmss(),
+            910: str(fill_price) if fill_price else "",
+            911: str(order["체결수량"]) if order["체결수량"] else "",
+            913: status,
+            914: str(fill_price) if fill_price else "",
+            915: str(fill_qty) if fill_qty else "",
+        }
+        self.emit_chejan("0", fields)
+
+    def _emit_balance_chejan(self, code):
+        position = self.positions.get(code, dict(보유수량=0, 매입가=0))
+        fields = {
+            9201: self.account_num,
+            9001: f"A{code}",
+            302: self.names.get(code, code),
+            10: f"{self.quotes.get(code, {}).get('현재가', 0):+d}",
+            930: str(position["보유수량"]),
+            931: str(position["매입가"]),
+            932: str(position["보유수량"] * position["매입가"]),
+            933: str(position["보유수량"]),
+        }
+        self.emit_chejan("1", fields)
+
+    def emit_chejan(self, gubun, fields): # fields: FID -> 값
+        self._current_chejan = fields
+        try:
+            self.OnReceiveChejanData.emit(gubun, len(fields), ";".join(str(fid) for fid in fields))
+        finally:
+            self._current_chejan = dict()
+
+    def get_chejan_data(self, fid):
+        return self._current_chejan.get(int(fid), "")
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+
+from loguru import logger
+
+# 상태 변경 이벤트 종류
+EVENT_ENTRY = "편입" # 종목명, 매수기반조건식
+EVENT_BUY_ORDER = "매수주문" # 목표가, 손절가
+EVENT_FILL = "체결" # 보유수량
+EVENT_AVG_PRICE = "평균단가" # 평균단가, 보유수량, 종목명
+EVENT_SELL_ORDER = "매도주문" # 주문구분, 주문수량, 주문가격
+EVENT_CORRECTION = "정정" # 원주문번호, 주문수량, 주문가격
+EVENT_UNFINISHED = "미체결" # 주문번호, 주문구분, 미체결수량, 주문가격, 주문체결시간
+EVENT_UNFINISHED_DONE = "미체결완료" # 주문번호
+EVENT_CLOSE = "청산" # 감시 종료
+
+
+class StateJournal: # watchlist/미체결 주문 상태 변경을 한줄씩 기록하는 append-only journal
+    # 각 줄은 [seq, 시간, 이벤트, 종목코드, payload] JSON 이며, 이벤트는 "값을 이것으로 설정" 형태라 여러번 재생해도 결과가 같다.
+    # compact() 시 journal 을 .old 로 옮기고 snapshot(pkl) 저장이 끝나면 .old 를 삭제한다.
+    # snapshot 저장이 실패했거나 저장 중에 종료되어 .old 가 남아있으면 다음 compact() 에서 snapshot 을 다시 저장한다.
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.old_path = f"{path}.old"
+        self.fsync = fsync # True 면 매 기록마다 fsync (전원 차단까지 대비, 느림)
+        self.seq = 0
+        self._file = None
+        self._snapshot_pending = False # snapshot 저장 요청 후 결과(on_written/on_failed)를 기다리는 중
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def append(self, event, code, **payload):
+        self.seq += 1
+        line = json.dumps([self.seq, round(time.time(), 3), event, code, payload], ensure_ascii=False, separators=(",", ":"))
+        f = self._open()
+        f.write(line + "\n")
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def append_many(self, event, items): # items: [(종목코드, payload dict), ...] 를 한번에 쓰고 flush
+        if not items:
+            return
+        lines = []
+        now = round(time.time(), 3)
+        for code, payload in items:
+            self.seq += 1
+            lines.append(json.dumps([self.seq, now, event, code, payload], ensure_ascii=False, separators=(",", ":")))
+        f = self._open()
+        f.write("\n".join(lines) + "\n")
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_records(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError: # 마지막 줄이 쓰다가 끊긴 경우
+                        logger.info(f"journal 손상된 줄 무시: {line!r}")
+        except FileNotFoundError:
+            return
+
+    def replay(self, watchlist, order_book): # snapshot 을 읽은 뒤 journal 을 순서대로 다시 적용
+        count = 0
+        for path in (self.old_path, self.path):
+            for seq, _, event, code, payload in self._read_records(path):
+                apply_event(watchlist, order_book, event, code, payload)
+                self.seq = max(self.seq, seq)
+                count += 1
+        return count
+
+    def compact(self, watchlist_df, order_book, save_snapshot):
+        # save_snapshot(watchlist_df, on_written, on_failed): snapshot 저장이 끝나면 on_written, 실패하면 on_failed 를 호출해야 함
+        if self._snapshot_pending: # 이전 snapshot 저장이 아직 안 끝남
+            return False
+        if os.path.exists(self.old_path): # 이전 snapshot 저장 실패 (journal 은 .old 이후 기록이므로 그대로 두고 snapshot 만 다시 저장)
+            logger.info("이전 snapshot 저장이 끝나지 않아 다시 저장")
+        else:
+            self.close()
+            if os.path.exists(self.path):
+                os.replace(self.path, self.old_path)
+        for 주문번호, info in order_book.unfinished_items(): # 미체결 주문은 새 journal 앞에 다시 기록 (.old 를 지워도 남도록)
+            self.append(EVENT_UNFINISHED, info["종목코드"], 주문번호=주문번호, **{k: v for k, v in info.items() if k != "종목코드"})
+        self._snapshot_pending = True
+        save_snapshot(watchlist_df, self._remove_old, self._snapshot_failed)
+        return True
+
+    def has_old(self): # 이전 실행에서 snapshot 저장이 끝나지 않은 journal 이 남아있음
+        return os.path.exists(self.old_path)
+
+    def _remove_old(self, _path=None):
+        try:
+            os.remove(self.old_path)
+        except FileNotFoundError:
+            pass
+        self._snapshot_pending = False
+
+    def _snapshot_failed(self, _path=None): # .old 를 남겨두고 다음 compact() 에서 다시 시도
+        self._snapshot_pending = False
+
+
+def apply_event(watchlist, order_book, event, code, payload):
+    if event == EVENT_ENTRY:
+        watchlist.add(code, 종목명=payload.get("종목명", ""), 매수기반조건식=payload.get("매수기반조건식", ""))
+    elif event == EVENT_CLOSE:
+        watchlist.remove(code)
+    elif event == EVENT_UNFINISHED:
+        order_book.restore(종목코드=code, **payload)
+    elif event == EVENT_UNFINISHED_DONE:
+        order_book.discard(payload["주문번호"])
+    elif event in (EVENT_BUY_ORDER, EVENT_FILL, EVENT_AVG_PRICE):
+        row = watchlist.row_of(code)
+        if row is None:
+            return
+        if event == EVENT_BUY_ORDER:
+            watchlist.set_at(row, "매수주문완료여부", True)
+        for col, value in payload.items():
+            watchlist.set_at(row, col, value)
+    # 매도주문/정정 은 기록용 (상태 변경 없음)
@@ -0,0 +1,58 @@
+import json
+from collections import namedtuple
+from types import MappingProxyType
+
+StrategyParams = namedtuple("StrategyParams", ["goal_return", "stop_loss", "buy_amount"]) # 목표수익률(%), 손절수익률(%), 매수금액(원)
+
+DEFAULT_PARAMS = StrategyParams(2.5, -2.5, 100000)
+
+
+def validate_params(params): # 잘못된 값이면 ValueError
+    if not params.goal_return > 0:
+        raise ValueError(f"목표수익률은 0보다 커야 합니다: {params.goal_return}")
+    if not params.stop_loss < 0:
+        raise ValueError(f"손절수익률은 0보다 작아야 합니다: {params.stop_loss}")
+    if params.buy_amount <= 0:
+        raise ValueError(f"매수금액은 0보다 커야 합니다: {params.buy_amount}")
+    return params
+
+
+def parse_params(goal_text, stop_text, amount_text): # QLineEdit 문자열 -> StrategyParams (잘못된 값이면 ValueError)
+    try:
+        params = StrategyParams(
+            float(goal_text.strip()),
+            float(stop_text.strip()),
+            int(amount_text.strip().replace(",", "")),
+        )
+    except ValueError:
+        raise ValueError(f"숫자가 아닌 값: 목표수익률={goal_text!r}, 손절수익률={stop_text!r}, 매수금액={amount_text!r}") from None
+    return validate_params(params)
+
+
+class StrategyConfig: # 매수/손절/익절 설정 snapshot (만든 뒤에는 바뀌지 않으므로 어느 스레드에서든 lock 없이 읽음)
+    __slots__ = ("default", "overrides")
+
+    def __init__(self, default=DEFAULT_PARAMS, overrides=None):
+        # overrides: 매수기반조건식 -> StrategyParams (조건식마다 다른 목표/손절/매수금액)
+        object.__setattr__(self, "default", validate_params(default))
+        object.__setattr__(self, "overrides", MappingProxyType({
+            name: validate_params(params) for name, params in (overrides or {}).items()
+        }))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StrategyConfig 는 변경할 수 없습니다 (with_default 로 새로 만든다)")
+
+    def params_for(self, condition_name): # 조건식 설정이 없으면 기본 설정
+        return self.overrides.get(condition_name, self.default)
+
+    def with_default(self, default):
+        return StrategyConfig(default, self.overrides)
+
+    def overrides_to_json(self):
+        return json.dumps({name: params._asdict() for name, params in self.overrides.items()}, ensure_ascii=False)
+
+    @staticmethod
+    def overrides_from_json(text, default): # {"조건식": {"goal_return": 3.0}} -> 빠진 항목은 default 로 채운다
+        if not text:
+            return dict()
+        return {name: default._replace(**values) for name, values in json.loads(text).items()}
@@ -0,0 +1,173 @@
+import multiprocessing
+import threading
+import time
+
+from loguru import logger
+
+from watchlist_store import WatchlistStore
+from exit_engine import ExitRuleEngine
+from tick_ring import RecordRing, KIND_TICK, KIND_POSITION, KIND_REMOVE, KIND_STOP_LOSS, KIND_TAKE_PROFIT
+
+WORKER_OFF = "off"
+WORKER_THREAD = "thread"
+WORKER_PROCESS = "process"
+
+
+class ExitStrategy: # tick/포지션 레코드를 받아서 손절/익절 매도 의도 레코드를 만드는 부분 (GUI 와 상태를 공유하지 않음)
+    def __init__(self, resend_after=10.0, clock=time.perf_counter):
+        self.clock = clock
+        self.watchlist = WatchlistStore() # 보유 종목만 담는 worker 쪽 사본
+        self.best_bids = dict() # 종목코드 -> 최우선매수호가
+        self.exit_engine = ExitRuleEngine(self.watchlist, resend_after)
+
+    def process(self, batch): # 레코드 묶음을 순서대로 반영하고 매도 의도 목록을 반환
+        # 손절가/목표가를 넘은 tick 은 뒤의 tick 에 덮이기 전에 바로 판단한다
+        store = self.watchlist
+        intents = []
+        for kind, code, price, best_bid, goal, stop, qty in zip(
+            batch["kind"].tolist(), batch["code"].tolist(), batch["price"].tolist(), batch["best_bid"].tolist(),
+            batch["goal"].tolist(), batch["stop"].tolist(), batch["qty"].tolist(),
+        ):
+            code = code.decode()
+            if kind == KIND_TICK:
+                row = store.row_of(code)
+                if row is not None:
+                    store.columns["현재가"][row] = price
+                    self.best_bids[code] = best_bid
+                    if store.columns["보유수량"][row] > 0 and (price < store.columns["손절가"][row] or price > store.columns["목표가"][row]):
+                        intents.extend(self.decide())
+            elif kind == KIND_POSITION:
+                if store.get(code, "보유수량", 0) != qty: # 체결로 보유수량이 바뀌면 다시 매도 신호를 낼 수 있다
+                    self.exit_engine.reset(code)
+                store.add(code, 목표가=goal, 손절가=stop, 보유수량=qty)
+            elif kind == KIND_REMOVE:
+                store.remove(code)
+                self.best_bids.pop(code, None)
+                self.exit_engine.reset(code)
+        intents.extend(self.decide())
+        return intents
+
+    def decide(self): # [(종류, 종목코드, 현재가, 최우선매수호가, 보유수량, 판단시간), ...]
+        if len(self.watchlist) == 0:
+            return []
+        signals = self.exit_engine.evaluate()
+        decided_at = self.clock()
+        intents = []
+        for kind, codes in ((KIND_STOP_LOSS, signals.stop_loss), (KIND_TAKE_PROFIT, signals.take_profit)):
+            for code in codes:
+                row = self.watchlist.row_of(code)
+                intents.append((
+                    kind, code, int(self.watchlist.columns["현재가"][row]), self.best_bids.get(code, 0),
+                    int(self.watchlist.columns["보유수량"][row]), decided_at,
+                ))
+        return intents
+
+
+def run_strategy_loop(tick_ring, intent_ring, stop_event, idle_sleep=0.0005, resend_after=10.0):
+    strategy = ExitStrategy(resend_after)
+    while not stop_event.is_set():
+        batch = tick_ring.drain()
+        if len(batch) == 0:
+            time.sleep(idle_sleep)
+            continue
+        for kind, code, price, best_bid, qty, decided_at in strategy.process(batch):
+            intent_ring.push(kind, code, price=price, best_bid=best_bid, qty=qty, t=decided_at)
+
+
+def _process_main(tick_name, intent_name, capacity, stop_event, idle_sleep, resend_after): # 자식 프로세스 진입점
+    tick_ring = RecordRing.attach(tick_name, capacity)
+    intent_ring = RecordRing.attach(intent_name, capacity)
+    try:
+        run_strategy_loop(tick_ring, intent_ring, stop_event, idle_sleep, resend_after)
+    finally:
+        tick_ring.close()
+        intent_ring.close()
+
+
+class StrategyWorker: # 손절/익절 판단을 별도 스레드나 프로세스에서 돌리고 ring buffer 두개로 주고받는 클래스
+    def __init__(self, mode=WORKER_THREAD, capacity=65536, idle_sleep=0.0005, resend_after=10.0):
+        # mode: WORKER_THREAD (같은 프로세스) 또는 WORKER_PROCESS (다른 코어 사용, shared memory)
+        self.mode = mode
+        self.capacity = capacity
+        self.idle_sleep = idle_sleep # ring 이 비어있을 때 쉬는 시간(초)
+        self.resend_after = resend_after
+        shared = mode == WORKER_PROCESS
+        self.tick_ring = RecordRing.create(capacity, shared) # GUI -> worker
+        self.intent_ring = RecordRing.create(capacity, shared) # worker -> GUI
+        self.positions = dict() # 종목코드 -> worker 에 마지막으로 보낸 (목표가, 손절가, 보유수량)
+        self._runner = None
+        self._stop_event = None
+
+    def start(self):
+        if self.mode == WORKER_PROCESS:
+            self._stop_event = multiprocessing.Event()
+            self._runner = multiprocessing.Process(
+                target=_process_main,
+                args=(self.tick_ring.name, self.intent_ring.name, self.capacity, self._stop_event, self.idle_sleep, self.resend_after),
+                name="strategy-worker",
+                daemon=True,
+            )
+        else:
+            self._stop_event = threading.Event()
+            self._runner = threading.Thread(
+                target=run_strategy_loop,
+                args=(self.tick_ring, self.intent_ring, self._stop_event, self.idle_sleep, self.resend_after),
+                name="strategy-worker",
+                daemon=True,
+            )
+        self._runner.start()
+        logger.info(f"strategy worker 시작 ({self.mode})")
+
+    def is_alive(self):
+        return self._runner is not None and self._runner.is_alive()
+
+    def push_tick(self, code, price, best_bid, received_at):
+        return self.tick_ring.push(KIND_TICK, code, price=price, best_bid=best_bid, t=received_at)
+
+    def sync_positions(self, watchlist): # 보유 종목의 목표가/손절가/보유수량 중 바뀐 것만 worker 에 보낸다
+        n = len(watchlist)
+        codes = watchlist.codes[:n]
+        held = watchlist.view("보유수량") > 0
+        goal = watchlist.view("목표가")[held].tolist()
+        stop = watchlist.view("손절가")[held].tolist()
+        qty = watchlist.view("보유수량")[held].tolist()
+        # ring 이 가득 차서 못 보낸 종목은 positions 를 그대로 두어 다음 sync 때 다시 보낸다
+        held_codes = set()
+        for code, g, s, q in zip(codes[held].tolist(), goal, stop, qty):
+            position = (None if g != g else g, None if s != s else s, q) # NaN 은 None 으로 바꿔서 비교
+            held_codes.add(code)
+            if self.positions.get(code, None) != position and self.tick_ring.push(KIND_POSITION, code, goal=g, stop=s, qty=q):
+                self.positions[code] = position
+        for code in self.positions.keys() - held_codes:
+            if self.tick_ring.push(KIND_REMOVE, code):
+                del self.positions[code]
+
+    def drain_intents(self): # [(종류, 종목코드, 현재가, 최우선매수호가, 보유수량, 판단시간), ...]
+        batch = self.intent_ring.drain()
+        return [
+            (kind, code.decode(), price, best_bid, qty, t)
+            for kind, code, price, best_bid, qty, t in zip(
+                batch["kind"].tolist(), batch["code"].tolist(), batch["price"].tolist(), batch["best_bid"].tolist(),
+                batch["qty"].tolist(), batch["t"].tolist(),
+            )
+        ]
+
+    def stats(self):
+        return dict(
+            mode=self.mode,
+            alive=self.is_alive(),
+            tick_backlog=len(self.tick_ring),
+            tick_dropped=self.tick_ring.dropped,
+            intent_backlog=len(self.intent_ring),
+            positions=len(self.positions),
+        )
+
+    def stop(self, timeout=2.0):
+        if self._runner is None:
+            return
+        self._stop_event.set()
+        self._runner.join(timeout)
+        self._runner = None
+        unlink = self.mode == WORKER_PROCESS
+        self.tick_ring.close(unlink)
+        self.intent_ring.close(unlink)
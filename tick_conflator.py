@@ -0,0 +1,37 @@
+class TickConflator: # 종목별 최신 체결 tick 만 남겨두고 일정 주기로 한번에 처리하기 위한 버퍼
+    def __init__(self, is_urgent=None):
+        self.is_urgent = is_urgent # (종목코드, 현재가) -> bool, 손절/익절 가격을 넘은 tick 은 바로 처리
+        self.latest_ticks = dict() # 종목코드 -> (현재가, 최우선매수호가)
+        self.received_count = 0
+        self.dropped_count = 0 # 처리되기 전에 새 tick 으로 덮어쓴 개수
+        self.urgent_count = 0
+
+    def __len__(self):
+        return len(self.latest_ticks)
+
+    def push(self, code, price, best_bid): # 긴급 tick 이면 True 를 반환 (버퍼에 넣지 않음)
+        self.received_count += 1
+        if self.is_urgent is not None and self.is_urgent(code, price):
+            self.urgent_count += 1
+            if self.latest_ticks.pop(code, None) is not None:
+                self.dropped_count += 1
+            return True
+        if code in self.latest_ticks:
+            self.dropped_count += 1
+        self.latest_ticks[code] = (price, best_bid)
+        return False
+
+    def drain(self): # 버퍼에 쌓인 최신 tick 목록을 꺼내고 비운다
+        if not self.latest_ticks:
+            return []
+        ticks = [(code, price, best_bid) for code, (price, best_bid) in self.latest_ticks.items()]
+        self.latest_ticks = dict()
+        return ticks
+
+    def stats(self):
+        return dict(
+            received=self.received_count,
+            dropped=self.dropped_count,
+            urgent=self.urgent_count,
+            pending=len(self.latest_ticks),
+        )
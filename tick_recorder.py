@@ -0,0 +1,220 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 실시간 체결 tick (FID 10: 현재가, 12: 등락율, 20: 체결시간, 28: 최우선매수호가)
+TICK_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("code", "S6"),
+    ("price", "<i4"),
+    ("change", "<f4"),
+    ("time", "<i4"),
+    ("bid", "<i4"),
+])
+# 실시간 조건검색 편입/이탈
+CONDITION_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("code", "S6"),
+    ("type", "S1"),
+    ("index", "<i4"),
+    ("name", "S64"),
+])
+
+TICK_FILE = "ticks.bin"
+CONDITION_FILE = "conditions.bin"
+CHEJAN_FILE = "chejan.jsonl"
+
+
+def parse_int(value):
+    value = str(value).strip().replace("+", "").replace("-", "")
+    return int(value) if value else 0
+
+
+def parse_float(value):
+    value = str(value).strip()
+    return float(value) if value else 0.0
+
+
+class TickRecorder: # 실시간 tick/조건검색/체결 이벤트를 거래일별 파일로 기록 (tick, 조건검색은 memmap 으로 읽을 수 있는 고정 크기 레코드)
+    def __init__(self, root_dir="./recordings", trading_date=None, flush_every=1000):
+        self.trading_date = trading_date or datetime.date.today().strftime("%Y%m%d")
+        self.directory = os.path.join(root_dir, self.trading_date)
+        os.makedirs(self.directory, exist_ok=True)
+        self.flush_every = flush_every
+        self._ticks = []
+        self._conditions = []
+        self._tick_file = open(os.path.join(self.directory, TICK_FILE), "ab")
+        self._condition_file = open(os.path.join(self.directory, CONDITION_FILE), "ab")
+        self._chejan_file = open(os.path.join(self.directory, CHEJAN_FILE), "a", encoding="utf-8")
+        self.tick_count = 0
+
+    def record_tick(self, code, price, change, time_str, bid):
+        self._ticks.append((time.time(), code.encode(), parse_int(price), parse_float(change), parse_int(time_str), parse_int(bid)))
+        self.tick_count += 1
+        if len(self._ticks) >= self.flush_every:
+            self.flush()
+
+    def record_condition(self, code, event_type, condition_index, condition_name):
+        name = condition_name.encode("utf-8")[:64]
+        self._conditions.append((time.time(), code.encode(), event_type.encode(), int(condition_index), name))
+        if len(self._conditions) >= self.flush_every:
+            self.flush()
+
+    def record_chejan(self, gubun, fields): # fields: FID -> 값
+        self._chejan_file.write(json.dumps(
+            dict(ts=time.time(), gubun=gubun, fields={str(fid): value for fid, value in fields.items()}),
+            ensure_ascii=False,
+        ) + "\n")
+
+    def flush(self):
+        if self._ticks:
+            self._tick_file.write(np.array(self._ticks, dtype=TICK_DTYPE).tobytes())
+            self._ticks = []
+        if self._conditions:
+            self._condition_file.write(np.array(self._conditions, dtype=CONDITION_DTYPE).tobytes())
+            self._conditions = []
+        self._tick_file.flush()
+        self._condition_file.flush()
+        self._chejan_file.flush()
+
+    def close(self):
+        self.flush()
+        self._tick_file.close()
+        self._condition_file.close()
+        self._chejan_file.close()
+
+
+def load_records(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class TickReplayer: # 기록된 이벤트를 broker(SimulatedBroker) 를 통해 KiwoomAPI 로 다시 보내는 클래스
+    def __init__(self, directory):
+        self.directory = directory
+        self.ticks = load_records(os.path.join(directory, TICK_FILE), TICK_DTYPE)
+        self.conditions = load_records(os.path.join(directory, CONDITION_FILE), CONDITION_DTYPE)
+        self.chejans = []
+        try:
+            with open(os.path.join(directory, CHEJAN_FILE), encoding="utf-8") as f:
+                self.chejans = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self.ticks) + len(self.conditions) + len(self.chejans)
+
+    def recorded_conditions(self): # 기록에 나오는 조건식 {"000" 형식 인덱스: 조건식이름}
+        return {
+            f"{int(index):03d}": name.decode("utf-8", errors="ignore")
+            for index, name in zip(np.asarray(self.conditions["index"]).tolist(), np.asarray(self.conditions["name"]).tolist())
+        }
+
+    def _merged_order(self): # (종류, 위치) 를 시간 순서대로
+        kinds = np.concatenate([
+            np.zeros(len(self.ticks), dtype=np.int8),
+            np.ones(len(self.conditions), dtype=np.int8),
+            np.full(len(self.chejans), 2, dtype=np.int8),
+        ])
+        positions = np.concatenate([
+            np.arange(len(self.ticks)),
+            np.arange(len(self.conditions)),
+            np.arange(len(self.chejans)),
+        ])
+        timestamps = np.concatenate([
+            np.asarray(self.ticks["ts"]),
+            np.asarray(self.conditions["ts"]),
+            np.array([chejan["ts"] for chejan in self.chejans], dtype=np.float64),
+        ])
+        order = np.argsort(timestamps, kind="stable")
+        return timestamps[order], kinds[order], positions[order]
+
+    def replay(self, broker, speed=None, pump=None, pump_every=100):
+        # speed: 1 이면 실제 속도, N 이면 N배속, None/0 이면 최대한 빠르게
+        # pump: 이벤트 사이에 호출할 함수 (예: app.processEvents), pump_every 개마다 호출
+        timestamps, kinds, positions = self._merged_order()
+        if len(timestamps) == 0:
+            return dict(events=0, ticks=0, elapsed=0.0, events_per_sec=0.0)
+        start_wall = time.perf_counter()
+        start_ts = timestamps[0]
+        tick_count = 0
+        for n, (ts, kind, position) in enumerate(zip(timestamps, kinds, positions)):
+            if speed:
+                wait = (ts - start_ts) / speed - (time.perf_counter() - start_wall)
+                if wait > 0:
+                    time.sleep(wait)
+            if kind == 0:
+                tick = self.ticks[position]
+                code = tick["code"].decode()
+                broker.set_quote(code, int(tick["price"]), int(tick["bid"]), change=float(tick["change"]), time_str=f"{int(tick['time']):06d}")
+                broker.emit_real_data(code)
+                tick_count += 1
+            elif kind == 1:
+                condition = self.conditions[position]
+                broker.OnReceiveRealCondition.emit(
+                    condition["code"].decode(),
+                    condition["type"].decode(),
+                    condition["name"].decode("utf-8", errors="ignore"),
+                    str(int(condition["index"])),
+                )
+            else:
+                chejan = self.chejans[position]
+                broker.emit_chejan(chejan["gubun"], {int(fid): value for fid, value in chejan["fields"].items()})
+            if pump is not None and n % pump_every == 0:
+                pump()
+        elapsed = time.perf_counter() - start_wall
+        return dict(
+            events=len(timestamps),
+            ticks=tick_count,
+            elapsed=round(elapsed, 3),
+            events_per_sec=round(len(timestamps) / elapsed, 1) if elapsed > 0 else 0.0,
+            ticks_per_sec=round(tick_count / elapsed, 1) if elapsed > 0 else 0.0,
+        )
+
+
+def main(argv=None): # python tick_recorder.py ./recordings/20240102 --speed 0
+    parser = argparse.ArgumentParser(description="기록된 tick 을 KiwoomAPI 로 재생")
+    parser.add_argument("directory")
+    parser.add_argument("--speed", type=float, default=0.0, help="1: 실제 속도, N: N배속, 0: 최대 속도")
+    args = parser.parse_args(argv)
+    replayer = TickReplayer(os.path.abspath(args.directory))
+
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.abspath(__file__))) # main.ui 를 찾기 위해
+    from PyQt5.QtCore import QSettings
+    from PyQt5.QtWidgets import QApplication
+    from simulator import SimulatedBroker
+    from autotrade import KiwoomAPI
+    from screen_allocator import POOL_CONDITION
+
+    # pkl/journal 은 현재 폴더에, 설정은 QSettings 에 저장되므로 실제 파일/설정을 건드리지 않도록 임시 폴더에서 재생
+    work_dir = tempfile.TemporaryDirectory()
+    os.chdir(work_dir.name)
+    try:
+        app = QApplication.instance() or QApplication(sys.argv)
+        broker = SimulatedBroker(latency=0.0)
+        settings = QSettings(os.path.join(work_dir.name, "settings.ini"), QSettings.IniFormat) # 레지스트리(실제 설정) 대신 임시 INI 파일
+        kiwoom_api = KiwoomAPI(broker, settings)
+        broker.run_until_idle()
+        app.processEvents()
+        for condition_idx, condition_name in replayer.recorded_conditions().items(): # 기록된 조건식을 실시간 등록된 것으로 설정
+            kiwoom_api.conditions.register(condition_idx, kiwoom_api._get_screen_num(POOL_CONDITION, condition_idx), condition_name)
+        stats = replayer.replay(broker, speed=args.speed, pump=app.processEvents)
+        print(json.dumps(stats, ensure_ascii=False))
+        kiwoom_api.persistence.stop()
+        kiwoom_api.journal.close()
+        kiwoom_api.close()
+    finally:
+        os.chdir(cwd)
+        work_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
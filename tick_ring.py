@@ -0,0 +1,95 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 레코드 종류
+KIND_TICK = 1 # 체결 tick (현재가, 최우선매수호가)
+KIND_POSITION = 2 # 보유 종목 상태 (목표가, 손절가, 보유수량)
+KIND_REMOVE = 3 # 감시 종료
+KIND_STOP_LOSS = 11 # 손절 매도 의도
+KIND_TAKE_PROFIT = 12 # 익절 매도 의도
+
+# GUI -> worker (tick/포지션), worker -> GUI (주문 의도) 모두 같은 고정 크기 레코드를 쓴다
+RECORD_DTYPE = np.dtype([
+    ("kind", np.uint8),
+    ("code", "S6"),
+    ("price", np.int64), # 현재가
+    ("best_bid", np.int64), # 최우선매수호가
+    ("goal", np.float64), # 목표가
+    ("stop", np.float64), # 손절가
+    ("qty", np.int64), # 보유수량
+    ("t", np.float64), # time.perf_counter() (tick 수신 또는 판단 시점)
+])
+
+HEADER_SIZE = 128 # write_seq 와 read_seq 를 서로 다른 cache line 에 둔다
+WRITE_SEQ = 0
+READ_SEQ = 8 # uint64 index (byte offset 64)
+
+
+class RecordRing: # 생산자 하나, 소비자 하나인 고정 크기 레코드 ring buffer (shared memory 면 프로세스 사이에서도 사용)
+    # 가득 차면 생산자는 기다리지 않고 레코드를 버린다 (GUI/COM 스레드를 막지 않기 위해)
+    def __init__(self, capacity, buffer, shm=None):
+        self.capacity = capacity
+        self.shm = shm
+        self.seq = np.ndarray((16,), dtype=np.uint64, buffer=buffer, offset=0)
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=buffer, offset=HEADER_SIZE)
+        self.dropped = 0
+
+    @staticmethod
+    def nbytes(capacity):
+        return HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+
+    @classmethod
+    def create(cls, capacity=65536, shared=True): # shared=False 면 같은 프로세스(스레드) 안에서만 사용
+        if not shared:
+            return cls(capacity, bytearray(cls.nbytes(capacity)))
+        shm = shared_memory.SharedMemory(create=True, size=cls.nbytes(capacity))
+        ring = cls(capacity, shm.buf, shm)
+        ring.seq[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity): # 다른 프로세스에서 만든 ring 에 연결
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(capacity, shm.buf, shm)
+
+    @property
+    def name(self):
+        return self.shm.name if self.shm is not None else None
+
+    def __len__(self):
+        return int(self.seq[WRITE_SEQ] - self.seq[READ_SEQ])
+
+    def push(self, kind, code, price=0, best_bid=0, goal=np.nan, stop=np.nan, qty=0, t=0.0): # 넣었으면 True
+        write = int(self.seq[WRITE_SEQ])
+        if write - int(self.seq[READ_SEQ]) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.records[write % self.capacity] = (kind, code.encode(), price, best_bid, goal, stop, qty, t)
+        self.seq[WRITE_SEQ] = write + 1 # 레코드를 다 쓴 다음에 공개
+        return True
+
+    def drain(self, max_records=None): # 쌓인 레코드를 순서대로 복사해서 꺼낸다 (structured array)
+        read = int(self.seq[READ_SEQ])
+        count = int(self.seq[WRITE_SEQ]) - read
+        if max_records is not None:
+            count = min(count, max_records)
+        if count <= 0:
+            return self.records[:0].copy()
+        start = read % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            batch = self.records[start:end].copy()
+        else:
+            batch = np.concatenate((self.records[start:], self.records[: end - self.capacity]))
+        self.seq[READ_SEQ] = read + count
+        return batch
+
+    def close(self, unlink=False):
+        if self.shm is None:
+            return
+        self.seq = self.records = None # buffer 를 참조하는 배열을 먼저 놓아야 close 가능
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        self.shm = None
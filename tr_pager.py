@@ -0,0 +1,115 @@
+import time
+from collections import deque
+
+import pandas as pd
+from loguru import logger
+
+PREV_NEXT_MORE = "2" # sPrevNext: 연속(추가조회) 데이터 있음
+
+
+class PagedQuery: # 연속조회 한건 (페이지를 모아두었다가 마지막 페이지가 오면 한번에 넘긴다)
+    __slots__ = ("rqname", "send", "pages", "callbacks", "updated_at")
+
+    def __init__(self, rqname, send, updated_at):
+        self.rqname = rqname
+        self.send = send # send(next): next=0 첫 조회, next=2 연속 조회
+        self.pages = []
+        self.callbacks = []
+        self.updated_at = updated_at
+
+
+def merge_pages(pages): # [(싱글데이터 dict, 멀티데이터 DataFrame), ...] -> 첫 페이지 싱글데이터, 합친 DataFrame
+    single = pages[0][0]
+    if len(pages) == 1:
+        return single, pages[0][1]
+    return single, pd.concat([df for _, df in pages])
+
+
+class TrPager: # sPrevNext "2" 연속조회를 scheduler 를 통해 끝까지 따라가서 하나의 결과로 합치는 클래스
+    def __init__(self, submit, max_in_flight=1, max_pages=50, timeout=30.0, clock=time.monotonic):
+        # submit(func, *args, key=None): scheduler 에 조회 요청 등록
+        # max_in_flight: 동시에 요청 중인 페이지 수 (계좌 조회가 주문 TR 을 밀어내지 않도록)
+        # max_pages: 조회 한건당 최대 페이지 수 (넘으면 거기까지만 사용)
+        # timeout: 이 시간(초) 동안 응답이 없으면 조회 취소 (callback 에는 None)
+        self.submit = submit
+        self.max_in_flight = max_in_flight
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.clock = clock
+        self.queries = dict() # rqname -> PagedQuery
+        self.pending = deque() # 요청 대기중인 (PagedQuery, next)
+        self.in_flight = 0
+        self.expired = dict() # rqname -> 취소한 시간, 취소한 조회에 늦게 온 응답은 한 페이지짜리 결과로 쓰지 않고 버린다
+        self.counters = dict(queries=0, merged=0, pages=0, continuations=0, truncated=0, expired=0, late=0)
+
+    def __contains__(self, rqname):
+        return rqname in self.queries
+
+    def request(self, rqname, send, on_complete=None): # 새 조회면 True, 같은 조회가 진행 중이면 callback 만 추가하고 False
+        query = self.queries.get(rqname, None)
+        created = query is None
+        if created:
+            self.expired.pop(rqname, None) # 새 조회를 보낸 뒤의 응답은 새 조회의 것으로 본다
+            query = PagedQuery(rqname, send, self.clock())
+            self.queries[rqname] = query
+            self.pending.append((query, 0))
+            self.counters["queries"] += 1
+        else:
+            self.counters["merged"] += 1
+        if on_complete is not None:
+            query.callbacks.append(on_complete)
+        self._pump()
+        return created
+
+    def _pump(self): # 요청 중인 페이지가 max_in_flight 보다 적을 때만 다음 페이지를 scheduler 에 넘긴다
+        while self.pending and self.in_flight < self.max_in_flight:
+            query, next = self.pending.popleft()
+            self.in_flight += 1
+            query.updated_at = self.clock()
+            self.submit(query.send, next, key=(query.rqname, next))
+
+    def receive(self, rqname, prev_next, page): # 페이지 수신, 마지막 페이지면 모든 페이지 목록을 반환 (아니면 None)
+        self.counters["pages"] += 1
+        query = self.queries.get(rqname, None)
+        if query is None:
+            if rqname in self.expired: # 취소한 조회의 늦은 응답 (일부 페이지뿐이므로 사용하지 않음)
+                self.counters["late"] += 1
+                logger.info(f"{rqname} 취소한 연속조회의 늦은 응답 무시")
+                return None
+            return [page] # request 를 거치지 않은 응답은 그 페이지만으로 끝낸다
+        self.in_flight = max(self.in_flight - 1, 0)
+        query.pages.append(page)
+        query.updated_at = self.clock()
+        if str(prev_next).strip() == PREV_NEXT_MORE:
+            if len(query.pages) < self.max_pages:
+                self.counters["continuations"] += 1
+                self.pending.append((query, 2))
+                self._pump()
+                return None
+            self.counters["truncated"] += 1
+            logger.info(f"{rqname} 연속조회 {self.max_pages} 페이지 초과, 이후 데이터는 생략")
+        self._finish(query, query.pages)
+        self._pump()
+        return query.pages
+
+    def _finish(self, query, pages):
+        self.queries.pop(query.rqname, None)
+        for callback in query.callbacks:
+            callback(pages)
+
+    def expire(self): # 응답이 오지 않는 조회 취소 (요청 실패/화면번호 부족 등)
+        now = self.clock()
+        self.expired = {rqname: at for rqname, at in self.expired.items() if now - at < self.timeout}
+        waiting = {id(query) for query, _ in self.pending} # 아직 요청을 보내지 않은 조회는 제외
+        for query in list(self.queries.values()):
+            if id(query) in waiting or now - query.updated_at < self.timeout:
+                continue
+            logger.info(f"{query.rqname} 연속조회 응답 없음 ({len(query.pages)} 페이지 수신), 조회 취소")
+            self.counters["expired"] += 1
+            self.in_flight = max(self.in_flight - 1, 0)
+            self.expired[query.rqname] = now
+            self._finish(query, None)
+        self._pump()
+
+    def stats(self):
+        return dict(active=len(self.queries), in_flight=self.in_flight, pending=len(self.pending), **self.counters)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# 항목 타입
+FIELD_STR = "str"
+FIELD_CODE = "code" # "A005930" -> "005930"
+FIELD_UNSIGNED_STR = "unsigned_str" # 주문구분 "+매수", "-매도정정" -> "매수", "매도정정"
+FIELD_INT = "int" # 부호 유지 (평가손익 등)
+FIELD_ABS = "abs" # 부호는 등락 표시라 버림 (현재가, 상한가 등)
+FIELD_FLOAT = "float"
+
+
+class TrSchema: # TR 하나의 응답 항목 정의 (항목명, 타입, 결과 컬럼명)
+    def __init__(self, trcode, single=(), multi=(), index=None):
+        # single/multi: (항목명, 타입) 또는 (항목명, 타입, 결과 컬럼명)
+        # index: 멀티데이터 DataFrame 의 index 로 쓸 결과 컬럼명
+        self.trcode = trcode
+        self.single = tuple(self._normalize(field) for field in single)
+        self.multi = tuple(self._normalize(field) for field in multi)
+        self.index = index
+
+    @staticmethod
+    def _normalize(field):
+        name, kind = field[0], field[1]
+        return name, kind, field[2] if len(field) > 2 else name
+
+
+def convert_values(values, kind): # 문자열 배열 -> 타입 변환된 배열 (한 컬럼을 한번에)
+    s = pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+    if kind == FIELD_STR:
+        return s.to_numpy(dtype=object)
+    if kind == FIELD_CODE:
+        return s.str.replace("A", "", regex=False).to_numpy(dtype=object)
+    if kind == FIELD_UNSIGNED_STR:
+        return s.str.replace("+", "", regex=False).str.replace("-", "", regex=False).str.strip().to_numpy(dtype=object)
+    s = s.str.replace(",", "", regex=False)
+    if kind == FIELD_FLOAT:
+        return pd.to_numeric(s, errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    if kind == FIELD_ABS:
+        s = s.str.lstrip("+-")
+    return pd.to_numeric(s, errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+
+
+def read_single(broker, schema, trcode, rqname): # 싱글데이터 -> dict (항목마다 GetCommData 한번)
+    result = dict()
+    for name, kind, column in schema.single:
+        value = convert_values([broker.get_comm_data(trcode, rqname, 0, name)], kind)[0]
+        result[column] = value.item() if isinstance(value, np.generic) else value
+    return result
+
+
+def read_multi(broker, schema, trcode, rqname): # 멀티데이터 -> DataFrame 한개 (컬럼마다 한번에 타입 변환)
+    # GetCommDataEx 는 차트 TR 전용이라 GetRepeatCnt 만큼 반복 구간을 한번만 돌면서 필요한 항목만 읽는다
+    cnt = broker.get_repeat_cnt(trcode, rqname)
+    raw = {column: [broker.get_comm_data(trcode, rqname, i, name) for i in range(cnt)] for name, _, column in schema.multi}
+    data = {column: convert_values(raw[column], kind) for _, kind, column in schema.multi}
+    df = pd.DataFrame(data, columns=[column for _, _, column in schema.multi])
+    if schema.index is not None:
+        df = df.set_index(schema.index)
+    return df
+
+
+# 계좌평가잔고내역요청
+OPW00018 = TrSchema(
+    "opw00018",
+    single=(
+        ("추정예탁자산", FIELD_INT),
+    ),
+    multi=(
+        ("종목번호", FIELD_CODE, "종목코드"),
+        ("종목명", FIELD_STR),
+        ("매매가능수량", FIELD_INT),
+        ("보유수량", FIELD_INT),
+        ("매입가", FIELD_ABS),
+        ("현재가", FIELD_ABS),
+        ("수익률(%)", FIELD_FLOAT, "수익률"),
+    ),
+    index="종목코드",
+)
+# 미체결요청
+OPT10075 = TrSchema(
+    "opt10075",
+    multi=(
+        ("주문번호", FIELD_STR),
+        ("종목코드", FIELD_CODE),
+        ("주문구분", FIELD_UNSIGNED_STR),
+        ("미체결수량", FIELD_INT),
+        ("주문가격", FIELD_ABS),
+        ("시간", FIELD_STR),
+    ),
+)
+# 주식기본정보요청
+OPT10001 = TrSchema(
+    "opt10001",
+    single=(
+        ("종목코드", FIELD_CODE),
+        ("종목명", FIELD_STR),
+        ("현재가", FIELD_ABS),
+        ("상한가", FIELD_ABS),
+        ("하한가", FIELD_ABS),
+    ),
+)
+TR_SCHEMAS = {schema.trcode: schema for schema in (OPW00018, OPT10075, OPT10001)}
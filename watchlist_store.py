@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+# realtime_watchlist_df.pkl 과 동일한 컬럼 순서
+WATCHLIST_COLUMNS = ["종목명", "현재가", "평균단가", "목표가", "손절가", "수익률", "매수기반조건식", "보유수량", "매수주문완료여부"]
+FLOAT_COLUMNS = ["현재가", "평균단가", "목표가", "손절가", "수익률"] # 값이 없으면 NaN (DataFrame 에서는 None)
+TEXT_COLUMNS = ["종목명", "매수기반조건식"]
+
+
+class WatchlistStore: # 실시간 감시 종목을 NumPy 배열로 들고 있는 클래스 (종목코드 -> row 번호 dict)
+    def __init__(self, capacity=256):
+        self._capacity = capacity
+        self._size = 0
+        self.code_to_row = dict()
+        self.codes = np.empty(capacity, dtype=object)
+        self.columns = {col: np.full(capacity, np.nan) for col in FLOAT_COLUMNS}
+        self.columns["보유수량"] = np.zeros(capacity, dtype=np.int64)
+        self.columns["매수주문완료여부"] = np.zeros(capacity, dtype=bool)
+        for col in TEXT_COLUMNS:
+            self.columns[col] = np.empty(capacity, dtype=object)
+        self.version = 0 # 값이 바뀔 때마다 1씩 증가 (UI/저장 쪽에서 변경 여부 확인용)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, code):
+        return code in self.code_to_row
+
+    def __iter__(self):
+        return iter(self.code_list())
+
+    def code_list(self):
+        return list(self.codes[:self._size])
+
+    def row_of(self, code):
+        return self.code_to_row.get(code, None)
+
+    def rows_of(self, codes): # 종목코드 배열 -> row 번호 배열 (없는 종목은 -1)
+        get = self.code_to_row.get
+        return np.fromiter((get(code, -1) for code in codes), dtype=np.int64, count=len(codes))
+
+    def _grow(self):
+        new_capacity = self._capacity * 2
+        self.codes = np.resize(self.codes, new_capacity)
+        for col, arr in self.columns.items():
+            grown = np.resize(arr, new_capacity)
+            if col in FLOAT_COLUMNS:
+                grown[self._capacity:] = np.nan
+            elif col in TEXT_COLUMNS:
+                grown[self._capacity:] = None
+            else:
+                grown[self._capacity:] = 0
+            self.columns[col] = grown
+        self._capacity = new_capacity
+
+    def add(self, code, 종목명="", 매수기반조건식="", **values):
+        # 이미 있는 종목이면 값만 덮어쓴다
+        row = self.code_to_row.get(code, None)
+        if row is None:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._size
+            self._size += 1
+            self.code_to_row[code] = row
+            self.codes[row] = code
+            for col in FLOAT_COLUMNS:
+                self.columns[col][row] = np.nan
+            self.columns["보유수량"][row] = 0
+            self.columns["매수주문완료여부"][row] = False
+        self.columns["종목명"][row] = 종목명
+        self.columns["매수기반조건식"][row] = 매수기반조건식
+        for col, value in values.items():
+            self.set_at(row, col, value)
+        self.version += 1
+        return row
+
+    def add_many(self, codes, 종목명, 매수기반조건식): # 없는 종목들을 한번에 뒤에 추가 (이미 있는 종목은 호출 전에 걸러낸다)
+        n = len(codes)
+        if n == 0:
+            return
+        while self._size + n > self._capacity:
+            self._grow()
+        start, end = self._size, self._size + n
+        self.codes[start:end] = codes
+        for col in FLOAT_COLUMNS:
+            self.columns[col][start:end] = np.nan
+        self.columns["보유수량"][start:end] = 0
+        self.columns["매수주문완료여부"][start:end] = False
+        self.columns["종목명"][start:end] = 종목명
+        self.columns["매수기반조건식"][start:end] = 매수기반조건식
+        self.code_to_row.update(zip(codes, range(start, end)))
+        self._size = end
+        self.version += 1
+
+    def remove(self, code): # 마지막 row 를 빈자리로 옮겨서 O(1) 로 삭제
+        row = self.code_to_row.pop(code, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            last_code = self.codes[last]
+            self.codes[row] = last_code
+            for arr in self.columns.values():
+                arr[row] = arr[last]
+            self.code_to_row[last_code] = row
+        self.codes[last] = None
+        for col in TEXT_COLUMNS:
+            self.columns[col][last] = None
+        self._size = last
+        self.version += 1
+        return True
+
+    def clear(self):
+        for code in self.code_list():
+            self.remove(code)
+
+    def get_at(self, row, col):
+        value = self.columns[col][row]
+        if col in FLOAT_COLUMNS:
+            return None if np.isnan(value) else float(value)
+        if col == "보유수량":
+            return int(value)
+        if col == "매수주문완료여부":
+            return bool(value)
+        return value
+
+    def set_at(self, row, col, value):
+        if col in FLOAT_COLUMNS and value is None:
+            value = np.nan
+        self.columns[col][row] = value
+        self.version += 1
+
+    def set_rows(self, rows, **values): # 여러 row 의 컬럼 값을 한번에 변경 (values: 컬럼 -> rows 와 같은 길이의 배열)
+        if len(rows) == 0:
+            return
+        for col, value in values.items():
+            self.columns[col][rows] = value
+        self.version += 1
+
+    def get(self, code, col, default=None):
+        row = self.code_to_row.get(code, None)
+        if row is None:
+            return default
+        return self.get_at(row, col)
+
+    def set(self, code, col, value):
+        row = self.code_to_row.get(code, None)
+        if row is None:
+            raise KeyError(code)
+        self.set_at(row, col, value)
+
+    def view(self, col): # 현재 종목수 만큼 잘라낸 배열 view
+        return self.columns[col][:self._size]
+
+    def to_dataframe(self): # UI, 저장용 DataFrame 생성 (realtime_watchlist_df.pkl 과 같은 스키마)
+        n = self._size
+        index = pd.Index(self.codes[:n].copy(), dtype=object)
+        data = dict()
+        for col in WATCHLIST_COLUMNS:
+            arr = self.columns[col][:n]
+            if col in FLOAT_COLUMNS:
+                values = arr.astype(object)
+                values[np.isnan(arr)] = None
+                data[col] = pd.Series(values, index=index, dtype=object)
+            elif col in TEXT_COLUMNS:
+                data[col] = pd.Series(arr.copy(), index=index, dtype=object)
+            else:
+                data[col] = pd.Series(arr.copy(), index=index)
+        return pd.DataFrame(data, index=index, columns=WATCHLIST_COLUMNS)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        store = cls(capacity=max(256, len(df) * 2))
+        for row in df.itertuples():
+            values = {col: getattr(row, col) for col in FLOAT_COLUMNS}
+            for col, value in values.items():
+                if value is None or pd.isna(value):
+                    values[col] = None
+            store.add(
+                row.Index,
+                종목명=row.종목명,
+                매수기반조건식=row.매수기반조건식,
+                보유수량=int(row.보유수량) if not pd.isna(row.보유수량) else 0,
+                매수주문완료여부=bool(row.매수주문완료여부),
+                **values,
+            )
+        return store
+
+    @classmethod
+    def load_pickle(cls, path):
+        try:
+            return cls.from_dataframe(pd.read_pickle(path))
+        except FileNotFoundError:
+            return cls()
+
+    def to_pickle(self, path):
+        self.to_dataframe().to_pickle(path)